@@ -13,6 +13,10 @@ from ae.core.skills.click_using_selector import click as click_element
 # from ae.core.skills.enter_text_and_click import enter_text_and_click
 from ae.core.skills.enter_text_using_selector import bulk_enter_text
 from ae.core.skills.enter_text_using_selector import entertext
+from ae.core.skills.expand_list import expand_list
+from ae.core.skills.extract_tables import extract_tables
+from ae.core.skills.find_elements import find_elements
+from ae.core.skills.find_in_page import find_in_page
 from ae.core.skills.get_dom_with_content_type import get_dom_with_content_type
 from ae.core.skills.get_url import geturl
 from ae.core.skills.open_url import openurl
@@ -21,6 +25,8 @@ from ae.core.skills.pdf_text_extractor import extract_text_from_pdf
 #from ae.core.skills.pdf_text_extractor import extract_text_from_pdf
 from ae.core.skills.press_key_combination import press_key_combination
 from ae.core.skills.skill_registry import skill_registry
+from ae.server.tool_output_pager import next_page
+from ae.server.tool_output_pager import with_output_budget
 from ae.utils.logger import logger
 
 
@@ -77,33 +83,62 @@ class BrowserNavAgent:
         """
 
         # Register each skill for LLM by assistant agent and for execution by user_proxy_agen
-
-        self.agent.register_for_llm(description=LLM_PROMPTS["OPEN_URL_PROMPT"])(openurl)
-        self.browser_nav_executor.register_for_execution()(openurl)
+        # The skills are wrapped to enforce the token budget of their output, as the agent does not call them through
+        # toolbox.call_tool. Outputs over the budget are read further with next_page.
+        openurl_skill = with_output_budget("openurl", openurl)
+        get_dom_with_content_type_skill = with_output_budget("get_dom_with_content_type", get_dom_with_content_type)
+        click_skill = with_output_budget("click", click_element)
+        geturl_skill = with_output_budget("geturl", geturl)
+        bulk_enter_text_skill = with_output_budget("bulk_enter_text", bulk_enter_text)
+        entertext_skill = with_output_budget("entertext", entertext)
+        press_key_combination_skill = with_output_budget("press_key_combination", press_key_combination)
+        extract_text_from_pdf_skill = with_output_budget("extract_text_from_pdf", extract_text_from_pdf)
+        expand_list_skill = with_output_budget("expand_list", expand_list)
+        find_elements_skill = with_output_budget("find_elements", find_elements)
+        find_in_page_skill = with_output_budget("find_in_page", find_in_page)
+        extract_tables_skill = with_output_budget("extract_tables", extract_tables)
+
+        self.agent.register_for_llm(description=LLM_PROMPTS["OPEN_URL_PROMPT"])(openurl_skill)
+        self.browser_nav_executor.register_for_execution()(openurl_skill)
 
         # self.agent.register_for_llm(description=LLM_PROMPTS["ENTER_TEXT_AND_CLICK_PROMPT"])(enter_text_and_click)
         # self.browser_nav_executor.register_for_execution()(enter_text_and_click)
 
-        self.agent.register_for_llm(description=LLM_PROMPTS["GET_DOM_WITH_CONTENT_TYPE_PROMPT"])(get_dom_with_content_type)
-        self.browser_nav_executor.register_for_execution()(get_dom_with_content_type)
+        self.agent.register_for_llm(description=LLM_PROMPTS["GET_DOM_WITH_CONTENT_TYPE_PROMPT"])(get_dom_with_content_type_skill)
+        self.browser_nav_executor.register_for_execution()(get_dom_with_content_type_skill)
+
+        self.agent.register_for_llm(description=LLM_PROMPTS["CLICK_PROMPT"])(click_skill)
+        self.browser_nav_executor.register_for_execution()(click_skill)
+
+        self.agent.register_for_llm(description=LLM_PROMPTS["GET_URL_PROMPT"])(geturl_skill)
+        self.browser_nav_executor.register_for_execution()(geturl_skill)
+
+        self.agent.register_for_llm(description=LLM_PROMPTS["BULK_ENTER_TEXT_PROMPT"])(bulk_enter_text_skill)
+        self.browser_nav_executor.register_for_execution()(bulk_enter_text_skill)
+
+        self.agent.register_for_llm(description=LLM_PROMPTS["ENTER_TEXT_PROMPT"])(entertext_skill)
+        self.browser_nav_executor.register_for_execution()(entertext_skill)
+
+        self.agent.register_for_llm(description=LLM_PROMPTS["PRESS_KEY_COMBINATION_PROMPT"])(press_key_combination_skill)
+        self.browser_nav_executor.register_for_execution()(press_key_combination_skill)
 
-        self.agent.register_for_llm(description=LLM_PROMPTS["CLICK_PROMPT"])(click_element)
-        self.browser_nav_executor.register_for_execution()(click_element)
+        self.agent.register_for_llm(description=LLM_PROMPTS["EXTRACT_TEXT_FROM_PDF_PROMPT"])(extract_text_from_pdf_skill)
+        self.browser_nav_executor.register_for_execution()(extract_text_from_pdf_skill)
 
-        self.agent.register_for_llm(description=LLM_PROMPTS["GET_URL_PROMPT"])(geturl)
-        self.browser_nav_executor.register_for_execution()(geturl)
+        self.agent.register_for_llm(description=LLM_PROMPTS["EXPAND_LIST_PROMPT"])(expand_list_skill)
+        self.browser_nav_executor.register_for_execution()(expand_list_skill)
 
-        self.agent.register_for_llm(description=LLM_PROMPTS["BULK_ENTER_TEXT_PROMPT"])(bulk_enter_text)
-        self.browser_nav_executor.register_for_execution()(bulk_enter_text)
+        self.agent.register_for_llm(description=LLM_PROMPTS["FIND_ELEMENTS_PROMPT"])(find_elements_skill)
+        self.browser_nav_executor.register_for_execution()(find_elements_skill)
 
-        self.agent.register_for_llm(description=LLM_PROMPTS["ENTER_TEXT_PROMPT"])(entertext)
-        self.browser_nav_executor.register_for_execution()(entertext)
+        self.agent.register_for_llm(description=LLM_PROMPTS["FIND_IN_PAGE_PROMPT"])(find_in_page_skill)
+        self.browser_nav_executor.register_for_execution()(find_in_page_skill)
 
-        self.agent.register_for_llm(description=LLM_PROMPTS["PRESS_KEY_COMBINATION_PROMPT"])(press_key_combination)
-        self.browser_nav_executor.register_for_execution()(press_key_combination)
+        self.agent.register_for_llm(description=LLM_PROMPTS["EXTRACT_TABLES_PROMPT"])(extract_tables_skill)
+        self.browser_nav_executor.register_for_execution()(extract_tables_skill)
 
-        self.agent.register_for_llm(description=LLM_PROMPTS["EXTRACT_TEXT_FROM_PDF_PROMPT"])(extract_text_from_pdf)
-        self.browser_nav_executor.register_for_execution()(extract_text_from_pdf)
+        self.agent.register_for_llm(description=LLM_PROMPTS["NEXT_PAGE_PROMPT"])(next_page)
+        self.browser_nav_executor.register_for_execution()(next_page)
 
         '''
         # Register reply function for printing messages
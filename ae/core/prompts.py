@@ -108,7 +108,7 @@ Some basic information about the user: $basic_user_information""",
    # This one below had all three content types including input_fields
    "GET_DOM_WITH_CONTENT_TYPE_PROMPT": """Retrieves the DOM of the current web site based on the given content type.
    The DOM representation returned contains items ordered in the same way they appear on the page. Keep this in mind when executing user requests that contain ordinals or numbered items.
-   text_only - returns plain text representing all the text in the web site. Use this for any information retrieval task. This will contain the most complete textual information.
+   text_only - returns the text of the web site as Markdown (headings, lists, tables). Use this for any information retrieval task. This will contain the most complete textual information. Headers, menus and footers already returned for another page of the same site are replaced by a reference, call again with suppress_boilerplate false to read them.
    input_fields - returns a JSON string containing a list of objects representing text input html elements with mmid attribute. Use this strictly for interaction purposes with text input fields.
    all_fields - returns a JSON string containing a list of objects representing all interactive elements and their attributes with mmid attribute. Use this strictly to identify and interact with any type of elements on page.
    If information is not available in one content type, you must try another content_type.""",
@@ -157,6 +157,27 @@ Some basic information about the user: $basic_user_information""",
 
    "EXTRACT_TEXT_FROM_PDF_PROMPT": """Extracts text from a PDF file hosted at the given URL.""",
 
+   "NEXT_PAGE_PROMPT": """Returns the next page of a tool output that was too large to be returned at once. Truncated outputs end with a note giving the cursor of their next page. Only call this if the rest of the output is needed for the task.""",
+
+
+   "EXPAND_LIST_PROMPT": """Lists more options of a select, or more items of a listbox or list, given the mmid of the list. The DOM only gives the first items of long lists, along with their total count in options_total or additional_info_total.
+   Use the filter to find an item by its text (e.g. a country or an airport) instead of reading the whole list.
+   Returns the matching items with their mmid, their total count and the next_offset to read the following ones.""",
+
+
+   "FIND_ELEMENTS_PROMPT": """Finds the elements of the current page that best match a query, e.g. 'search button' or 'departure city', without reading the whole DOM.
+   Returns one short line per element, best first, with its mmid and the element it is in. Use get_dom_with_content_type when the page structure is needed.""",
+
+
+   "FIND_IN_PAGE_PROMPT": """Finds the passages of the text of the current page that best match a query.
+   Use it to answer a question from a long article or documentation page in one call, instead of reading its whole text with get_dom_with_content_type text_only.
+   To act on an element of a passage, call get_dom_with_content_type all_fields with focus set to it.""",
+
+
+   "EXTRACT_TABLES_PROMPT": """Reads the data tables of the current page (HTML tables, ARIA tables and grids) row by row.
+   Call it without a table to list the tables with their index, caption, columns and number of rows, then with a table index to read its rows in chunks, using the next_offset of each call to read on.
+   Prefer it to text_only for stats, prices or schedules laid out in tables.""",
+
 
    "BROWSER_AGENT_NO_SKILLS_PROMPT": """You are an autonomous agent tasked with performing web navigation on a Playwright instance, including logging into websites and executing other web-based actions.
    You will receive user commands, formulate a plan and then write the PYTHON code that is needed for the task to be completed.
@@ -7,7 +7,12 @@ from playwright.async_api import ElementHandle
 from playwright.async_api import Page
 
 from ae.core.playwright_manager import PlaywrightManager
+from ae.utils.action_primitives import click_in_one_round_trip
+from ae.utils.cdp_accessibility_tree import ensure_mmid_in_dom
+from ae.utils.dom_helper import describe_settle_wait
 from ae.utils.dom_helper import get_element_outer_html
+from ae.utils.dom_helper import wait_for_page_to_settle
+from ae.utils.dom_helper import watch_page_activity
 from ae.utils.dom_mutation_observer import subscribe  # type: ignore
 from ae.utils.dom_mutation_observer import unsubscribe  # type: ignore
 from ae.utils.logger import logger
@@ -41,6 +46,7 @@ async def click(selector: Annotated[str, "The properly formed query selector str
 
     await browser_manager.take_screenshots(f"{function_name}_start", page)
 
+    await ensure_mmid_in_dom(page, selector)
     await browser_manager.highlight_element(selector, True)
 
     dom_changes_detected=None
@@ -49,8 +55,7 @@ async def click(selector: Annotated[str, "The properly formed query selector str
         dom_changes_detected = changes # type: ignore
 
     subscribe(detect_dom_changes)
-    result = await do_click(page, selector, wait_before_execution)
-    await asyncio.sleep(0.1) # sleep for 100ms to allow the mutation observer to detect changes
+    result = await do_click(page, selector, wait_before_execution) # waits for the page to settle, the mutation observer has reported the changes by then
     unsubscribe(detect_dom_changes)
     await browser_manager.take_screenshots(f"{function_name}_end", page)
     await browser_manager.notify_user(result["summary_message"], message_type=MessageType.ACTION)
@@ -59,7 +64,7 @@ async def click(selector: Annotated[str, "The properly formed query selector str
         text = f"Success: {result['summary_message']}.\n As a consequence of this action, new elements have appeared in view: {dom_changes_detected}. This means that the action to click {selector} is not yet executed and needs further interaction. Get all_fields DOM to complete the interaction."
     else:
         text = result["detailed_message"]
-    screenshot_msg = await screenshot_page(page)
+    screenshot_msg = await screenshot_page(page, "click")
     return [
         {"type": "text", "text": text},
         screenshot_msg,
@@ -79,61 +84,49 @@ async def do_click(page: Page, selector: str, wait_before_execution: float) -> d
     dict[str,str] - Explanation of the outcome of this operation represented as a dictionary with 'summary_message' and 'detailed_message'.
     """
     logger.info(f"Executing ClickElement with \"{selector}\" as the selector. Wait time before execution: {wait_before_execution} seconds.")
+    watch_page_activity(page)
 
     # Wait before execution if specified
     if wait_before_execution > 0:
         await asyncio.sleep(wait_before_execution)
 
-    # Wait for the selector to be present and ensure it's attached and visible. If timeout, try javascript click
     try:
-        logger.info(f"Executing ClickElement with \"{selector}\" as the selector. Waiting for the element to be attached and visible. url={page.url}")
-
-        element = await asyncio.wait_for(
-            page.wait_for_selector(selector, state="attached", timeout=5000),
-            timeout=5000
-        )
-        if element is None:
-            raise ValueError(f"Element with selector: \"{selector}\" not found")
-
-        logger.info(f"Element with selector: \"{selector}\" is attached. scrolling it into view if needed.")
-        try:
-            await element.scroll_into_view_if_needed(timeout=400)
-            logger.info(f"Element with selector: \"{selector}\" is attached and scrolled into view. Waiting for the element to be visible.")
-        except Exception:
-            # If scrollIntoView fails, just move on, not a big deal
-            pass
-
-        try:
-            await element.wait_for_element_state("visible", timeout=400)
-            logger.info(f"Executing ClickElement with \"{selector}\" as the selector. Element is attached and visibe. Clicking the element.")
-        except Exception:
-            # If the element is not visible, try to click it anyway
-            pass
-
-        element_tag_name = await element.evaluate("element => element.tagName.toLowerCase()")
-        element_outer_html = await get_element_outer_html(element, page, element_tag_name)
-
+        # The element is resolved, scrolled into view, checked, described and clicked in one round trip. Playwright, which waits
+        # for the element to be attached and visible, is only used when the element was not found, is not rendered yet or its
+        # centre could not be hit-tested. A covered element is not clicked through what covers it, and a document that went
+        # away before the click is not clicked again.
+        outcome = await click_in_one_round_trip(page, selector)
+        if outcome.get('reason') == 'covered':
+            msg = f"Element with selector: \"{selector}\" was not clicked, since it is covered by {outcome['covered_by']}"
+            return {"summary_message": msg,
+                    "detailed_message": f"{msg}. The covered element's outer HTML is: {outcome['opening_tag']}. Close or dismiss the covering element (e.g. a dialog or a banner) first, or get the DOM again."}
+        if outcome.get('context_destroyed'):
+            msg = f"Element with selector: \"{selector}\" was not clicked, since the page changed before the click"
+            return {"summary_message": msg, "detailed_message": f"{msg}. Get the DOM again before clicking."}
+        if outcome['performed']:
+            round_trips = 1
+            element_tag_name = outcome['tag']
+            element_outer_html = outcome['opening_tag'] or "unavailable, the click navigated away from its document"
+            element_value = outcome.get('option_value')
+            msg = f"Executed JavaScript Click on element with selector: {selector}"
+            if outcome.get('opened_menu'):
+                msg += ". Very important: As a consequence a menu has appeared where you may need to make further selction. Very important: Get all_fields DOM to complete the action."
+        else:
+            round_trips, element_tag_name, element_outer_html, element_value, msg = await do_playwright_click(page, selector)
 
         if element_tag_name == "option":
-            element_value = await element.get_attribute("value") # get the text that is in the value of the option
-            parent_element = await element.evaluate_handle("element => element.parentNode")
-            # await parent_element.evaluate(f"element => element.select_option(value=\"{element_value}\")")
-            await parent_element.select_option(value=element_value) # type: ignore
-
-            logger.info(f'Select menu option "{element_value}" selected')
+            logger.info(f'Select menu option "{element_value}" selected in {round_trips} round trips')
+            waited, settled = await wait_for_page_to_settle(page)
+            logger.info(f"Waited {waited:.2f} seconds for the page to settle after selecting \"{element_value}\"")
 
             return {"summary_message": f'Select menu option "{element_value}" selected',
-                    "detailed_message": f'Select menu option "{element_value}" selected. The select element\'s outer HTML is: {element_outer_html}.'}
+                    "detailed_message": f'Select menu option "{element_value}" selected. The select element\'s outer HTML is: {element_outer_html}. {describe_settle_wait(waited, settled)}'}
 
-
-        #Playwright click seems to fail more often than not, disabling it for now and just going with JS click
-        #await perform_playwright_click(element, selector)
-        msg = await perform_javascript_click(page, selector)
-         # Wait for the network to be idle, covering both navigation and async loads.
-        await asyncio.sleep(5)
-        await page.wait_for_load_state("networkidle", timeout=10000)
-        logger.info(f"Page has reached a network idle state after clicking {selector}.")
-        return {"summary_message": msg, "detailed_message": f"{msg} The clicked element's outer HTML is: {element_outer_html}."} # type: ignore
+        logger.info(f"Clicked {selector} in {round_trips} round trips")
+        # Wait for the DOM and the requests sent by the click to settle, covering both navigation and async loads
+        waited, settled = await wait_for_page_to_settle(page)
+        logger.info(f"Waited {waited:.2f} seconds for the page to settle after clicking {selector}.")
+        return {"summary_message": msg, "detailed_message": f"{msg} The clicked element's outer HTML is: {element_outer_html}. {describe_settle_wait(waited, settled)}"} # type: ignore
     except Exception as e:
         logger.error(f"Unable to click element with selector: \"{selector}\". Error: {e}, url={page.url}")
         traceback.print_exc()
@@ -141,6 +134,66 @@ async def do_click(page: Page, selector: str, wait_before_execution: float) -> d
         return {"summary_message": msg, "detailed_message": f"{msg}. Error: {e}"}
 
 
+async def do_playwright_click(page: Page, selector: str) -> tuple[int, str, str, str | None, str]:
+    """
+    Clicks the element with Playwright, waiting for it to be attached and visible. Used when the one round trip click failed.
+
+    Parameters:
+    - page: The Playwright page instance.
+    - selector: The query selector string to identify the element for the click action.
+
+    Returns:
+    tuple[int, str, str, str | None, str] - The number of round trips to the browser, the tag and opening tag of the element,
+    the value of the option selected if the element is an option, and the message of the click.
+    """
+    round_trips = 0
+    # Wait for the selector to be present and ensure it's attached and visible. If timeout, try javascript click
+    logger.info(f"Executing ClickElement with \"{selector}\" as the selector. Waiting for the element to be attached and visible. url={page.url}")
+
+    element = await asyncio.wait_for(
+        page.wait_for_selector(selector, state="attached", timeout=5000),
+        timeout=5000
+    )
+    round_trips += 1
+    if element is None:
+        raise ValueError(f"Element with selector: \"{selector}\" not found")
+
+    logger.info(f"Element with selector: \"{selector}\" is attached. scrolling it into view if needed.")
+    try:
+        round_trips += 1
+        await element.scroll_into_view_if_needed(timeout=400)
+        logger.info(f"Element with selector: \"{selector}\" is attached and scrolled into view. Waiting for the element to be visible.")
+    except Exception:
+        # If scrollIntoView fails, just move on, not a big deal
+        pass
+
+    try:
+        round_trips += 1
+        await element.wait_for_element_state("visible", timeout=400)
+        logger.info(f"Executing ClickElement with \"{selector}\" as the selector. Element is attached and visibe. Clicking the element.")
+    except Exception:
+        # If the element is not visible, try to click it anyway
+        pass
+
+    element_tag_name = await element.evaluate("element => element.tagName.toLowerCase()")
+    element_outer_html = await get_element_outer_html(element, page, element_tag_name)
+    round_trips += 2
+
+    if element_tag_name == "option":
+        element_value = await element.get_attribute("value") # get the text that is in the value of the option
+        parent_element = await element.evaluate_handle("element => element.parentNode")
+        # await parent_element.evaluate(f"element => element.select_option(value=\"{element_value}\")")
+        await parent_element.select_option(value=element_value) # type: ignore
+        round_trips += 3
+        return round_trips, element_tag_name, element_outer_html, element_value, f'Select menu option "{element_value}" selected'
+
+    #Playwright click seems to fail more often than not, disabling it for now and just going with JS click
+    #await perform_playwright_click(element, selector)
+    msg = await perform_javascript_click(page, selector)
+    round_trips += 1
+    return round_trips, element_tag_name, element_outer_html, None, msg
+
+
 async def is_element_present(page: Page, selector: str) -> bool:
     """
     Checks if an element is present on the page.
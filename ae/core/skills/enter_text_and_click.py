@@ -1,4 +1,3 @@
-import asyncio
 import inspect
 from typing import Annotated
 
@@ -6,6 +5,10 @@ from ae.core.playwright_manager import PlaywrightManager
 from ae.core.skills.click_using_selector import do_click
 from ae.core.skills.enter_text_using_selector import do_entertext
 from ae.core.skills.press_key_combination import do_press_key_combination
+from ae.utils.cdp_accessibility_tree import ensure_mmid_in_dom
+from ae.utils.dom_helper import describe_settle_wait
+from ae.utils.dom_helper import wait_for_page_to_settle
+from ae.utils.dom_helper import watch_page_activity
 from ae.utils.logger import logger
 from ae.utils.ui_messagetype import MessageType
 
@@ -45,11 +48,13 @@ async def enter_text_and_click(
         logger.error("No active page found")
         raise ValueError('No active page found. OpenURL command opens a new page.')
 
+    await ensure_mmid_in_dom(page, text_selector)
     await browser_manager.highlight_element(text_selector, True)
 
     function_name = inspect.currentframe().f_code.co_name # type: ignore
     await browser_manager.take_screenshots(f"{function_name}_start", page)
 
+    watch_page_activity(page)
     text_entry_result = await do_entertext(page, text_selector, text_to_enter, use_keyboard_fill=True)
 
     #await browser_manager.notify_user(text_entry_result["summary_message"])
@@ -63,20 +68,21 @@ async def enter_text_and_click(
     if text_selector == click_selector:
         do_press_key_combination_result = await do_press_key_combination(browser_manager, page, "Enter")
         if do_press_key_combination_result:
-            result["detailed_message"] += f" Instead of click, pressed the Enter key successfully on element: \"{click_selector}\"."
+            waited, settled = await wait_for_page_to_settle(page)
+            logger.info(f"Waited {waited:.2f} seconds for the page to settle after pressing Enter on {click_selector}")
+            result["detailed_message"] += f" Instead of click, pressed the Enter key successfully on element: \"{click_selector}\". {describe_settle_wait(waited, settled)}"
             await browser_manager.notify_user(f"Pressed the Enter key successfully on element: \"{click_selector}\".", message_type=MessageType.ACTION)
         else:
             result["detailed_message"] += f" Clicking the same element after entering text in it, is of no value. Tried pressing the Enter key on element \"{click_selector}\" instead of click and failed."
             await browser_manager.notify_user("Failed to press the Enter key on element \"{click_selector}\".", message_type=MessageType.ACTION)
     else:
+        await ensure_mmid_in_dom(page, click_selector)
         await browser_manager.highlight_element(click_selector, True)
 
         do_click_result = await do_click(page, click_selector, wait_before_click_execution)
         result["detailed_message"] += f' {do_click_result["detailed_message"]}'
         #await browser_manager.notify_user(do_click_result["summary_message"])
 
-    await asyncio.sleep(0.1) # sleep for 100ms to allow the mutation observer to detect changes
-
     await browser_manager.take_screenshots(f"{function_name}_end", page)
 
     return result["detailed_message"]
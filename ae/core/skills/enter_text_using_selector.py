@@ -1,18 +1,25 @@
-import asyncio
 import inspect
+import time
 import traceback
 from dataclasses import dataclass
 from typing import Annotated
+from typing import Any
 from typing import List  # noqa: UP035
 
 from playwright.async_api import Page
 
 from ae.core.playwright_manager import PlaywrightManager
-from ae.core.skills.press_key_combination import press_key_combination
+from ae.utils.action_primitives import fill_fields_in_one_round_trip
+from ae.utils.action_primitives import prepare_text_entry_in_one_round_trip
+from ae.utils.cdp_accessibility_tree import ensure_mmid_in_dom
+from ae.utils.dom_helper import describe_settle_wait
 from ae.utils.dom_helper import get_element_outer_html
+from ae.utils.dom_helper import wait_for_page_to_settle
+from ae.utils.dom_helper import watch_page_activity
 from ae.utils.dom_mutation_observer import subscribe
 from ae.utils.dom_mutation_observer import unsubscribe
 from ae.utils.logger import logger
+from ae.utils.screenshot_helper import screenshot_page
 from ae.utils.ui_messagetype import MessageType
 
 
@@ -107,9 +114,8 @@ async def entertext(entry: Annotated[EnterTextEntry, "An object containing 'quer
         - If no active page is found, an error message is returned.
         - The function internally calls the 'do_entertext' function to perform the text entry operation.
         - The 'do_entertext' function applies a pulsating border effect to the target element during the operation.
-        - The 'use_keyboard_fill' parameter in 'do_entertext' determines whether to simulate keyboard typing or not.
-        - If 'use_keyboard_fill' is set to True, the function uses the 'page.keyboard.type' method to enter the text.
-        - If 'use_keyboard_fill' is set to False, the function uses the 'custom_fill_element' method to enter the text.
+        - The 'do_entertext' function picks how the text is entered per element: filled, inserted at once, or typed into
+          the autocomplete widgets that need keystrokes.
     """
     logger.info(f"Entering text: {entry}")
     query_selector: str = entry['query_selector']
@@ -125,6 +131,7 @@ async def entertext(entry: Annotated[EnterTextEntry, "An object containing 'quer
 
     await browser_manager.take_screenshots(f"{function_name}_start", page)
 
+    await ensure_mmid_in_dom(page, query_selector)
     await browser_manager.highlight_element(query_selector, True)
 
     dom_changes_detected=None
@@ -133,23 +140,13 @@ async def entertext(entry: Annotated[EnterTextEntry, "An object containing 'quer
         dom_changes_detected = changes # type: ignore
 
     subscribe(detect_dom_changes)
-
-    await page.evaluate(
-        """
-        (selector) => {
-            const element = document.querySelector(selector);
-            if (element) {
-                element.value = '';
-            } else {
-                console.error('Element not found:', selector);
-            }
-        }
-        """,
-        query_selector,
-    )
+    watch_page_activity(page)
 
     result = await do_entertext(page, query_selector, text_to_enter)
-    await asyncio.sleep(0.1) # sleep for 100ms to allow the mutation observer to detect changes
+    # Waits for the suggestions an autocomplete may load, the mutation observer has reported the changes once the page settled
+    waited, settled = await wait_for_page_to_settle(page)
+    logger.info(f"Waited {waited:.2f} seconds for the page to settle after entering text in {query_selector}")
+    result["detailed_message"] += f" {describe_settle_wait(waited, settled)}"
     unsubscribe(detect_dom_changes)
 
     await browser_manager.take_screenshots(f"{function_name}_end", page)
@@ -166,14 +163,14 @@ async def do_entertext(page: Page, selector: str, text_to_enter: str, use_keyboa
 
     This function performs the text entry operation on a DOM element identified by the given CSS selector.
     It applies a pulsating border effect to the element during the operation for visual feedback.
-    The function supports both direct setting of the 'value' property and simulating keyboard typing.
+    The strategy to enter the text with is picked per element, see the Note below.
 
     Args:
         page (Page): The Playwright Page object representing the browser tab in which the operation will be performed.
         selector (str): The CSS selector string used to locate the target DOM element.
         text_to_enter (str): The text value to be set in the target element. Existing content will be overwritten.
-        use_keyboard_fill (bool, optional): Determines whether to simulate keyboard typing or not.
-                                            Defaults to False.
+        use_keyboard_fill (bool, optional): Determines whether to simulate keyboard typing for the elements that need keystrokes.
+                                            Defaults to True.
 
     Returns:
         dict[str, str]: Explanation of the outcome of this operation represented as a dictionary with 'summary_message' and 'detailed_message'.
@@ -182,36 +179,62 @@ async def do_entertext(page: Page, selector: str, text_to_enter: str, use_keyboa
         result = await do_entertext(page, '#username', 'test_user')
 
     Note:
-        - The 'use_keyboard_fill' parameter determines whether to simulate keyboard typing or not.
-        - If 'use_keyboard_fill' is set to True, the function uses the 'page.keyboard.type' method to enter the text.
-        - If 'use_keyboard_fill' is set to False, the function uses the 'custom_fill_element' method to enter the text.
+        - Plain inputs and textareas are filled: the value is set along with input and change events ('fill').
+        - Contenteditable elements, and fields that do not hold a value set this way, get the text inserted at once with
+          'page.keyboard.insert_text' (CDP Input.insertText), so the time taken does not depend on the length of the text.
+        - Autocomplete widgets and selects act on keystrokes. If 'use_keyboard_fill' is set to True, the function uses the
+          'page.keyboard.type' method to enter the text, otherwise the 'custom_fill_element' method.
     """
     try:
 
         logger.debug(f"Looking for selector {selector} to enter text: {text_to_enter}")
 
-        elem = await page.query_selector(selector)
-
-        if elem is None:
-            error = f"Error: Selector {selector} not found. Unable to continue."
-            return {"summary_message": error, "detailed_message": error}
-
-        logger.info(f"Found selector {selector} to enter text")
-        element_outer_html = await get_element_outer_html(elem, page)
-
-        if use_keyboard_fill:
-            await elem.focus()
-            await asyncio.sleep(0.1)
-            await press_key_combination("Control+A")
-            await asyncio.sleep(0.1)
-            await press_key_combination("Backspace")
-            await asyncio.sleep(0.1)
-            logger.debug(f"Focused element with selector {selector} to enter text")
-            #add a 100ms delay
-            await page.keyboard.type(text_to_enter, delay=1)
+        # The element is resolved, scrolled into view, checked, described, focused and cleared in one round trip, which also
+        # picks the strategy to enter the text with, and fills plain fields right away. The Playwright calls below are only used
+        # when that fails.
+        prepared = await prepare_text_entry_in_one_round_trip(page, selector, text_to_enter)
+        round_trips = 1
+        if prepared is not None:
+            element_outer_html = prepared['opening_tag']
+            strategy = prepared['strategy']
+            if strategy == "insert_text":
+                # A single Input.insertText, whatever the length of the text
+                await page.keyboard.insert_text(text_to_enter)
+                round_trips += 1
+            elif strategy == "type" and use_keyboard_fill:
+                # Autocomplete widgets look for keystrokes to suggest values
+                await page.keyboard.type(text_to_enter, delay=1)
+                round_trips += 1
+            elif strategy == "type":
+                strategy = "fill"
+                await custom_fill_element(page, selector, text_to_enter)
+                round_trips += 1
         else:
-            await custom_fill_element(page, selector, text_to_enter)
-        await elem.focus()
+            strategy = "type" if use_keyboard_fill else "fill"
+            elem = await page.query_selector(selector)
+            round_trips += 1
+
+            if elem is None:
+                error = f"Error: Selector {selector} not found. Unable to continue."
+                return {"summary_message": error, "detailed_message": error}
+
+            logger.info(f"Found selector {selector} to enter text")
+            element_outer_html = await get_element_outer_html(elem, page)
+            round_trips += 1
+
+            if use_keyboard_fill:
+                await elem.focus()
+                await page.keyboard.press("Control+A")
+                await page.keyboard.press("Backspace")
+                logger.debug(f"Focused and cleared element with selector {selector} to enter text")
+                await page.keyboard.type(text_to_enter, delay=1)
+                round_trips += 4
+            else:
+                await custom_fill_element(page, selector, text_to_enter)
+                round_trips += 1
+            await elem.focus()
+            round_trips += 1
+        logger.info(f"Entered text in {selector} with the {strategy} strategy in {round_trips} round trips")
         logger.info(f"Success. Text \"{text_to_enter}\" set successfully in the element with selector {selector}")
         success_msg = f"Success. Text \"{text_to_enter}\" set successfully in the element with selector {selector}"
         return {"summary_message": success_msg, "detailed_message": f"{success_msg} and outer HTML: {element_outer_html}."}
@@ -224,19 +247,23 @@ async def do_entertext(page: Page, selector: str, text_to_enter: str, use_keyboa
 
 async def bulk_enter_text(
     entries: Annotated[List[dict[str, str]], "List of objects, each containing 'query_selector' and 'text'."]  # noqa: UP006
-) -> Annotated[List[dict[str, str]], "List of dictionaries, each containing 'query_selector' and the result of the operation."]:  # noqa: UP006
+) -> Annotated[List[dict[str, Any]], "A text content part with the result of the operation for each 'query_selector', and a screenshot of the page."]:  # noqa: UP006
     """
     Enters text into multiple DOM elements using a bulk operation.
 
     This function enters text into multiple DOM elements using a bulk operation.
     It takes a list of dictionaries, where each dictionary contains a 'query_selector' and 'text' pair.
-    The function internally calls the 'entertext' function to perform the text entry operation for each entry.
+    All the fields are filled in one pass in the page, with the input and change events a user typing would cause. Only the
+    fields that do not hold a value set this way (e.g. contenteditable elements or masked inputs) are typed into, with
+    'do_entertext'. The page is then waited on to settle once, and a single screenshot is returned.
 
     Args:
         entries: List of objects, each containing 'query_selector' and 'text'.
 
     Returns:
-        List of dictionaries, each containing 'query_selector' and the result of the operation.
+        The content parts of the tool output: a 'text' part listing, for each entry, its 'query_selector' and the result of the
+        operation, followed by how long the page took to settle and the elements that appeared, and the screenshot of the page
+        as returned by 'screenshot_page'.
 
     Example:
         entries = [
@@ -247,17 +274,60 @@ async def bulk_enter_text(
 
     Note:
         - Each entry in the 'entries' list should be a dictionary with 'query_selector' and 'text' keys.
-        - The result is a list of dictionaries, where each dictionary contains the 'query_selector' and the result of the operation.
+        - The result is a list of content parts, [{"type": "text", "text": ...}, screenshot content part], for the LLM to read
+          the results and see the page.
     """
-
-    results: List[dict[str, str]] = []  # noqa: UP006
     logger.info("Executing bulk Enter Text Command")
+    browser_manager = PlaywrightManager(browser_type='chromium', headless=False)
+    page = await browser_manager.get_current_page()
+    if page is None: # type: ignore
+        raise ValueError('No active page found. OpenURL command opens a new page.')
+
+    function_name = inspect.currentframe().f_code.co_name # type: ignore
+    await browser_manager.take_screenshots(f"{function_name}_start", page)
+
     for entry in entries:
+        await ensure_mmid_in_dom(page, entry['query_selector'])
+
+    dom_changes_detected=None
+    def detect_dom_changes(changes:str): # type: ignore
+        nonlocal dom_changes_detected
+        dom_changes_detected = changes # type: ignore
+
+    subscribe(detect_dom_changes)
+    watch_page_activity(page)
+
+    started = time.monotonic()
+    outcomes = await fill_fields_in_one_round_trip(page, entries)
+    results: List[dict[str, str]] = []  # noqa: UP006
+    typed = 0
+    for entry, outcome in zip(entries, outcomes, strict=True):
         query_selector = entry['query_selector']
         text_to_enter = entry['text']
-        logger.info(f"Entering text: {text_to_enter} in element with selector: {query_selector}")
-        result = await entertext(EnterTextEntry(query_selector=query_selector, text=text_to_enter))
-
+        if outcome['performed']:
+            result = f"Success. Text \"{text_to_enter}\" set successfully in the element with selector {query_selector} and outer HTML: {outcome['opening_tag']}."
+        elif outcome.get('typeable'):
+            logger.info(f"Typing {text_to_enter} in element with selector {query_selector}, its value could not be set: {outcome['reason']}")
+            result = (await do_entertext(page, query_selector, text_to_enter))["detailed_message"]
+            typed += 1
+        else:
+            result = f"Error: Unable to enter text in selector {query_selector}, the element is {outcome['reason']}."
         results.append({"query_selector": query_selector, "result": result})
+    logger.info(f"Entered text in {len(entries)} fields in {time.monotonic() - started:.2f} seconds, {typed} of them typed into")
+
+    # Waits for the validation or suggestions the form may load, the mutation observer has reported the changes once the page settled
+    waited, settled = await wait_for_page_to_settle(page)
+    logger.info(f"Waited {waited:.2f} seconds for the page to settle after entering text in {len(entries)} fields")
+    unsubscribe(detect_dom_changes)
+
+    await browser_manager.take_screenshots(f"{function_name}_end", page)
+    await browser_manager.notify_user(f"Entered text in {len(entries)} fields", message_type=MessageType.ACTION)
 
-    return str(results)
+    text = f"{results} {describe_settle_wait(waited, settled)}"
+    if dom_changes_detected:
+        text += f"\n As a consequence of this action, new elements have appeared in view: {dom_changes_detected}. This means that the action of entering text is not yet executed and needs further interaction. Get all_fields DOM to complete the interaction."
+    screenshot_msg = await screenshot_page(page, "bulk_enter_text")
+    return [
+        {"type": "text", "text": text},
+        screenshot_msg,
+    ]
@@ -0,0 +1,79 @@
+from typing import Annotated
+from typing import Any
+
+from ae.core.playwright_manager import PlaywrightManager
+from ae.utils.cdp_accessibility_tree import get_list_items_over_cdp
+from ae.utils.logger import logger
+
+# Lists the options of a select, or the items of a listbox or list, that contain the filter text, from the offset on.
+# Only the requested items are described.
+__LIST_ITEMS_JS = """
+(params) => {
+    const element = document.querySelector(`[mmid="${params.mmid}"]`);
+    if (!element) return null;
+    const is_select = element.tagName.toLowerCase() === 'select';
+    let items = Array.from(is_select ? element.options : element.children);
+    const text_of = item => is_select ? item.text : (item.innerText || item.textContent || '').replace(/\\s+/g, ' ').trim();
+    if (params.filter) {
+        const needle = params.filter.toLowerCase();
+        items = items.filter(item => text_of(item).toLowerCase().includes(needle)
+                                     || (item.getAttribute('value') || '').toLowerCase().includes(needle)
+                                     || (item.getAttribute('aria-label') || '').toLowerCase().includes(needle));
+    }
+    const describe = item => {
+        if (is_select) {
+            return {"mmid": item.getAttribute('mmid'), "text": item.text, "value": item.value, "selected": item.selected};
+        }
+        const item_attributes = {};
+        for (const attribute of ['mmid', 'role', 'aria-label', 'value']) {
+            if (item.hasAttribute(attribute)) item_attributes[attribute] = item.getAttribute(attribute);
+        }
+        item_attributes["text"] = text_of(item);
+        return item_attributes;
+    };
+    return {total: items.length, items: items.slice(params.offset, params.offset + params.limit).map(describe)};
+}
+"""
+
+
+async def expand_list(mmid: Annotated[str, "The mmid of the select, listbox or list to expand, e.g. 114"],
+                      offset: Annotated[int, "The index of the first item to return, among the items matching the filter"] = 0,
+                      limit: Annotated[int, "The maximum number of items to return"] = 50,
+                      filter: Annotated[str | None, "Only return the items whose text, value or label contains this text, ignoring case"] = None # noqa: A002
+                      ) -> Annotated[str, "The items of the list, along with their total count and the offset of the next items."]:
+    """
+    Lists the options of a select, or the items of a listbox or list, beyond the first ones given in the DOM snapshots.
+    Snapshots only describe the first items of long lists, along with their total count ('options_total' or 'additional_info_total').
+
+    Parameters:
+    - mmid: The mmid of the list, as given in the snapshot.
+    - offset: The index of the first item to return, among the items matching the filter.
+    - limit: The maximum number of items to return.
+    - filter: If given, only the items whose text, value or label contains it (ignoring case) are returned, e.g. 'united' for
+      the United Kingdom and the United States in a country select.
+
+    Returns:
+    - The items, the number of items matching the filter ('total') and the offset to pass to get the next items ('next_offset',
+      None when there are no more).
+    """
+    logger.info(f"Expanding list {mmid} from offset {offset}, limit {limit}, filter: {filter}")
+    browser_manager = PlaywrightManager(browser_type='chromium', headless=False)
+    page = await browser_manager.get_current_page()
+    if page is None: # type: ignore
+        raise ValueError('No active page found. OpenURL command opens a new page.')
+    offset = max(offset, 0)
+    limit = max(limit, 1)
+
+    items = await get_list_items_over_cdp(page, mmid)
+    if items is None:
+        result: dict[str, Any] | None = await page.evaluate(__LIST_ITEMS_JS, {"mmid": mmid, "offset": offset, "limit": limit, "filter": filter})
+        if result is None:
+            return f"No list found with mmid {mmid}. Get the DOM again, the page may have changed."
+    else:
+        if filter:
+            needle = filter.lower()
+            items = [item for item in items if any(needle in str(item.get(key) or '').lower() for key in ('text', 'value', 'aria-label'))]
+        result = {"total": len(items), "items": items[offset:offset + limit]}
+
+    next_offset = offset + limit if offset + limit < result['total'] else None
+    return str({"mmid": mmid, "total": result['total'], "offset": offset, "next_offset": next_offset, "items": result['items']})
@@ -0,0 +1,132 @@
+import csv
+import io
+from typing import Annotated
+from typing import Any
+
+from ae.core.playwright_manager import PlaywrightManager
+from ae.utils.dom_helper import wait_for_non_loading_dom_state
+from ae.utils.logger import logger
+
+# Maximum number of characters of a cell
+MAX_CELL_CHARS = 200
+
+# Finds the rendered HTML tables and ARIA tables and grids of the page, in document order. Without a table index, describes every
+# table: its caption, column headers and number of rows. With one, returns the header and the text of the rows of that table from
+# the offset on, so that only the requested rows are read and sent back.
+__TABLES_JS = """
+(params) => {
+    const tableSelector = 'table, [role="table"], [role="grid"], [role="treegrid"]';
+    const cellSelector = '[role="cell"], [role="gridcell"], [role="columnheader"], [role="rowheader"]';
+    const tables = Array.from(document.querySelectorAll(tableSelector)).filter(table =>
+        !['presentation', 'none'].includes(table.getAttribute('role')) && (!table.checkVisibility || table.checkVisibility()));
+
+    const isHtml = table => table.tagName === 'TABLE' && !table.hasAttribute('role');
+    const rowsOf = table => isHtml(table) ? Array.from(table.rows)
+        : Array.from(table.querySelectorAll('[role="row"]')).filter(row => row.closest(tableSelector) === table);
+    const cellsOf = row => row.tagName === 'TR' ? Array.from(row.cells)
+        : Array.from(row.querySelectorAll(cellSelector)).filter(cell => cell.closest('[role="row"]') === row);
+    const isHeaderCell = cell => cell.tagName === 'TH' || cell.getAttribute('role') === 'columnheader';
+    const textOf = cell => (cell.textContent || '').replace(/\\s+/g, ' ').trim().slice(0, params.maxCellChars);
+    // Cells spanning several columns are followed by empty cells, so that the values stay under their column
+    const valuesOf = row => cellsOf(row).flatMap(cell => [textOf(cell), ...Array(Math.max((cell.colSpan || 1) - 1, 0)).fill('')]);
+
+    const split = table => {
+        const rows = rowsOf(table);
+        let headerRows = 0;
+        if (isHtml(table) && table.tHead) headerRows = table.tHead.rows.length;
+        else if (rows.length && cellsOf(rows[0]).length && cellsOf(rows[0]).every(isHeaderCell)) headerRows = 1;
+        return {header: headerRows ? valuesOf(rows[headerRows - 1]) : [], rows: rows.slice(headerRows)};
+    };
+    const captionOf = table => {
+        const labelledBy = table.getAttribute('aria-labelledby');
+        const label = labelledBy && document.getElementById(labelledBy.split(' ')[0]);
+        return ((table.caption && table.caption.textContent) || table.getAttribute('aria-label') || (label && label.textContent) || '')
+            .replace(/\\s+/g, ' ').trim();
+    };
+
+    if (params.table === null) {
+        return {tables: tables.map((table, index) => {
+            const {header, rows} = split(table);
+            const description = {table: index, caption: captionOf(table), columns: header, rows: rows.length};
+            if (table.hasAttribute('mmid')) description.mmid = table.getAttribute('mmid');
+            return description;
+        })};
+    }
+    const table = tables[params.table];
+    if (!table) return null;
+    const {header, rows} = split(table);
+    return {header: header, total: rows.length, rows: rows.slice(params.offset, params.offset + params.limit).map(valuesOf)};
+}
+"""
+
+
+def __as_csv(header: list[str], rows: list[list[str]]) -> str:
+    output = io.StringIO()
+    writer = csv.writer(output, lineterminator='\n')
+    if header:
+        writer.writerow(header)
+    writer.writerows(rows)
+    return output.getvalue()
+
+
+def __as_columns(header: list[str], rows: list[list[str]]) -> dict[str, list[str]]:
+    """
+    Turns the rows into one list of values per column, keyed by the column header (or its position when there is none).
+    Short rows are padded with empty values.
+    """
+    width = max([len(header)] + [len(row) for row in rows])
+    names = [header[column] if column < len(header) and header[column] else str(column) for column in range(width)]
+    columns: dict[str, list[str]] = {}
+    for column, name in enumerate(names):
+        while name in columns:
+            name = f"{name}_{column}"
+        columns[name] = [row[column] if column < len(row) else '' for row in rows]
+    return columns
+
+
+async def extract_tables(table: Annotated[int | None, "The index of the table to read, as listed when called without it. If not given, lists the tables of the page"] = None,
+                         offset: Annotated[int, "The index of the first row to return, the header row excluded"] = 0,
+                         limit: Annotated[int, "The maximum number of rows to return"] = 200,
+                         output_format: Annotated[str, "'csv' for comma separated rows, or 'columns' for one list of values per column"] = "csv"
+                         ) -> Annotated[str, "The tables of the page, or the rows of a table along with the offset of the next rows."]:
+    """
+    Reads the data tables of the current page (HTML tables and ARIA tables and grids) row by row, instead of their text or DOM.
+
+    Called without a table, lists the tables of the page: their index, caption, column headers, number of rows and mmid if any.
+    Called with a table index, returns the rows from the offset on, at most limit of them, and the offset of the next rows. Only
+    the requested rows are read from the page, so a table of thousands of rows can be read in chunks.
+
+    Parameters:
+    - table: The index of the table, as listed.
+    - offset: The index of the first row to return, the header row excluded.
+    - limit: The maximum number of rows to return.
+    - output_format: 'csv' for the header and the rows as CSV, 'columns' for one list of values per column.
+
+    Returns:
+    - The list of tables, or the rows of the table, the number of rows ('total') and the offset to pass to get the next rows
+      ('next_offset', None when there are no more).
+    """
+    logger.info(f"Extracting table {table} from row {offset}, limit {limit}, as {output_format}")
+    if output_format not in ('csv', 'columns'):
+        raise ValueError(f"Unsupported output_format: {output_format}")
+    browser_manager = PlaywrightManager(browser_type='chromium', headless=False)
+    page = await browser_manager.get_current_page()
+    if page is None: # type: ignore
+        raise ValueError('No active page found. OpenURL command opens a new page.')
+    offset = max(offset, 0)
+    limit = max(limit, 1)
+
+    await wait_for_non_loading_dom_state(page, 4000)
+    result: dict[str, Any] | None = await page.evaluate(__TABLES_JS, {"table": table, "offset": offset, "limit": limit, "maxCellChars": MAX_CELL_CHARS})
+    if result is None:
+        return f"No table {table} on the page. Call extract_tables without a table to list them, the page may have changed."
+    if table is None:
+        if not result['tables']:
+            return "There is no table on the page."
+        return str(result)
+
+    next_offset = offset + limit if offset + limit < result['total'] else None
+    summary = {"table": table, "total": result['total'], "offset": offset, "next_offset": next_offset}
+    if output_format == 'columns':
+        return str({**summary, "columns": __as_columns(result['header'], result['rows'])})
+    return f"{summary}\n{__as_csv(result['header'], result['rows'])}"
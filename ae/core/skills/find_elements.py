@@ -0,0 +1,104 @@
+import weakref
+from typing import Annotated
+from typing import Any
+
+from playwright.async_api import Page
+
+from ae.core.playwright_manager import PlaywrightManager
+from ae.utils.dom_helper import wait_for_non_loading_dom_state
+from ae.utils.dom_search_index import ElementIndex
+from ae.utils.dom_search_index import top_elements
+from ae.utils.dom_serializer import serialize_tree_compact
+from ae.utils.dom_snapshot_cache import get_accessibility_info_cached
+from ae.utils.logger import logger
+
+# Maximum length of the values written for each element
+MAX_VALUE_LENGTH = 80
+
+# Index of the last all fields tree of each page. The snapshot cache returns the same tree while the page does not change,
+# so the index is rebuilt only when a new snapshot was extracted.
+_page_indexes: "weakref.WeakKeyDictionary[Page, tuple[dict[str, Any], ElementIndex]]" = weakref.WeakKeyDictionary()
+
+
+def __shorten(value: Any) -> Any:
+    if isinstance(value, str) and len(value) > MAX_VALUE_LENGTH:
+        return value[:MAX_VALUE_LENGTH - 3] + "..."
+    return value
+
+
+def __element_summary(element: dict[str, Any]) -> dict[str, Any]:
+    """
+    The fields of an element for one short line: long values are cut, lists (e.g. options) are replaced by their length,
+    and the text of the descendants without an mmid is added when the element has no name nor text of its own.
+    """
+    summary: dict[str, Any] = {}
+    for key, value in element.items():
+        if key == 'children':
+            continue
+        summary[key] = len(value) if isinstance(value, list) else __shorten(value)
+
+    if not summary.get('name') and not summary.get('text'):
+        texts: list[str] = []
+        stack = list(reversed(element.get('children', [])))
+        while stack:
+            node = stack.pop()
+            if 'mmid' in node:
+                continue
+            if node.get('role') == 'text' and node.get('name'):
+                texts.append(node['name'])
+            stack.extend(reversed(node.get('children', [])))
+        if texts:
+            summary['text'] = __shorten(' '.join(texts))
+    return summary
+
+
+def __get_index(page: Page, tree: dict[str, Any]) -> ElementIndex:
+    cached = _page_indexes.get(page)
+    if cached is not None and cached[0] is tree:
+        return cached[1]
+    index = ElementIndex(tree)
+    _page_indexes[page] = (tree, index)
+    logger.debug(f"Indexed {len(index.elements)} elements and {len(index.postings)} terms of {page.url}")
+    return index
+
+
+async def find_elements(query: Annotated[str, "What to look for, e.g. 'search button', 'departure city' or 'add to cart'"],
+                        k: Annotated[int, "The number of elements to return"] = 10
+                        ) -> Annotated[str, "The elements that best match the query, one per line, with their mmid and the element they are in."]:
+    """
+    Finds the elements of the current page that best match a query, without returning the whole DOM.
+
+    The elements of the all fields snapshot are indexed by the words of their names, labels, placeholders and text, and ranked
+    with BM25 against the query. The index is kept for the snapshot and rebuilt only when the page changes.
+
+    Parameters:
+    - query: What to look for, in words that would appear on or around the element.
+    - k: The number of elements to return.
+
+    Returns:
+    - One line per element, best first: its mmid, tag, name and attributes, and the closest element it is in.
+    """
+    logger.info(f"Finding the elements matching '{query}'")
+    browser_manager = PlaywrightManager(browser_type='chromium', headless=False)
+    page = await browser_manager.get_current_page()
+    if page is None: # type: ignore
+        raise ValueError('No active page found. OpenURL command opens a new page.')
+
+    await wait_for_non_loading_dom_state(page, 4000)
+    tree, _ = await get_accessibility_info_cached(page, only_input_fields=False)
+    if tree is None:
+        return "Could not get the elements of the page. Please consider trying get_dom_with_content_type with content_type all_fields."
+
+    index = __get_index(page, tree)
+    scores = index.scores(query)
+    if not scores:
+        return f"No element matches '{query}'. Try other words, or get_dom_with_content_type."
+
+    lines = [f"{min(k, len(scores))} best of {len(scores)} elements matching '{query}':"]
+    for element in top_elements(scores, k):
+        line = serialize_tree_compact(__element_summary(index.elements[element]))
+        parent = index.parents[element]
+        if parent is not None:
+            line += f"  (in {serialize_tree_compact(__element_summary(index.elements[parent]))})"
+        lines.append(line)
+    return '\n'.join(lines)
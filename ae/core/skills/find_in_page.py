@@ -0,0 +1,73 @@
+import os
+import weakref
+from typing import Annotated
+from typing import Any
+
+from playwright.async_api import Page
+
+from ae.core.playwright_manager import PlaywrightManager
+from ae.utils.dom_helper import get_dom_fingerprint
+from ae.utils.dom_helper import wait_for_non_loading_dom_state
+from ae.utils.dom_search_index import PassageIndex
+from ae.utils.dom_search_index import top_elements
+from ae.utils.logger import logger
+from ae.utils.page_markdown import get_page_markdown
+
+# Maximum number of characters of a passage of the page text
+FIND_IN_PAGE_PASSAGE_CHARS = int(os.getenv("FIND_IN_PAGE_PASSAGE_CHARS", 800))
+
+# Passage index of the text of each page, along with the document id, URL and mutation epoch of the page it was built for
+_page_indexes: "weakref.WeakKeyDictionary[Page, tuple[tuple[Any, ...], PassageIndex]]" = weakref.WeakKeyDictionary()
+
+
+async def __get_index(page: Page) -> PassageIndex:
+    fingerprint = await get_dom_fingerprint(page)
+    page_fingerprint = (fingerprint['document_id'], fingerprint['url'], fingerprint['epoch'])
+    cached = _page_indexes.get(page)
+    if cached is not None and cached[0] == page_fingerprint:
+        logger.debug(f"Reusing the passage index of {page.url}")
+        return cached[1]
+
+    text_content = await get_page_markdown(page)
+    index = PassageIndex(text_content, FIND_IN_PAGE_PASSAGE_CHARS)
+    _page_indexes[page] = (page_fingerprint, index)
+    logger.debug(f"Indexed {len(index.passages)} passages and {len(index.postings)} terms of {page.url}")
+    return index
+
+
+async def find_in_page(query: Annotated[str, "What to look for in the text of the page, e.g. 'refund policy for damaged items'"],
+                       k: Annotated[int, "The number of passages to return"] = 5
+                       ) -> Annotated[str, "The passages of the page text that best match the query."]:
+    """
+    Finds the passages of the text of the current page that best match a query, instead of reading the whole text.
+
+    The Markdown text of the page is split into passages of about FIND_IN_PAGE_PASSAGE_CHARS characters, indexed locally and
+    ranked with BM25 against the query. The index is kept while the DOM of the page does not change. This is the text
+    get_dom_with_content_type returns for text_only with suppress_boilerplate false: the headers, navigation menus and footers
+    that text_only replaces by a reference on the other pages of a site are searched too. The passages carry no mmid, to act
+    on the elements of a passage get_dom_with_content_type is called for all_fields with a focus on it.
+
+    Parameters:
+    - query: What to look for, in words that would appear in the passage.
+    - k: The number of passages to return.
+
+    Returns:
+    - The best passages, best first, and the number of passages matching the query.
+    """
+    logger.info(f"Finding the passages of the page matching '{query}'")
+    browser_manager = PlaywrightManager(browser_type='chromium', headless=False)
+    page = await browser_manager.get_current_page()
+    if page is None: # type: ignore
+        raise ValueError('No active page found. OpenURL command opens a new page.')
+
+    await wait_for_non_loading_dom_state(page, 4000)
+    index = await __get_index(page)
+    scores = index.scores(query)
+    if not scores:
+        return f"No passage of the page matches '{query}'. Try other words, or get_dom_with_content_type with content_type text_only and suppress_boilerplate false."
+
+    passages: list[str] = []
+    for passage in top_elements(scores, k):
+        start, end = index.passages[passage]
+        passages.append(index.text[start:end].strip())
+    return str({"query": query, "passages_matched": len(scores), "passages": passages})
@@ -2,51 +2,42 @@ import os
 import time
 from typing import Annotated
 from typing import Any
-import tempfile
-import json
 
 from playwright.async_api import Page
 
 from ae.config import SOURCE_LOG_FOLDER_PATH
 from ae.core.playwright_manager import PlaywrightManager
+from ae.server.tool_output_pager import CHARS_PER_TOKEN
+from ae.server.tool_output_pager import PAGE_NOTE_RESERVE
+from ae.server.tool_output_pager import get_tool_output_token_budget
+from ae.utils.boilerplate_memo import BOILERPLATE_SUPPRESSION_ENABLED
+from ae.utils.boilerplate_memo import BoilerplateMemo
+from ae.utils.boilerplate_memo import get_boilerplate_memo
+from ae.utils.boilerplate_memo import suppress_repeated_text_blocks
+from ae.utils.boilerplate_memo import suppress_repeated_tree_blocks
 from ae.utils.dom_helper import wait_for_non_loading_dom_state
-from ae.utils.get_detailed_accessibility_tree import do_get_accessibility_info
+from ae.utils.dom_focus import FOCUS_TOP_K
+from ae.utils.dom_focus import focus_tree
+from ae.utils.dom_repeated_structures import collapse_repeated_structures
+from ae.utils.dom_scope import DomScope
+from ae.utils.dom_serializer import serialize_dom_output_compact
+from ae.utils.dom_snapshot_cache import get_accessibility_info_cached
+from ae.utils.dom_snapshot_store import diff_snapshots
+from ae.utils.dom_snapshot_store import record_snapshot
 from ae.utils.logger import logger
+from ae.utils.page_digest import get_page_digest
 from ae.utils.ui_messagetype import MessageType
 
 
-def truncate_fields(fields: dict[str, Any], url: str = "") -> dict[str, Any] | str:
-    # this should only happen in extreme cases
-    n_chars = len(str(fields))
-    #if n_chars > 40_000: ## wikipedia gets truncated at 40k
-    if n_chars > 100_000:
-        outfile = tempfile.mktemp(prefix='page-dom-content-', suffix=".json")
-        with open(outfile, 'w+', encoding='utf-8') as f:
-            json.dump(fields, f, indent=2)
-
-        logger.warning(f"DOM content was too large to display for {url}, saved to {outfile}, n_chars: {n_chars}")
-
-        msg = f"""The page DOM was too large to display, so it was saved to this JSON file: {outfile}
-
-A preview of the DOM content is shown below:
-
-{json.dumps(fields, indent=2)[:1000]}...
-        
-To analyze the full text content, use your `python_interpreter` tool to read the file contents using:
-
-```
-import json
-with open('{outfile}', 'r') as f:
-    dom_content = json.load(f)
-```
-"""
-        return msg
-    else:
-        return fields
-
-
 async def get_dom_with_content_type(
-    content_type: Annotated[str, "The type of content to extract: 'text_only': Extracts the innerText of the highest element in the document and responds with text, or 'input_fields': Extracts the text input and button elements in the dom."]
+    content_type: Annotated[str, "The type of content to extract: 'text_only': Extracts the rendered text of the page as Markdown, or 'input_fields': Extracts the text input and button elements in the dom."],
+    delta: Annotated[bool, "If true, only return the elements added, removed or changed since the previous snapshot of the same content type on the same page. Ignored for 'text_only'."] = False,
+    scope: Annotated[str | None, "Restricts 'all_fields' and 'input_fields' to part of the page: 'viewport', 'viewport+N' (N more screens below the viewport), the next_cursor returned by a previous call, or a container query selector or mmid. Ignored for 'text_only'."] = None,
+    output_format: Annotated[str, "How 'all_fields' and 'input_fields' are written: 'json' for the nested JSON object, or 'compact' for one element per line, e.g. [114] button \"Search\" placeholder=\"Search the site\"."] = "json",
+    collapse_repeated: Annotated[bool, "If true, runs of sibling elements with the same structure (e.g. search results or product cards) in 'all_fields' and 'input_fields' are written once as the fields they share plus one row of varying fields (including the mmids) per element."] = False,
+    focus: Annotated[str | None, "The goal of the next step, e.g. 'click the search button'. If given, 'all_fields' and 'input_fields' only return the elements most relevant to it, along with their ancestors."] = None,
+    focus_top_k: Annotated[int, "The number of elements returned when focus is given."] = FOCUS_TOP_K,
+    suppress_boilerplate: Annotated[bool | None, "If true, the headers, navigation menus, footers and cookie banners already returned for another page of the same site are replaced by a short reference. Defaults to true for 'text_only' and false for 'all_fields' and 'input_fields'. Set it to false to read them again."] = None
     ) -> Annotated[dict[str, Any] | str | None, "The output based on the specified content type."]:
     """
     Retrieves and processes the DOM of the active page in a browser instance based on the specified content type.
@@ -55,16 +46,54 @@ async def get_dom_with_content_type(
     ----------
     content_type : str
         The type of content to extract. Possible values are:
-        - 'text_only': Extracts the innerText of the highest element in the document and responds with text.
+        - 'text_only': Extracts the rendered text of the page as Markdown (headings, lists, tables, link and image alt texts).
         - 'input_fields': Extracts the text input and button elements in the DOM and responds with a JSON object.
         - 'all_fields': Extracts all the fields in the DOM and responds with a JSON object.
+    delta : bool
+        If True, for 'all_fields' and 'input_fields', only the nodes added, removed or changed since the previous snapshot
+        of the same content type and document are returned, along with the snapshot versions they were computed between.
+        The full tree is returned if there is no previous snapshot to compare against. Defaults to False.
+    scope : str | None
+        If given, for 'all_fields' and 'input_fields', only the rendered elements inside this part of the page are extracted:
+        - 'viewport' or 'viewport+N': the visible screen, plus N screens below it. 'viewport+N@Y' starts the region at offset Y.
+        - A container query selector or mmid: the rendered elements of that container.
+        The tree is returned along with the resolved region and a next_cursor, the scope to pass to get the region below.
+        Defaults to None (the whole page).
+    output_format : str
+        How 'all_fields' and 'input_fields' are serialized:
+        - 'json': the nested JSON object.
+        - 'compact': one indented line per element, e.g. [114] button "Search" placeholder="Search the site", which keeps
+          the hierarchy and the order of the elements with a fraction of the tokens.
+        Defaults to 'json'.
+    collapse_repeated : bool
+        If True, for 'all_fields' and 'input_fields', runs of sibling subtrees with the same shape are written once as
+        their common fields, the names of the varying fields and one row of values per subtree. Every mmid is kept.
+        Defaults to False.
+    focus : str | None
+        If given, for 'all_fields' and 'input_fields', the elements are ranked against this goal (e.g. 'enter departure city')
+        with a local lexical scorer and only the focus_top_k best ones are returned, along with their ancestors. The whole tree
+        is returned if no element matches. Ignored for the changes returned in delta mode. Defaults to None.
+    focus_top_k : int
+        The number of elements returned when focus is given. Defaults to FOCUS_TOP_K.
+    suppress_boilerplate : bool | None
+        If True, the landmark blocks (headers, navigation menus, footers, asides, dialogs and, in 'text_only', cookie banners)
+        already returned during the session for another page of the same domain are replaced by a reference to that page.
+        Only applies to 'text_only' and to whole page, non delta and non focused 'all_fields' and 'input_fields' extractions.
+        A block of 'text_only' only counts as returned if it is within the first page of the output. The blocks are forgotten
+        when the browser is reset and when a new task starts. Disabled for every call with BOILERPLATE_SUPPRESSION_ENABLED=false.
+        Defaults to None: True for 'text_only', False for 'all_fields' and 'input_fields', whose mmids are needed to act.
+
+    While the DOM of the page does not change, 'all_fields' and 'input_fields' reuse the previous extraction of the same scope.
+    'input_fields' is derived from a previous 'all_fields' extraction only with ACCESSIBILITY_TREE_BACKEND=cdp, where the input
+    fields are collected from the enriched tree. With the default inject backend, 'input_fields' goes through the fast path and
+    is extracted on its own, as the fast path names and filters the fields differently (see get_accessibility_info_cached).
 
     Returns
     -------
     dict[str, Any] | str | None
         The processed content based on the specified content type. This could be:
         - A JSON object for 'input_fields' with just inputs.
-        - Plain text for 'text_only'.
+        - Markdown text for 'text_only'.
         - A minified DOM represented as a JSON object for 'all_fields'.
 
     Raises
@@ -74,6 +103,8 @@ async def get_dom_with_content_type(
     """
 
     logger.info(f"Executing Get DOM Command based on content_type: {content_type}")
+    if output_format not in ('json', 'compact'):
+        raise ValueError(f"Unsupported output_format: {output_format}")
     start_time = time.time()
     # Create and use the PlaywrightManager
     browser_manager = PlaywrightManager(browser_type='chromium', headless=False)
@@ -82,46 +113,49 @@ async def get_dom_with_content_type(
         raise ValueError('No active page found. OpenURL command opens a new page.')
 
     extracted_data = None
+    dom_scope = DomScope(scope) if scope and content_type != 'text_only' else None
+    # Scoped snapshots are versioned apart from the whole page ones, a delta is only meaningful against the same scope
+    snapshot_type = content_type if dom_scope is None else f"{content_type}[{scope}]"
     await wait_for_non_loading_dom_state(page, 4000) # wait for the DOM to be ready, non loading means external resources do not need to be loaded
     user_success_message = ""
+    if suppress_boilerplate is None:
+        suppress_boilerplate = content_type == 'text_only'
+    suppress_boilerplate = suppress_boilerplate and BOILERPLATE_SUPPRESSION_ENABLED
     if content_type == 'all_fields':
         user_success_message = "Fetched all the fields in the DOM"
-        extracted_data = await do_get_accessibility_info(page, only_input_fields=False)
-        extracted_data = truncate_fields(extracted_data)
+        extracted_data, dom_scope = await get_accessibility_info_cached(page, only_input_fields=False, dom_scope=dom_scope)
+        extracted_data = await versioned_snapshot(page, snapshot_type, extracted_data, delta)
+        if suppress_boilerplate and not delta and dom_scope is None and not focus:
+            extracted_data = with_boilerplate_suppressed(get_boilerplate_memo(page), page.url, extracted_data)
+        extracted_data = with_focus(extracted_data, focus, focus_top_k, delta)
+        if collapse_repeated:
+            extracted_data = with_repeated_structures_collapsed(extracted_data, wrapped=delta or bool(focus))
+        extracted_data = with_scope_summary(extracted_data, dom_scope, wrapped=delta or bool(focus))
     elif content_type == 'input_fields':
         logger.debug('Fetching DOM for input_fields')
-        extracted_data = await do_get_accessibility_info(page, only_input_fields=True)
+        extracted_data, dom_scope = await get_accessibility_info_cached(page, only_input_fields=True, dom_scope=dom_scope)
         if extracted_data is None:
             return "Could not fetch input fields. Please consider trying with content_type all_fields."
-        extracted_data = truncate_fields(extracted_data)
+        extracted_data = await versioned_snapshot(page, snapshot_type, extracted_data, delta)
+        if suppress_boilerplate and not delta and dom_scope is None and not focus:
+            extracted_data = with_boilerplate_suppressed(get_boilerplate_memo(page), page.url, extracted_data)
+        extracted_data = with_focus(extracted_data, focus, focus_top_k, delta)
+        if collapse_repeated:
+            extracted_data = with_repeated_structures_collapsed(extracted_data, wrapped=delta or bool(focus))
+        extracted_data = with_scope_summary(extracted_data, dom_scope, wrapped=delta or bool(focus))
         user_success_message = "Fetched only input fields in the DOM"
     elif content_type == 'text_only':
         # Extract text from the body or the highest-level element
         logger.debug('Fetching DOM for text_only')
-        text_content = await get_filtered_text_content(page)
+        digest = await get_page_digest(page)
         with open(os.path.join(SOURCE_LOG_FOLDER_PATH, 'text_only_dom.txt'), 'w',  encoding='utf-8') as f:
-            f.write(text_content)
-        extracted_data = str(text_content)
-
-        if len(extracted_data) > 20_000: # 20k ~= 7000 tokens
-            # save to a text file
-            outfile = tempfile.mktemp(prefix='page-text-content-', suffix=".txt")
-            with open(outfile, 'w+', encoding='utf-8') as f:
-                f.write(extracted_data)
-            extracted_data = f"""The page text was too large to display, so it was saved to this text file: {outfile}
-
-A preview of the text content is shown below:
-
-{extracted_data[:1000]}...
-
-To analyze the full text content, use your `python_interpreter` tool to read the file contents."""
-
-        video_urls = await get_video_urls(page)
-        pdf_urls = await get_pdf_urls(page)
-        #img_urls = await get_image_alt_urls(page)
-        extracted_data += f"\n\nThis is the list of video URLs on the page in the order they appear: {str(video_urls)}"
-        extracted_data += f"\n\nThis is the list of PDF URLs on the page in the order they appear: {str(pdf_urls)}"
-        #extracted_data += f"\n\nThese are the images along with their alt tags found on the page: {str(img_urls)}"
+            f.write(digest['text'])
+        if suppress_boilerplate:
+            # The text comes first in the output, the blocks beyond its first page are not delivered by this call
+            first_page_chars = get_tool_output_token_budget("get_dom_with_content_type") * CHARS_PER_TOKEN - PAGE_NOTE_RESERVE
+            digest['text'], _ = suppress_repeated_text_blocks(get_boilerplate_memo(page), page.url, digest['text'], digest['blocks'],
+                                                              delivered_chars=first_page_chars)
+        extracted_data = digest_as_text(digest)
 
         user_success_message = "Fetched the text content of the DOM"
     else:
@@ -130,109 +164,111 @@ To analyze the full text content, use your `python_interpreter` tool to read the
     elapsed_time = time.time() - start_time
     logger.info(f"Get DOM Command executed in {elapsed_time} seconds")
     await browser_manager.notify_user(user_success_message, message_type=MessageType.ACTION)
+    if output_format == 'compact' and isinstance(extracted_data, dict):
+        return serialize_dom_output_compact(extracted_data)
     return str(extracted_data) # case to string for DOM JSON
 
 
-async def get_filtered_text_content(page: Page) -> str:
-    text_content = await page.evaluate("""
-        () => {
-            // Array of query selectors to filter out
-            const selectorsToFilter = ['#agente-overlay'];
-
-            // Store the original visibility values to revert later
-            const originalStyles = [];
-
-            // Hide the elements matching the query selectors
-            selectorsToFilter.forEach(selector => {
-                const elements = document.querySelectorAll(selector);
-                elements.forEach(element => {
-                    originalStyles.push({ element: element, originalStyle: element.style.visibility });
-                    element.style.visibility = 'hidden';
-                });
-            });
-
-            // Get the text content of the page
-            let textContent = document?.body?.innerText || document?.documentElement?.innerText || "";
-
-            // Get all the alt text from images on the page
-            let altTexts = Array.from(document.querySelectorAll('img')).map(img => img.alt);
-            altTexts="Other Alt Texts in the page: " + altTexts.join(' ');
-
-            // Revert the visibility changes
-            originalStyles.forEach(entry => {
-                entry.element.style.visibility = entry.originalStyle;
-            });
-            textContent=textContent+" "+altTexts;
-            return textContent;
-        }
-    """)
-    return text_content
-
-
-def ordered_unique_urls(urls: list):
-    if not isinstance(urls, list):
-        logger.warning(f"Expected a list of URLs, but got {type(urls)}")
-        return []
-
-    # Filter out empty entries
-    urls = [url for url in urls if url]
-
-    # Deduplicate while preserving order
-    seen = set()
-    unique_urls = []
-    for url in urls:
-        if url not in seen:
-            unique_urls.append(url)
-            seen.add(url)
-    return unique_urls
-
-
-async def get_video_urls(page: Page) -> list[str]:
-    urls = await page.evaluate("""
-    () => {
-        return Array.from(
-            document.querySelectorAll(
-                // Grab elements that have src containing .gif, .mp4, .mov
-                'img[src*=".gif"], img[src*=".GIF"], ' +
-                'video[src*=".mp4"], video[src*=".MP4"], video[src*=".mov"], video[src*=".MOV"], ' +
-                'source[src*=".mp4"], source[src*=".MP4"], source[src*=".mov"], source[src*=".MOV"]'
-            ),
-            el => el.src
-        );
-    }
-    """)
-    return ordered_unique_urls(urls)
-
-
-async def get_pdf_urls(page: Page) -> list[str]:
-    urls = await page.evaluate("""
-    () => {
-      return Array.from(
-        document.querySelectorAll('a[href*=".pdf"], a[href*=".PDF"], img[src*=".pdf"], img[src*=".PDF"]'),
-        el => {
-          if (el.tagName.toLowerCase() === 'a') {
-            return el.href;
-          } else if (el.tagName.toLowerCase() === 'img') {
-            return el.src;
-          }
-          return '';
-        }
-      );
-    }
-    """)
-    return ordered_unique_urls(urls)
-
-
-async def get_image_alt_urls(page: Page) -> list[dict]:
-    images = await page.evaluate("""
-    () => {
-        // Select all image elements on the page
-        const imgs = document.querySelectorAll('img');
-        // Map each image to an object containing its alt text and source URL
-        return Array.from(imgs, img => ({
-            alt: img.alt,
-            url: img.src
-        }));
-    }
-    """)
-    return images
\ No newline at end of file
+async def versioned_snapshot(page: Page, content_type: str, tree: dict[str, Any] | None, delta: bool) -> dict[str, Any] | None:
+    """
+    Records the enriched tree as the latest snapshot of the page. In delta mode, returns only what changed since the
+    previous snapshot of the same content type and document, keyed by snapshot version.
+
+    Args:
+        page (Page): The page the tree was captured from.
+        content_type (str): The content type of the snapshot.
+        tree (dict[str, Any] | None): The enriched accessibility tree.
+        delta (bool): Whether to return the difference with the previous snapshot instead of the tree.
+
+    Returns:
+        dict[str, Any] | None: The tree itself when not in delta mode, otherwise the versioned full tree or difference.
+    """
+    if tree is None:
+        return None
+    version, base_version, base_tree = await record_snapshot(page, content_type, tree)
+    if not delta:
+        return tree
+    if base_tree is None:
+        logger.debug(f"No previous {content_type} snapshot of this document, returning the full tree as version {version}")
+        return {"snapshot_version": version, "base_version": None, "tree": tree}
+
+    changes = diff_snapshots(base_tree, tree)
+    logger.info(f"{content_type} delta between snapshot versions {base_version} and {version}: {len(changes['added'])} added, "
+                f"{len(changes['removed'])} removed, {len(changes['changed'])} changed")
+    return {"snapshot_version": version, "base_version": base_version, **changes}
+
+
+def with_boilerplate_suppressed(memo: BoilerplateMemo, url: str, tree: dict[str, Any] | None) -> dict[str, Any] | None:
+    """
+    Replaces the landmark blocks of the extracted tree already returned for another page of the same site by a reference.
+    The recorded snapshot is left as is, so that deltas are still computed on the full tree.
+    """
+    if tree is None:
+        return None
+    tree, suppressed_blocks = suppress_repeated_tree_blocks(memo, url, tree)
+    if suppressed_blocks:
+        logger.info(f"Replaced {suppressed_blocks} blocks already returned for the same site")
+    return tree
+
+
+def with_focus(extracted_data: dict[str, Any] | None, focus: str | None, top_k: int, delta: bool) -> dict[str, Any] | None:
+    """
+    Keeps the elements of the extracted tree that are the most relevant to the focus, along with their ancestors. The tree is
+    returned along with the focus and the number of matching elements. In delta mode, only a full tree is focused, not changes.
+    The recorded snapshot is left as is, so that deltas are still computed on the full tree.
+    """
+    if not focus or extracted_data is None:
+        return extracted_data
+    if delta and 'tree' not in extracted_data:
+        return extracted_data
+    tree = extracted_data['tree'] if delta else extracted_data
+    focused_tree, matched_elements = focus_tree(tree, focus, top_k)
+    logger.debug(f"Focused the tree on '{focus}': {matched_elements} elements matched, kept the top {top_k}")
+    focus_summary = {"focus": focus, "elements_matched": matched_elements, "elements_kept": min(matched_elements, top_k)}
+    if delta:
+        return {**extracted_data, **focus_summary, "tree": focused_tree}
+    return {**focus_summary, "tree": focused_tree}
+
+
+def with_repeated_structures_collapsed(extracted_data: dict[str, Any] | None, wrapped: bool) -> dict[str, Any] | None:
+    """
+    Collapses the repeated structures of the extracted tree, or of the subtrees added since the previous snapshot in delta mode.
+    wrapped tells whether the extracted data holds the tree (or the changes) along with other information, rather than being the tree.
+    The recorded snapshot is left as is, so that deltas are still computed on the full tree.
+    """
+    if extracted_data is None:
+        return None
+    if not wrapped:
+        return collapse_repeated_structures(extracted_data)
+    if 'tree' in extracted_data:
+        return {**extracted_data, "tree": collapse_repeated_structures(extracted_data['tree'])}
+    # Added subtrees are siblings in the output, e.g. the results appended by an infinite scroll
+    return {**extracted_data, "added": collapse_repeated_structures({"children": extracted_data['added']})['children']}
+
+
+def with_scope_summary(extracted_data: dict[str, Any] | None, dom_scope: DomScope | None, wrapped: bool) -> dict[str, Any] | None:
+    """
+    Prepends the resolved scope and the cursor of the next region to the extracted data of a scoped extraction.
+    wrapped tells whether the extracted data holds the tree (or the changes) along with other information, rather than being the tree.
+    """
+    if dom_scope is None or extracted_data is None:
+        return extracted_data
+    if wrapped:
+        return {**dom_scope.summary(), **extracted_data}
+    return {**dom_scope.summary(), "tree": extracted_data}
+
+
+def digest_as_text(digest: dict[str, Any]) -> str:
+    """
+    Writes the digest of a page as the text_only output: the text of the page followed by the lists of video, PDF and outbound
+    URLs and the summary of the forms, when there are any.
+    """
+    text = digest['text']
+    text += f"\n\nThis is the list of video URLs on the page in the order they appear: {str(digest['media_urls'])}"
+    text += f"\n\nThis is the list of PDF URLs on the page in the order they appear: {str(digest['pdf_urls'])}"
+    if digest['outbound_links']:
+        shown = f" (the first {len(digest['outbound_links'])})" if digest['outbound_links_total'] > len(digest['outbound_links']) else ""
+        text += f"\n\nThese are the {digest['outbound_links_total']} links to other sites on the page{shown}: {str(digest['outbound_links'])}"
+    if digest['forms']:
+        text += f"\n\nThese are the {digest['forms_total']} forms on the page: {str(digest['forms'])}"
+    return text
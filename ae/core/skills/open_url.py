@@ -123,7 +123,7 @@ async def openurl(url: Annotated[str, "The URL to navigate to. Value must includ
     url = page.url
 
     text = f"Page loaded: {url}, Title: '{title}'"
-    screenshot_msg = await screenshot_page(page)
+    screenshot_msg = await screenshot_page(page, "openurl")
     return [
         {"type": "text", "text": text},
         screenshot_msg,
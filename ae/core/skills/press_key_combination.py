@@ -1,10 +1,12 @@
-import asyncio
 import inspect
 from typing import Annotated
 
 from playwright.async_api import Page  # type: ignore
 
 from ae.core.playwright_manager import PlaywrightManager
+from ae.utils.dom_helper import describe_settle_wait
+from ae.utils.dom_helper import wait_for_page_to_settle
+from ae.utils.dom_helper import watch_page_activity
 from ae.utils.dom_mutation_observer import subscribe  # type: ignore
 from ae.utils.dom_mutation_observer import unsubscribe  # type: ignore
 from ae.utils.logger import logger
@@ -47,6 +49,7 @@ async def press_key_combination(key_combination: Annotated[str, "The key to pres
         dom_changes_detected = changes # type: ignore
 
     subscribe(detect_dom_changes)
+    watch_page_activity(page)
     # If it's a combination, hold down the modifier keys
     for key in keys[:-1]:  # All keys except the last one are considered modifier keys
         await page.keyboard.down(key)
@@ -57,15 +60,16 @@ async def press_key_combination(key_combination: Annotated[str, "The key to pres
     # Release the modifier keys
     for key in keys[:-1]:
         await page.keyboard.up(key)
-    await asyncio.sleep(0.1) # sleep for 100ms to allow the mutation observer to detect changes
+    waited, settled = await wait_for_page_to_settle(page) # the mutation observer has reported the changes once the page settled
+    logger.info(f"Waited {waited:.2f} seconds for the page to settle after pressing {key_combination}")
     unsubscribe(detect_dom_changes)
 
     if dom_changes_detected:
         return f"Key {key_combination} executed successfully.\n As a consequence of this action, new elements have appeared in view:{dom_changes_detected}. This means that the action is not yet executed and needs further interaction. Get all_fields DOM to complete the interaction."
 
     await browser_manager.notify_user(f"Key {key_combination} executed successfully", message_type=MessageType.ACTION)
-    text = f"Key {key_combination} executed successfully"
-    screenshot_msg = await screenshot_page(page)
+    text = f"Key {key_combination} executed successfully. {describe_settle_wait(waited, settled)}"
+    screenshot_msg = await screenshot_page(page, "press_key_combination")
     return [
         {"type": "text", "text": text},
         screenshot_msg,
@@ -20,6 +20,8 @@ import ae.core.playwright_manager as browserManager
 from ae.config import SOURCE_LOG_FOLDER_PATH
 from ae.core.agents_llm_config import AgentsLLMConfig
 from ae.core.autogen_wrapper import AutogenWrapper
+from ae.utils.boilerplate_memo import clear_boilerplate_memos
+from ae.utils.dom_snapshot_cache import get_snapshot_cache_stats
 from ae.utils.formatting_helper import is_terminating_message
 from ae.utils.ui_messagetype import MessageType
 from .toolbox import TOOLS, call_tool
@@ -150,6 +152,7 @@ async def process_command(command: str, playwright_manager: browserManager.Playw
         playwright_manager (PlaywrightManager): The manager handling browser interactions and notifications.
     """
     await playwright_manager.go_to_homepage() # Go to the homepage before processing the command
+    clear_boilerplate_memos() # Blocks returned for an earlier task are not known to this one
     current_url = await playwright_manager.get_current_url()
     await playwright_manager.notify_user("Processing command", MessageType.INFO)
 
@@ -205,9 +208,15 @@ async def call_tool_(tool_request: ToolRequest) -> JSONResponse:
     return JSONResponse(content=await call_tool(tool_request.tool_name, tool_request.tool_params))
 
 
+@app.get("/snapshot-cache-stats", description="Get the hit and miss counters of the DOM snapshot cache")
+async def snapshot_cache_stats() -> JSONResponse:
+    return JSONResponse(content=get_snapshot_cache_stats())
+
+
 @app.post("/reset", description="Reset the browser")
 async def reset() -> JSONResponse:
     logger.info("Resetting the browser")
+    clear_boilerplate_memos()
     return JSONResponse(content=await call_tool("openurl", {"url": "https://google.com"}))
 
 
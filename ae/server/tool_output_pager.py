@@ -0,0 +1,225 @@
+import functools
+import json
+import os
+import uuid
+from collections import OrderedDict
+from collections.abc import Awaitable
+from collections.abc import Callable
+from typing import Annotated
+from typing import Any
+
+from ae.utils.logger import logger
+
+# Rough number of characters per token, used to measure outputs without tokenizing them
+CHARS_PER_TOKEN = 4
+
+# Characters kept free in every page for the note pointing to the next page
+PAGE_NOTE_RESERVE = 300
+
+# Smallest token budget of a tool output. Smaller budgets are raised to it, so that every page holds some of the output.
+MIN_TOOL_OUTPUT_TOKEN_BUDGET = 250
+
+
+def __parse_token_budget(tokens: str, setting: str) -> int:
+    """
+    Parses a token budget, which has to be a positive number of tokens.
+
+    Raises:
+        ValueError: If the budget is not a positive integer.
+    """
+    try:
+        budget = int(tokens)
+    except ValueError:
+        budget = 0
+    if budget <= 0:
+        raise ValueError(f"{setting} has to be a positive number of tokens, got \"{tokens}\"")
+    return budget
+
+
+def __parse_tool_budgets(budgets: str) -> dict[str, int]:
+    """
+    Parses per-tool budgets given as 'tool_name=tokens,tool_name=tokens'.
+    """
+    tool_budgets: dict[str, int] = {}
+    for entry in budgets.split(','):
+        if '=' in entry:
+            tool_name, tokens = entry.split('=', 1)
+            tool_budgets[tool_name.strip()] = __parse_token_budget(tokens.strip(), f"TOOL_OUTPUT_TOKEN_BUDGETS ({tool_name.strip()})")
+    return tool_budgets
+
+
+# Token budget of a tool output, above which the output is split into pages
+DEFAULT_TOOL_OUTPUT_TOKEN_BUDGET = __parse_token_budget(os.getenv("TOOL_OUTPUT_TOKEN_BUDGET", "6000"), "TOOL_OUTPUT_TOKEN_BUDGET")
+
+# The DOM of a page is allowed a larger budget than other outputs, in line with the 100k characters it used to be truncated at
+TOOL_OUTPUT_TOKEN_BUDGETS: dict[str, int] = {
+    "get_dom_with_content_type": 25000,
+    **__parse_tool_budgets(os.getenv("TOOL_OUTPUT_TOKEN_BUDGETS", "")),
+}
+
+
+def get_tool_output_token_budget(tool_name: str) -> int:
+    return max(MIN_TOOL_OUTPUT_TOKEN_BUDGET, TOOL_OUTPUT_TOKEN_BUDGETS.get(tool_name, DEFAULT_TOOL_OUTPUT_TOKEN_BUDGET))
+
+
+def _is_content_parts(result: Any) -> bool:
+    """
+    Checks if the output is a list of message content parts, e.g. a text part followed by a screenshot.
+    """
+    return isinstance(result, list) and bool(result) and all(isinstance(part, dict) and part.get('type') in ('text', 'image_url') for part in result)
+
+
+def _split_text(text: str, max_chars: int) -> list[str]:
+    """
+    Splits the text into pages of at most max_chars characters, cutting at a line break when there is one in the second half of the page.
+    """
+    max_chars = max(1, max_chars)
+    pages: list[str] = []
+    start = 0
+    while start < len(text):
+        end = start + max_chars
+        if end < len(text):
+            line_break = text.rfind('\n', start + max_chars // 2, end)
+            if line_break != -1:
+                end = line_break + 1
+        pages.append(text[start:end])
+        start = end
+    return pages
+
+
+def _split_json(result: Any, max_chars: int) -> list[str] | None:
+    """
+    Serializes the result chunk by chunk, measuring it along the way.
+
+    Returns:
+        list[str] | None: None if the serialized result fits in max_chars, otherwise the serialized result split into pages.
+            The result is serialized once either way.
+    """
+    pages: list[str] = []
+    current: list[str] = []
+    current_size = 0
+    for chunk in json.JSONEncoder(ensure_ascii=False, default=str).iterencode(result):
+        current.append(chunk)
+        current_size += len(chunk)
+        if current_size >= max_chars:
+            # Cut the accumulated chunks into full pages and carry the remainder over
+            accumulated_pages = _split_text(''.join(current), max_chars)
+            pages.extend(accumulated_pages[:-1])
+            current = [accumulated_pages[-1]]
+            current_size = len(accumulated_pages[-1])
+    if not pages:
+        return None
+    pages.append(''.join(current))
+    return pages
+
+
+class ToolOutputPager:
+    """
+    Keeps the outputs that exceed the token budget of their tool, split into pages, so the agent can read them page by page.
+    Only the first page is returned by the tool call. The following pages are addressed by a cursor and read with next_page.
+
+    The last max_outputs paginated outputs are kept, older ones are dropped along with their cursors.
+    """
+
+    def __init__(self, max_outputs: int = 32):
+        self.max_outputs = max_outputs
+        self.__outputs: OrderedDict[str, tuple[str, list[str]]] = OrderedDict()
+
+    def paginate(self, tool_name: str, result: Any) -> Any:
+        """
+        Enforces the token budget of the tool on its output.
+
+        Args:
+            tool_name (str): The name of the tool that produced the output.
+            result (Any): The output of the tool: text, message content parts or JSON serializable data.
+
+        Returns:
+            Any: The output itself if it is within the budget, otherwise its first page along with the cursor of the next page.
+                Images in content parts are not counted against the budget and are returned with the first page.
+        """
+        max_chars = get_tool_output_token_budget(tool_name) * CHARS_PER_TOKEN
+        if isinstance(result, str):
+            if len(result) <= max_chars:
+                return result
+            pages = _split_text(result, max_chars - PAGE_NOTE_RESERVE)
+        elif _is_content_parts(result):
+            text = "\n\n".join(part['text'] for part in result if part['type'] == 'text')
+            if len(text) <= max_chars:
+                return result
+            first_page = self.__store(tool_name, _split_text(text, max_chars - PAGE_NOTE_RESERVE))
+            return [{"type": "text", "text": first_page}, *(part for part in result if part['type'] != 'text')]
+        elif result is None or isinstance(result, (bool, int, float)):
+            return result
+        else:
+            pages = _split_json(result, max_chars - PAGE_NOTE_RESERVE)
+            if pages is None:
+                return result
+        return self.__store(tool_name, pages)
+
+    def get_page(self, cursor: str) -> str:
+        """
+        Returns the page the cursor points to, along with the cursor of the page after it.
+
+        Raises:
+            ValueError: If the cursor is malformed, or the output it points to is no longer kept.
+        """
+        output_id, _, page_number = cursor.strip().rpartition('-')
+        if output_id not in self.__outputs or not page_number.isdigit():
+            raise ValueError(f"Unknown or expired cursor: {cursor}. Call the original tool again to get a fresh output.")
+        tool_name, pages = self.__outputs[output_id]
+        page_index = int(page_number) - 1
+        if not 0 <= page_index < len(pages):
+            raise ValueError(f"The output behind cursor {cursor} has {len(pages)} pages, there is no page {page_number}.")
+        self.__outputs.move_to_end(output_id)
+        return f"[Page {page_index + 1} of {len(pages)} of the {tool_name} output]\n" + self.__with_next_page_note(output_id, pages, page_index)
+
+    def __store(self, tool_name: str, pages: list[str]) -> str:
+        output_id = uuid.uuid4().hex[:12]
+        self.__outputs[output_id] = (tool_name, pages)
+        while len(self.__outputs) > self.max_outputs:
+            self.__outputs.popitem(last=False)
+        logger.info(f"Output of {tool_name} exceeds its budget of {get_tool_output_token_budget(tool_name)} tokens, split into {len(pages)} pages")
+        return self.__with_next_page_note(output_id, pages, 0)
+
+    @staticmethod
+    def __with_next_page_note(output_id: str, pages: list[str], page_index: int) -> str:
+        if page_index + 1 >= len(pages):
+            return pages[page_index]
+        return (pages[page_index] + f"\n\n[Output truncated: page {page_index + 1} of {len(pages)} shown. "
+                f"To read more, call next_page with cursor \"{output_id}-{page_index + 2}\".]")
+
+
+tool_output_pager = ToolOutputPager()
+
+
+def with_output_budget(tool_name: str, skill: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+    """
+    Wraps a skill so that the token budget of the tool is enforced on its output, for callers that do not go through
+    toolbox.call_tool (e.g. skills registered directly with an agent). The wrapper keeps the name, docstring and annotations
+    of the skill, which agents describe the tool with.
+
+    Args:
+        tool_name (str): The name of the tool, whose budget applies.
+        skill (Callable[..., Awaitable[Any]]): The skill to wrap.
+
+    Returns:
+        Callable[..., Awaitable[Any]]: The skill, returning the first page of its output and the cursor of the next one when
+            the output is larger than the budget.
+    """
+    @functools.wraps(skill)
+    async def paginated_skill(*args: Any, **kwargs: Any) -> Any:
+        return tool_output_pager.paginate(tool_name, await skill(*args, **kwargs))
+    return paginated_skill
+
+
+async def next_page(cursor: Annotated[str, "The cursor given at the end of a truncated tool output."]) -> Annotated[str, "The next page of the output."]:
+    """
+    Returns the next page of a tool output that was too large to be returned at once.
+
+    Parameters:
+    - cursor: The cursor given at the end of the truncated output, e.g. 3f2a9c1b7d4e-2.
+
+    Returns:
+    - The page the cursor points to, ending with the cursor of the following page if there is one.
+    """
+    return tool_output_pager.get_page(cursor)
@@ -5,11 +5,17 @@ from ae.core.skills.enter_text_using_selector import (
     EnterTextEntry,
     entertext,
 )
+from ae.core.skills.expand_list import expand_list
+from ae.core.skills.extract_tables import extract_tables
+from ae.core.skills.find_elements import find_elements
+from ae.core.skills.find_in_page import find_in_page
 from ae.core.skills.get_dom_with_content_type import get_dom_with_content_type
 from ae.core.skills.get_url import geturl
 from ae.core.skills.open_url import openurl
 from ae.core.skills.pdf_text_extractor import extract_text_from_pdf
 from ae.core.skills.press_key_combination import press_key_combination
+from ae.server.tool_output_pager import next_page
+from ae.server.tool_output_pager import tool_output_pager
 
 TOOLS = [
     {
@@ -53,10 +59,47 @@ If information is not available in one content_type, you must try another conten
                     "content_type": {
                         "type": "string",
                         "description": """The type of content to extract, valid options are:
-text_only - returns plain text representing all the text in the web site. Use this for any information retrieval task. This will contain the most complete textual information.
+text_only - returns the text of the web site as Markdown (headings, lists, tables). Use this for any information retrieval task. This will contain the most complete textual information. Headers, menus and footers already returned for another page of the same site are replaced by a reference, call again with suppress_boilerplate false to read them.
 input_fields - returns a JSON string containing a list of objects representing text input html elements with mmid attribute. Use this strictly for interaction purposes with text input fields.
 all_fields - returns a JSON string containing a list of objects representing all interactive elements and their attributes with mmid attribute. Use this strictly to identify and interact with any type of elements on page.""",
-                    }
+                    },
+                    "delta": {
+                        "type": "boolean",
+                        "default": False,
+                        "description": "Only for input_fields and all_fields. If true, returns only the elements added, removed or changed since the previous call with the same content_type on the same page, instead of the whole DOM. mmids stay the same across calls on the same page. Use it after an action (e.g. a click that opens a menu) to see what changed.",
+                    },
+                    "scope": {
+                        "type": "string",
+                        "description": """Only for input_fields and all_fields. Restricts the result to the rendered elements of part of the page, which is much smaller on long pages:
+viewport - only what is visible on the screen.
+viewport+N - the screen plus N more screens below it, e.g. viewport+2.
+A container query selector or mmid, e.g. #results or [mmid='114'] - only the rendered elements of that container.
+The result includes a next_cursor when there is more page below the region. Pass it as the scope of the next call to get the next region.""",
+                    },
+                    "output_format": {
+                        "type": "string",
+                        "enum": ["json", "compact"],
+                        "default": "json",
+                        "description": """Only for input_fields and all_fields. json - nested JSON objects. compact - one element per line, indented under its parent, in page order: [mmid] tag "name" attribute=value..., e.g. [114] button "Search" placeholder="Search the site". Compact carries the same information in far fewer tokens.""",
+                    },
+                    "collapse_repeated": {
+                        "type": "boolean",
+                        "default": False,
+                        "description": "Only for input_fields and all_fields. If true, lists of elements with the same structure (search results, product cards, table rows) are written once as 'repeated' with the fields they all share in 'common', the varying fields in 'columns' and one entry per element in 'rows'. Columns are named after the element and its descendants, e.g. a.mmid or a.text, and include every mmid. Use it on long listings.",
+                    },
+                    "focus": {
+                        "type": "string",
+                        "description": "Only for input_fields and all_fields. The goal of your next step, e.g. 'click the search button' or 'enter departure city'. If given, only the elements most relevant to it are returned, along with their ancestors, instead of every element. The result gives the number of matching elements. If the element you need is missing, call again without focus.",
+                    },
+                    "focus_top_k": {
+                        "type": "integer",
+                        "default": 20,
+                        "description": "Only with focus. The number of elements to return.",
+                    },
+                    "suppress_boilerplate": {
+                        "type": "boolean",
+                        "description": "If true, the headers, navigation menus, footers and cookie banners already returned for another page of the same site are replaced by a short reference to that page. Defaults to true for text_only and false for input_fields and all_fields. Set it to false to read them again.",
+                    },
                 },
                 "required": ["content_type"],
             },
@@ -95,7 +138,7 @@ all_fields - returns a JSON string containing a list of objects representing all
     {
         "type": "function",
         "function": {
-            "description": "Bulk enter text in multiple DOM fields. To be used when there are multiple fields to be filled on the same page. Enters text in the DOM elements matching the given mmid attribute value. The input will receive a list of objects containing the DOM query selector and the text to enter. This will only enter the text and not press enter or anything else. Returns each selector and the result for attempting to enter text.",
+            "description": "Bulk enter text in multiple DOM fields. To be used when there are multiple fields to be filled on the same page. Enters text in the DOM elements matching the given mmid attribute value. The input will receive a list of objects containing the DOM query selector and the text to enter. All fields are filled in one pass, prefer it over several entertext calls. This will only enter the text and not press enter or anything else. Returns each selector and the result for attempting to enter text, with a screenshot of the page.",
             "name": "bulk_enter_text",
             "parameters": {
                 "type": "object",
@@ -156,6 +199,131 @@ all_fields - returns a JSON string containing a list of objects representing all
             },
         },
     },
+    {
+        "type": "function",
+        "function": {
+            "description": "Returns the next page of a tool output that was too large to be returned at once. Truncated outputs end with a note giving the cursor of their next page. Only call this if the rest of the output is needed for the task.",
+            "name": "next_page",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "cursor": {
+                        "type": "string",
+                        "description": "The cursor given at the end of the truncated output, e.g. 3f2a9c1b7d4e-2.",
+                    }
+                },
+                "required": ["cursor"],
+            },
+        },
+    },
+    {
+        "type": "function",
+        "function": {
+            "description": "Lists more options of a select, or more items of a listbox or list. The DOM only gives the first items of long lists, along with their total count in options_total or additional_info_total. Use the filter to find an item by its text (e.g. a country or an airport) instead of reading the whole list. Returns the matching items with their mmid, their total count and the next_offset to read the following ones.",
+            "name": "expand_list",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "mmid": {
+                        "type": "string",
+                        "description": "The mmid of the select, listbox or list, e.g. 114.",
+                    },
+                    "offset": {
+                        "type": "integer",
+                        "default": 0,
+                        "description": "The index of the first item to return, among the items matching the filter. Use the next_offset of the previous call to read on.",
+                    },
+                    "limit": {
+                        "type": "integer",
+                        "default": 50,
+                        "description": "The maximum number of items to return.",
+                    },
+                    "filter": {
+                        "type": "string",
+                        "description": "Only return the items whose text, value or label contains this text, ignoring case.",
+                    },
+                },
+                "required": ["mmid"],
+            },
+        },
+    },
+    {
+        "type": "function",
+        "function": {
+            "description": "Finds the elements of the current page that best match a query, e.g. 'search button' or 'departure city', without reading the whole DOM. Returns one short line per element, best first, with its mmid and the element it is in. Use get_dom_with_content_type when the page structure is needed.",
+            "name": "find_elements",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "query": {
+                        "type": "string",
+                        "description": "What to look for, in words that would appear on or around the element.",
+                    },
+                    "k": {
+                        "type": "integer",
+                        "default": 10,
+                        "description": "The number of elements to return.",
+                    },
+                },
+                "required": ["query"],
+            },
+        },
+    },
+    {
+        "type": "function",
+        "function": {
+            "description": "Finds the passages of the text of the current page that best match a query, headers, menus and footers included. Use it to answer a question from a long article or documentation page in one call, instead of reading its whole text with get_dom_with_content_type text_only. To act on an element of a passage, call get_dom_with_content_type all_fields with focus set to it.",
+            "name": "find_in_page",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "query": {
+                        "type": "string",
+                        "description": "What to look for, in words that would appear in the passage.",
+                    },
+                    "k": {
+                        "type": "integer",
+                        "default": 5,
+                        "description": "The number of passages to return.",
+                    },
+                },
+                "required": ["query"],
+            },
+        },
+    },
+    {
+        "type": "function",
+        "function": {
+            "description": "Reads the data tables of the current page (HTML tables, ARIA tables and grids) row by row. Call it without a table to list the tables with their index, caption, columns and number of rows, then with a table index to read its rows in chunks, using the next_offset of each call to read on. Prefer it to text_only for stats, prices or schedules laid out in tables.",
+            "name": "extract_tables",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "table": {
+                        "type": "integer",
+                        "description": "The index of the table to read, as listed when called without it.",
+                    },
+                    "offset": {
+                        "type": "integer",
+                        "default": 0,
+                        "description": "The index of the first row to return, the header row excluded. Use the next_offset of the previous call to read on.",
+                    },
+                    "limit": {
+                        "type": "integer",
+                        "default": 200,
+                        "description": "The maximum number of rows to return.",
+                    },
+                    "output_format": {
+                        "type": "string",
+                        "enum": ["csv", "columns"],
+                        "default": "csv",
+                        "description": "csv for the header and rows as CSV, columns for one list of values per column.",
+                    },
+                },
+                "required": [],
+            },
+        },
+    },
     ## we leave this one out b/c we have our own implementation
     ## this version has the downside of flooding the context window with a bunch of text from large papers
     # {
@@ -181,6 +349,8 @@ all_fields - returns a JSON string containing a list of objects representing all
 async def call_tool(tool_name: str, tool_args: Dict[str, Any]) -> Any:
     """
     Calls the specified tool with the given arguments.
+    Outputs larger than the token budget of the tool are split into pages, only the first page is returned along with
+    the cursor of the next one, to be read with the next_page tool.
 
     Parameters:
     - tool_name: str - The name of the tool/skill to call
@@ -202,6 +372,11 @@ async def call_tool(tool_name: str, tool_args: Dict[str, Any]) -> Any:
         "entertext": entertext,
         "press_key_combination": press_key_combination,
         "extract_text_from_pdf": extract_text_from_pdf,
+        "next_page": next_page,
+        "expand_list": expand_list,
+        "extract_tables": extract_tables,
+        "find_elements": find_elements,
+        "find_in_page": find_in_page,
     }
 
     # Get the appropriate function
@@ -211,8 +386,13 @@ async def call_tool(tool_name: str, tool_args: Dict[str, Any]) -> Any:
 
     try:
         # Call the function with unpacked arguments
-        return await tool_func(**tool_args)
+        result = await tool_func(**tool_args)
     except Exception as e:
         # Preserve the original exception type and message
         # raise type(e)(f"Error calling {tool_name}: {str(e)}") from e
         return f"Error calling tool: {str(e)}"
+
+    if tool_name == "next_page":
+        # Pages are already cut to the budget of the tool that produced them
+        return result
+    return tool_output_pager.paginate(tool_name, result)
@@ -0,0 +1,154 @@
+import sys
+from collections.abc import Iterator
+from typing import Any
+
+# Fields present on (nearly) every node get a slot of their own, the others are kept in a dictionary created on first use.
+# Fields are listed in this order by keys(), items() and to_dict(), followed by the other fields and the children.
+SLOT_FIELDS = ('role', 'name', 'mmid', 'tag', 'keyshortcuts')
+
+# Fields whose values are drawn from a small vocabulary, and are interned so every node shares the same string
+INTERNED_FIELDS = ('role', 'tag', 'tag_type')
+
+_missing = object()
+
+_slot_keys = frozenset(SLOT_FIELDS + ('children',))
+_interned_keys = frozenset(INTERNED_FIELDS)
+
+
+class AccessibilityNode:
+    """
+    A node of the accessibility tree while it is enriched and pruned, taking a fraction of the memory of a dictionary.
+
+    The node behaves like the dictionary it replaces (get, in, [], del, pop, update, len, items), so the processing functions
+    work on both. The common fields are stored in slots, the others in a dictionary created only for the nodes that have any.
+    Roles and tags are interned. Nodes are converted back to plain dictionaries with to_dict() at the output edge, where
+    the fields come in a canonical order: the slot fields first, then the other fields, then the children.
+    """
+
+    __slots__ = SLOT_FIELDS + ('children', 'extra')
+
+    def __getitem__(self, key: str) -> Any:
+        value = self.get(key, _missing)
+        if value is _missing:
+            raise KeyError(key)
+        return value
+
+    def get(self, key: str, default: Any = None) -> Any:
+        if key in _slot_keys:
+            return getattr(self, key, default)
+        extra = getattr(self, 'extra', None)
+        return default if extra is None else extra.get(key, default)
+
+    def __contains__(self, key: object) -> bool:
+        if key in _slot_keys:
+            return hasattr(self, key) # type: ignore
+        extra = getattr(self, 'extra', None)
+        return extra is not None and key in extra
+
+    def __setitem__(self, key: str, value: Any):
+        if key in _interned_keys and type(value) is str:
+            value = sys.intern(value)
+        if key in _slot_keys:
+            setattr(self, key, value)
+            return
+        extra = getattr(self, 'extra', None)
+        if extra is None:
+            extra = self.extra = {}
+        extra[sys.intern(key)] = value
+
+    def __delitem__(self, key: str):
+        if self.pop(key, _missing) is _missing:
+            raise KeyError(key)
+
+    def pop(self, key: str, default: Any = _missing) -> Any:
+        value = self.get(key, _missing)
+        if value is _missing:
+            if default is _missing:
+                raise KeyError(key)
+            return default
+        if key in _slot_keys:
+            delattr(self, key)
+        else:
+            del self.extra[key]
+            if not self.extra:
+                del self.extra
+        return value
+
+    def update(self, fields: dict[str, Any]):
+        for key, value in fields.items():
+            self[key] = value
+
+    def keys(self) -> Iterator[str]:
+        for key in SLOT_FIELDS:
+            if hasattr(self, key):
+                yield key
+        yield from getattr(self, 'extra', None) or ()
+        if hasattr(self, 'children'):
+            yield 'children'
+
+    __iter__ = keys
+
+    def items(self) -> Iterator[tuple[str, Any]]:
+        for key in SLOT_FIELDS:
+            value = getattr(self, key, _missing)
+            if value is not _missing:
+                yield key, value
+        yield from (getattr(self, 'extra', None) or {}).items()
+        if hasattr(self, 'children'):
+            yield 'children', self.children
+
+    def __len__(self) -> int:
+        return sum(hasattr(self, key) for key in _slot_keys) + len(getattr(self, 'extra', None) or ())
+
+    def __repr__(self) -> str:
+        return f"AccessibilityNode({dict((key, value) for key, value in self.items() if key != 'children')})"
+
+    @staticmethod
+    def from_tree(tree: dict[str, Any]) -> "AccessibilityNode":
+        """
+        Converts a tree of dictionaries into a tree of nodes, without recursing.
+        The children lists of the dictionaries are emptied along the way, so that they can be freed as the tree is converted.
+
+        Args:
+            tree (dict[str, Any]): The accessibility tree, as returned by page.accessibility.snapshot().
+
+        Returns:
+            AccessibilityNode: The root of the converted tree.
+        """
+        root = AccessibilityNode()
+        stack: list[tuple[dict[str, Any], AccessibilityNode]] = [(tree, root)]
+        while stack:
+            source, node = stack.pop()
+            children = source.pop('children', None)
+            for key, value in source.items():
+                node[key] = value
+            if children is not None:
+                node.children = [AccessibilityNode() for _ in children]
+                stack.extend(zip(children, node.children, strict=True))
+                children.clear()
+        return root
+
+    def to_dict(self, release_nodes: bool = False) -> dict[str, Any]:
+        """
+        Converts the tree of nodes rooted at this node into a tree of dictionaries, without recursing.
+
+        Args:
+            release_nodes (bool): If True, the children of the nodes are removed as they are converted, so that the nodes can be
+                freed while the dictionaries are built and both trees are never held in memory at once.
+
+        Returns:
+            dict[str, Any]: The tree of dictionaries, with the fields of every node in canonical order.
+        """
+        root: dict[str, Any] = {}
+        stack: list[tuple[AccessibilityNode, dict[str, Any]]] = [(self, root)]
+        while stack:
+            node, target = stack.pop()
+            for key, value in node.items():
+                if key != 'children':
+                    target[key] = value
+            if hasattr(node, 'children'):
+                target['children'] = [{} for _ in node.children]
+                stack.extend(zip(node.children, target['children'], strict=True))
+                if release_nodes:
+                    del node.children
+        return root
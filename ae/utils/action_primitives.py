@@ -0,0 +1,302 @@
+import asyncio
+import uuid
+import weakref
+from typing import Any
+
+from playwright.async_api import Error
+from playwright.async_api import Page
+
+from ae.utils.dom_helper import OPENING_TAG_ATTRIBUTES
+from ae.utils.dom_helper import OPENING_TAG_JS
+from ae.utils.logger import logger
+
+# Resolves the selector, scrolls the element into view if its centre is outside of the viewport and checks that it is rendered.
+# Options are not checked, they are rendered by their select. Defined as a named function so that the action scripts can embed it.
+__RESOLVE_ELEMENT_JS = """
+function resolveElement(selector) {
+    const element = document.querySelector(selector);
+    if (!element) return {element: null, outcome: {performed: false, reason: 'not found'}};
+    const tag = element.tagName.toLowerCase();
+    if (tag === 'option') return {element: element, tag: tag};
+    let rect = element.getBoundingClientRect();
+    // The click is hit-tested at the centre of the element, which has to be in the viewport
+    const centreX = rect.left + rect.width / 2;
+    const centreY = rect.top + rect.height / 2;
+    if (centreX < 0 || centreY < 0 || centreX >= window.innerWidth || centreY >= window.innerHeight) {
+        element.scrollIntoView({block: 'center', inline: 'center', behavior: 'instant'});
+        rect = element.getBoundingClientRect();
+    }
+    const visible = rect.width > 0 && rect.height > 0
+                    && (!element.checkVisibility || element.checkVisibility({visibilityProperty: true}));
+    if (!visible) return {element: null, outcome: {performed: false, reason: 'not visible'}};
+    return {element: element, tag: tag};
+}
+"""
+
+# Name of the binding the click script calls right before it clicks, so that a click that destroyed its document can be told
+# apart from a document that went away before the click
+CLICK_STARTED_BINDING = "__agenteClickStarted"
+
+# Clicks the element, or selects the option, in the same evaluate as it is resolved and described. element.click() does not
+# hit-test, so an element covered at its centre by another one (e.g. a modal or a cookie banner) is not clicked: the outcome
+# describes the element that covers it instead.
+__CLICK_JS = """(params) => {
+    """ + OPENING_TAG_JS + __RESOLVE_ELEMENT_JS + """
+    const {element, tag, outcome} = resolveElement(params.selector);
+    if (!element) return outcome;
+    const opening_tag = openingTag(element, params.attributes);
+    const clickStarted = () => {
+        if (typeof window[params.binding] === 'function') window[params.binding](params.token);
+    };
+
+    if (tag === 'option') {
+        const select = element.closest('select');
+        if (!select) return {performed: false, reason: 'option outside of a select'};
+        clickStarted();
+        select.value = element.value;
+        select.dispatchEvent(new Event('input', {bubbles: true}));
+        select.dispatchEvent(new Event('change', {bubbles: true}));
+        return {performed: true, tag: tag, opening_tag: opening_tag, option_value: element.value};
+    }
+
+    const rect = element.getBoundingClientRect();
+    const hit = document.elementFromPoint(rect.left + rect.width / 2, rect.top + rect.height / 2);
+    // The centre could not be scrolled into the viewport (e.g. a clipped or fixed element), Playwright can still try
+    if (!hit) return {performed: false, reason: 'not visible'};
+    // A click on the label of a control, e.g. laid over a styled checkbox, reaches the control
+    const hitLabel = hit.closest('label');
+    if (!element.contains(hit) && !(hitLabel && hitLabel.control === element)) {
+        return {performed: false, reason: 'covered', tag: tag, opening_tag: opening_tag, covered_by: openingTag(hit, params.attributes)};
+    }
+
+    // Links open in the same tab
+    if (tag === 'a') element.target = '_self';
+    const ariaExpandedBeforeClick = element.getAttribute('aria-expanded');
+    clickStarted();
+    element.click();
+    const opened_menu = ariaExpandedBeforeClick === 'false' && element.getAttribute('aria-expanded') === 'true';
+    return {performed: true, tag: tag, opening_tag: opening_tag, opened_menu: opened_menu};
+}"""
+
+# Tokens of the clicks whose script reached the click, per page, as reported through CLICK_STARTED_BINDING
+_started_clicks: "weakref.WeakKeyDictionary[Page, set[str]]" = weakref.WeakKeyDictionary()
+
+# Sets the value with the native setter followed by an input event, so that frameworks that track the value (e.g. React) see it.
+# Defined as a named function so that the action scripts can embed it.
+__SET_VALUE_JS = """
+function setValue(element, value) {
+    const descriptor = Object.getOwnPropertyDescriptor(Object.getPrototypeOf(element), 'value');
+    if (descriptor && descriptor.set) descriptor.set.call(element, value);
+    else element.value = value;
+    element.dispatchEvent(new Event('input', {bubbles: true}));
+}
+"""
+
+# Tells autocomplete widgets (comboboxes, inputs with a datalist or a popup) apart, as they only suggest on keystrokes
+__IS_AUTOCOMPLETE_JS = """
+function isAutocomplete(element) {
+    const popup = element.getAttribute('aria-haspopup');
+    return element.closest('[role="combobox"]') !== null || element.hasAttribute('list')
+           || (element.getAttribute('aria-autocomplete') || 'none') !== 'none'
+           || (popup !== null && popup !== 'false');
+}
+"""
+
+# Focuses the element, clears it and picks how the text is entered, in the same evaluate as it is resolved and described:
+# - 'type': autocomplete widgets (comboboxes, inputs with a datalist or a popup) and selects, which act on keystrokes.
+# - 'fill': other inputs and textareas, given the text right away with setValue and a change event. A field that does not hold
+#   the value (e.g. a masked input) is cleared again and left to 'insert_text'.
+# - 'insert_text': contenteditable elements, whose content is selected so that the text inserted replaces it.
+__PREPARE_TEXT_ENTRY_JS = """(params) => {
+    """ + OPENING_TAG_JS + __RESOLVE_ELEMENT_JS + __SET_VALUE_JS + __IS_AUTOCOMPLETE_JS + """
+    const {element, tag, outcome} = resolveElement(params.selector);
+    if (!element) return outcome;
+    const opening_tag = openingTag(element, params.attributes);
+
+    element.focus();
+    if (document.activeElement !== element && !element.contains(document.activeElement)) {
+        return {performed: false, reason: 'not focusable'};
+    }
+    if (element.isContentEditable) {
+        const range = document.createRange();
+        range.selectNodeContents(element);
+        const selection = window.getSelection();
+        selection.removeAllRanges();
+        selection.addRange(range);
+        return {performed: true, tag: tag, opening_tag: opening_tag, strategy: 'insert_text'};
+    }
+    if ('value' in element && element.value !== '' && tag !== 'select') setValue(element, '');
+
+    if (isAutocomplete(element) || tag === 'select' || !('value' in element)) {
+        return {performed: true, tag: tag, opening_tag: opening_tag, strategy: 'type'};
+    }
+
+    setValue(element, params.text);
+    if (element.value !== params.text) {
+        setValue(element, '');
+        return {performed: true, tag: tag, opening_tag: opening_tag, strategy: 'insert_text'};
+    }
+    element.dispatchEvent(new Event('change', {bubbles: true}));
+    return {performed: true, tag: tag, opening_tag: opening_tag, strategy: 'fill'};
+}"""
+
+
+# Messages of the errors raised when the document an evaluate runs in goes away before the script returns, e.g. when the action
+# navigated the page or closed it
+__CONTEXT_DESTROYED_ERRORS = ("Execution context was destroyed", "Target closed", "has been closed")
+
+
+async def __run_action(page: Page, action_js: str, selector: str, **params: Any) -> dict[str, Any]:
+    """
+    Runs an action script and returns its outcome. When the script failed, the outcome is not 'performed', with the error as
+    'reason' and 'context_destroyed' telling whether the document went away while the script was running.
+    """
+    try:
+        outcome: dict[str, Any] = await page.evaluate(action_js, {"selector": selector, "attributes": OPENING_TAG_ATTRIBUTES, **params})
+    except Error as e:
+        logger.debug(f"One round trip action failed on {selector}: {e}")
+        return {"performed": False, "reason": str(e),
+                "context_destroyed": any(message in e.message for message in __CONTEXT_DESTROYED_ERRORS)}
+    if not outcome['performed']:
+        logger.debug(f"One round trip action not performed on {selector}: {outcome['reason']}")
+    return outcome
+
+
+async def __expose_click_started_binding(page: Page) -> set[str]:
+    """
+    Exposes CLICK_STARTED_BINDING to the page the first time it is clicked on, and returns the tokens of its started clicks.
+    The binding is kept by Playwright across navigations.
+    """
+    started_clicks = _started_clicks.get(page)
+    if started_clicks is None:
+        started_clicks = set()
+        try:
+            await page.expose_binding(CLICK_STARTED_BINDING, lambda source, token: started_clicks.add(token))
+        except Error as e:
+            # Without the binding, a click that destroys its document is not taken as performed
+            logger.debug(f"Could not expose {CLICK_STARTED_BINDING}: {e}")
+        _started_clicks[page] = started_clicks
+    return started_clicks
+
+
+async def click_in_one_round_trip(page: Page, selector: str) -> dict[str, Any]:
+    """
+    Clicks the element matching the selector in a single evaluate: resolves it, scrolls it into view, checks that it is rendered
+    and not covered at its centre, describes its opening tag and clicks it (or selects it, for an option of a select).
+
+    Right before clicking, the script calls CLICK_STARTED_BINDING with a token of this click. If the document went away during
+    the evaluate and the token was received, the click replaced or closed it: the click is reported as performed and 'navigated',
+    without the description of the element. Without the token, the document went away before the click.
+
+    Args:
+        page (Page): The page to act on.
+        selector (str): The query selector of the element.
+
+    Returns:
+        dict[str, Any]: Whether the click was 'performed'. If it was, the 'tag' and 'opening_tag' of the element clicked, with
+            'opened_menu' when its aria-expanded turned true, or 'option_value' for an option; or 'navigated' when the click
+            replaced the document, with a None 'tag' and 'opening_tag'. If it was not, the 'reason': the element was not found,
+            is 'not visible' (not rendered, or its centre could not be brought into the viewport), is 'covered' (with the opening tag of the element that covers it as 'covered_by'), or the script
+            failed before clicking, with 'context_destroyed' when the document went away. Unless the element is covered or the
+            document went away, the caller can fall back to Playwright.
+    """
+    started_clicks = await __expose_click_started_binding(page)
+    token = uuid.uuid4().hex
+    outcome = await __run_action(page, __CLICK_JS, selector, binding=CLICK_STARTED_BINDING, token=token)
+    if outcome.get('context_destroyed') and token not in started_clicks:
+        # Playwright runs binding callbacks in tasks of their own, let a pending one record the token
+        await asyncio.sleep(0)
+    click_started = token in started_clicks
+    started_clicks.discard(token)
+    if outcome.get('context_destroyed') and click_started:
+        logger.debug(f"The click on {selector} destroyed its document, the click is taken as performed")
+        return {"performed": True, "tag": None, "opening_tag": None, "navigated": True}
+    return outcome
+
+
+async def prepare_text_entry_in_one_round_trip(page: Page, selector: str, text: str) -> dict[str, Any] | None:
+    """
+    Prepares the element matching the selector for text entry in a single evaluate: resolves it, scrolls it into view, checks
+    that it is rendered, describes its opening tag, focuses it, clears it and picks the strategy to enter the text with.
+
+    Args:
+        page (Page): The page to act on.
+        selector (str): The query selector of the element.
+        text (str): The text to enter.
+
+    Returns:
+        dict[str, Any] | None: The 'tag' and 'opening_tag' of the element, focused, and the 'strategy' to enter the text with:
+            'fill' when the text was set as its value already, 'insert_text' when it is to be inserted at once
+            (Input.insertText) and 'type' when it is to be typed key by key, for autocomplete widgets. None if the element was
+            not found, is not rendered, could not be focused or the script failed, in which case the caller can fall back to
+            Playwright.
+    """
+    outcome = await __run_action(page, __PREPARE_TEXT_ENTRY_JS, selector, text=text)
+    return outcome if outcome['performed'] else None
+
+
+# Fills each field in the same evaluate as it is resolved and described. Values are written with setValue followed by a change
+# event. Autocomplete widgets, and fields that do not hold the value written (contenteditable elements, masked or formatted
+# inputs, unknown select options), are reported as rejected, for the caller to type into them instead.
+__FILL_FIELDS_JS = """(params) => {
+    """ + OPENING_TAG_JS + __RESOLVE_ELEMENT_JS + __SET_VALUE_JS + __IS_AUTOCOMPLETE_JS + """
+    return params.entries.map(({selector, text}) => {
+        let resolved;
+        try {
+            resolved = resolveElement(selector);
+        } catch (e) {
+            return {selector: selector, performed: false, reason: `invalid selector: ${e.message}`};
+        }
+        const {element, tag, outcome} = resolved;
+        if (!element) return {selector: selector, ...outcome};
+        const opening_tag = openingTag(element, params.attributes);
+        const rejected = (reason, typeable) => ({selector: selector, performed: false, reason: reason, typeable: typeable,
+                                                  tag: tag, opening_tag: opening_tag});
+
+        if (element.disabled) return rejected('disabled', false);
+        if (element.readOnly) return rejected('read only', false);
+        if (element.isContentEditable || !('value' in element)) return rejected('needs typing', true);
+        // Autocomplete widgets do not suggest, nor commit their value, without keystrokes
+        if (tag !== 'select' && isAutocomplete(element)) return rejected('needs typing', true);
+        if (tag === 'select') {
+            const option = Array.from(element.options).find(option => option.value === text || option.text.trim() === text);
+            if (!option) return rejected('no such option', true);
+            text = option.value;
+        }
+        element.focus();
+        setValue(element, text);
+        element.dispatchEvent(new Event('change', {bubbles: true}));
+        if (element.value !== text) return rejected('value not retained', true);
+
+        if (params.highlight) {
+            element.classList.add('agente-ui-automation-highlight');
+            element.addEventListener('animationend', () => element.classList.remove('agente-ui-automation-highlight'), {once: true});
+        }
+        return {selector: selector, performed: true, tag: tag, opening_tag: opening_tag};
+    });
+}"""
+
+
+async def fill_fields_in_one_round_trip(page: Page, entries: list[dict[str, str]], highlight: bool = True) -> list[dict[str, Any]]:
+    """
+    Fills several fields in a single evaluate: each field is resolved, scrolled into view, checked, described, focused and given
+    its value with the native setter, followed by input and change events.
+
+    Args:
+        page (Page): The page to act on.
+        entries (list[dict[str, str]]): The 'query_selector' and 'text' of each field.
+        highlight (bool): Whether the fields filled get the highlight border of the elements acted on.
+
+    Returns:
+        list[dict[str, Any]]: One outcome per entry, in order, with the 'selector', whether the value was 'performed' and
+            otherwise the 'reason'. The 'tag' and 'opening_tag' are given for every field that was found. A field found that
+            rejected the value is 'typeable' when typing into it can still enter the text (e.g. 'needs typing' for a
+            contenteditable element or an autocomplete widget, 'value not retained' for a masked input). Every entry is
+            reported as not performed, and typeable, if the script failed.
+    """
+    fields = [{"selector": entry["query_selector"], "text": entry["text"]} for entry in entries]
+    try:
+        return await page.evaluate(__FILL_FIELDS_JS, {"entries": fields, "attributes": OPENING_TAG_ATTRIBUTES, "highlight": highlight})
+    except Error as e:
+        logger.debug(f"One round trip fill of {len(fields)} fields failed: {e}")
+        return [{"selector": field["selector"], "performed": False, "reason": str(e), "typeable": True} for field in fields]
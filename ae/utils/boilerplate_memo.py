@@ -0,0 +1,211 @@
+import hashlib
+import os
+import weakref
+from collections import OrderedDict
+from typing import Any
+from urllib.parse import urlparse
+
+from playwright.async_api import BrowserContext
+from playwright.async_api import Page
+
+from ae.utils.dom_search_index import node_tokens
+from ae.utils.dom_search_index import tokenize
+from ae.utils.logger import logger
+
+# Replaces the blocks (headers, navigation, footers, cookie banners...) already returned for another page of the same site by a reference
+BOILERPLATE_SUPPRESSION_ENABLED = os.getenv("BOILERPLATE_SUPPRESSION_ENABLED", "true").lower() == "true"
+
+# Blocks with less text than this are always returned, the reference would not be much shorter
+BOILERPLATE_MIN_BLOCK_CHARS = int(os.getenv("BOILERPLATE_MIN_BLOCK_CHARS", 100))
+
+# Number of block fingerprints remembered per site, the oldest are forgotten first
+BOILERPLATE_MAX_BLOCKS_PER_DOMAIN = 500
+
+# Roles and tags of the accessibility tree nodes that are landmark blocks, and the kind of block they are
+__LANDMARK_ROLES = {'banner': 'header', 'navigation': 'navigation', 'contentinfo': 'footer', 'complementary': 'aside',
+                    'dialog': 'dialog', 'alertdialog': 'dialog'}
+__LANDMARK_TAGS = {'header': 'header', 'nav': 'navigation', 'footer': 'footer', 'aside': 'aside', 'dialog': 'dialog'}
+
+
+class BoilerplateMemo:
+    """
+    Remembers the blocks returned during a browser session, to replace them by a reference when another page of the same
+    domain has them too.
+
+    Attributes:
+        domain_blocks (dict[str, OrderedDict[str, str]]): The URL of the page each block was first returned for, keyed by block
+            fingerprint, per domain.
+    """
+
+    def __init__(self):
+        self.domain_blocks: dict[str, OrderedDict[str, str]] = {}
+
+    def first_seen_on(self, url: str, fingerprint: str) -> str | None:
+        """
+        Returns the other page of the same domain the block was first returned for, if any.
+        """
+        blocks = self.domain_blocks.get(urlparse(url).netloc)
+        first_url = None if blocks is None else blocks.get(fingerprint)
+        if first_url is None:
+            return None
+        blocks.move_to_end(fingerprint) # type: ignore
+        return first_url if first_url != url else None
+
+    def record(self, url: str, fingerprint: str):
+        """
+        Records that the block was returned for the page, unless it was already returned for an earlier page.
+        """
+        blocks = self.domain_blocks.setdefault(urlparse(url).netloc, OrderedDict())
+        if fingerprint in blocks:
+            return
+        blocks[fingerprint] = url
+        if len(blocks) > BOILERPLATE_MAX_BLOCKS_PER_DOMAIN:
+            blocks.popitem(last=False)
+
+    def clear(self):
+        self.domain_blocks.clear()
+
+
+# Memo of each browser context, a new context (e.g. a new session) starts with an empty memo
+_context_memos: "weakref.WeakKeyDictionary[BrowserContext, BoilerplateMemo]" = weakref.WeakKeyDictionary()
+
+
+def get_boilerplate_memo(page: Page) -> BoilerplateMemo:
+    """
+    Returns the memo of the browser session the page belongs to.
+    """
+    memo = _context_memos.get(page.context)
+    if memo is None:
+        memo = BoilerplateMemo()
+        _context_memos[page.context] = memo
+    return memo
+
+
+def clear_boilerplate_memos():
+    """
+    Forgets the blocks returned so far, in every browser session. Called when the browser is reset and when a new task starts,
+    so that blocks returned for an earlier task are never left out.
+    """
+    for memo in _context_memos.values():
+        memo.clear()
+
+
+def __fingerprint(tokens: list[str]) -> str | None:
+    """
+    Hashes the normalized text of a block (lowercase words), or returns None if the block is too small to be worth replacing.
+    """
+    text = ' '.join(tokens)
+    if len(text) < BOILERPLATE_MIN_BLOCK_CHARS:
+        return None
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()[:16]
+
+
+def suppress_repeated_text_blocks(memo: BoilerplateMemo, url: str, text: str, blocks: list[dict[str, Any]],
+                                  delivered_chars: int | None = None) -> tuple[str, int]:
+    """
+    Replaces the landmark blocks of the text of a page that were already returned for another page of the same domain with a
+    one line reference, which tells to read them with suppress_boilerplate false. The other blocks are recorded as returned if they end within the first delivered_chars characters of
+    the text, the part of it the caller delivers at once.
+
+    Args:
+        memo (BoilerplateMemo): The memo of the browser session.
+        url (str): The URL of the page.
+        text (str): The Markdown text of the page.
+        blocks (list[dict[str, Any]]): The 'start' and 'end' offsets in the text and the 'kind' of the outermost landmark blocks,
+            in order, as returned by MARKDOWN_EXTRACTOR_JS.
+        delivered_chars (int | None, optional): The number of characters of the resulting text that is delivered, e.g. its
+            first page. Defaults to None (all of it).
+
+    Returns:
+        tuple[str, int]: The text and the number of blocks replaced.
+    """
+    parts: list[str] = []
+    position = 0
+    output_length = 0
+    suppressed = 0
+    for block in blocks:
+        start, end = block['start'], min(block['end'], len(text))
+        fingerprint = __fingerprint(tokenize(text[start:end]))
+        if fingerprint is None:
+            continue
+        first_url = memo.first_seen_on(url, fingerprint)
+        if first_url is None:
+            # Offset of the end of the block in the resulting text
+            if delivered_chars is None or output_length + end - position <= delivered_chars:
+                memo.record(url, fingerprint)
+            continue
+        parts.append(text[position:start])
+        parts.append(f"[Repeated {block['kind']} block, as on {first_url}, read it with suppress_boilerplate false]\n")
+        output_length += len(parts[-2]) + len(parts[-1])
+        position = end
+        suppressed += 1
+    parts.append(text[position:])
+    if suppressed:
+        logger.debug(f"Replaced {suppressed} blocks of the text of {url} already returned for the same site")
+    return ''.join(parts), suppressed
+
+
+def __block_kind(node: dict[str, Any]) -> str | None:
+    return __LANDMARK_ROLES.get(node.get('role', '')) or __LANDMARK_TAGS.get(node.get('tag', ''))
+
+
+def suppress_repeated_tree_blocks(memo: BoilerplateMemo, url: str, tree: dict[str, Any]) -> tuple[dict[str, Any], int]:
+    """
+    Replaces the children of the landmark nodes of the tree (header, navigation, footer, aside and dialog roles or tags) that were
+    already returned for another page of the same domain with a reference. The landmark keeps its mmid, so the block can still be
+    read with the scope of get_dom_with_content_type. The other blocks are recorded as returned, the whole tree is expected to
+    be delivered.
+
+    Args:
+        memo (BoilerplateMemo): The memo of the browser session.
+        url (str): The URL of the page.
+        tree (dict[str, Any]): The enriched accessibility tree. It is not modified.
+
+    Returns:
+        tuple[dict[str, Any], int]: The tree and the number of blocks replaced. The tree itself is returned when none was.
+    """
+    # Preorder walk, the subtree of a landmark is fingerprinted from its tokens and not walked any further
+    replaced: dict[int, str] = {}
+    stack = [tree]
+    while stack:
+        node = stack.pop()
+        kind = __block_kind(node) if node is not tree else None
+        if kind is None:
+            stack.extend(node.get('children', []))
+            continue
+        tokens: list[str] = []
+        block_stack = [node]
+        while block_stack:
+            block_node = block_stack.pop()
+            tokens.extend(node_tokens(block_node))
+            block_stack.extend(reversed(block_node.get('children', [])))
+        fingerprint = __fingerprint(tokens)
+        if fingerprint is None:
+            continue
+        first_url = memo.first_seen_on(url, fingerprint)
+        if first_url is None:
+            memo.record(url, fingerprint)
+        else:
+            reference = f"Repeated {kind} block, as on {first_url}"
+            replaced[id(node)] = reference + (f", read it with scope {node['mmid']}" if 'mmid' in node else "")
+    if not replaced:
+        return tree, 0
+
+    # Copies the tree, the replaced landmarks keep their own fields but not their children
+    nodes_in_order: list[dict[str, Any]] = []
+    stack = [tree]
+    while stack:
+        node = stack.pop()
+        nodes_in_order.append(node)
+        if id(node) not in replaced:
+            stack.extend(node.get('children', []))
+    copies: dict[int, dict[str, Any]] = {}
+    for node in reversed(nodes_in_order):
+        node_copy = {key: value for key, value in node.items() if key != 'children'}
+        if id(node) in replaced:
+            node_copy['repeated_block'] = replaced[id(node)]
+        elif 'children' in node:
+            node_copy['children'] = [copies.pop(id(child)) for child in node['children']]
+        copies[id(node)] = node_copy
+    logger.debug(f"Replaced {len(replaced)} blocks of the tree of {url} already returned for the same site")
+    return copies[id(tree)], len(replaced)
@@ -0,0 +1,413 @@
+import re
+import weakref
+from typing import Any
+
+from playwright.async_api import Page
+
+from ae.utils.cdp_helper import send_cdp_command
+from ae.utils.logger import logger
+
+# Pages whose mmids were handed out by the CDP backend. On these pages the mmid is the backendNodeId of the element and
+# the 'mmid' attribute is only written onto an element when an action needs to resolve it.
+_pages_with_cdp_mmids: "weakref.WeakSet[Page]" = weakref.WeakSet()
+
+mmid_selector = re.compile(r"""^\s*\[\s*mmid\s*=\s*['"]?(\d+)['"]?\s*\]\s*$""")
+
+ELEMENT_NODE = 1
+TEXT_NODE = 3
+TAGS_WITHOUT_TEXT = ('script', 'style', 'noscript', 'template')
+
+CONTROL_ROLES = ('button', 'checkbox', 'ColorWell', 'combobox', 'DisclosureTriangle', 'listbox', 'menu', 'menubar', 'menuitem',
+                 'menuitemcheckbox', 'menuitemradio', 'radio', 'scrollbar', 'searchbox', 'slider', 'spinbutton', 'switch', 'tab',
+                 'textbox', 'tree')
+LEAF_ROLES = ('doc-cover', 'graphics-symbol', 'img', 'Meter', 'scrollbar', 'slider', 'separator', 'progressbar')
+TEXT_ONLY_ROLES = ('LineBreak', 'text', 'InlineTextBox', 'StaticText')
+USER_STRING_PROPERTIES = ('description', 'keyshortcuts', 'roledescription', 'valuetext')
+BOOLEAN_PROPERTIES = ('disabled', 'expanded', 'focused', 'modal', 'multiline', 'multiselectable', 'readonly', 'required', 'selected')
+NUMERICAL_PROPERTIES = ('level', 'valuemax', 'valuemin')
+TOKEN_PROPERTIES = ('autocomplete', 'haspopup', 'invalid', 'orientation')
+INPUT_TYPES = ('button', 'checkbox', 'color', 'date', 'datetime-local', 'email', 'file', 'hidden', 'image', 'month', 'number', 'password',
+               'radio', 'range', 'reset', 'search', 'submit', 'tel', 'text', 'time', 'url', 'week')
+
+
+class _AXNode:
+    """
+    A node of the full accessibility tree returned by 'Accessibility.getFullAXTree'. This mirrors how Playwright decides which
+    nodes are interesting, so the snapshot built from it has the same shape as page.accessibility.snapshot().
+    """
+
+    __slots__ = ('payload', 'children', 'name', 'role', 'richly_editable', 'editable', 'focusable', 'hidden', 'has_focusable_child')
+
+    def __init__(self, payload: dict[str, Any]):
+        self.payload = payload
+        self.children: list[_AXNode] = []
+        self.name: str = payload['name'].get('value', '') if payload.get('name') else ''
+        self.role: str = payload['role'].get('value', 'Unknown') if payload.get('role') else 'Unknown'
+        self.richly_editable = False
+        self.editable = False
+        self.focusable = False
+        self.hidden = False
+        self.has_focusable_child = False
+        for ax_property in payload.get('properties') or []:
+            value = ax_property['value'].get('value')
+            if ax_property['name'] == 'editable':
+                self.richly_editable = value == 'richtext'
+                self.editable = True
+            if ax_property['name'] == 'focusable':
+                self.focusable = value
+            if ax_property['name'] == 'hidden':
+                self.hidden = value
+
+    def is_plain_text_field(self) -> bool:
+        if self.richly_editable:
+            return False
+        if self.editable:
+            return True
+        return self.role in ('textbox', 'ComboBox', 'searchbox')
+
+    def is_leaf_node(self) -> bool:
+        if not self.children:
+            return True
+        if self.is_plain_text_field() or self.role in TEXT_ONLY_ROLES or self.role in LEAF_ROLES:
+            return True
+        if self.has_focusable_child:
+            return False
+        if self.focusable and self.role not in ('WebArea', 'RootWebArea') and self.name:
+            return True
+        return self.role == 'heading' and bool(self.name)
+
+    def is_control(self) -> bool:
+        return self.role in CONTROL_ROLES
+
+    def is_interesting(self, inside_control: bool) -> bool:
+        if self.role == 'Ignored' or self.hidden:
+            return False
+        if self.focusable or self.richly_editable or self.is_control():
+            return True
+        if inside_control:
+            return False
+        return self.is_leaf_node() and bool(self.name)
+
+    def serialize(self, mmid: int | None) -> dict[str, Any]:
+        properties: dict[str, Any] = {}
+        for ax_property in self.payload.get('properties') or []:
+            properties[ax_property['name'].lower()] = ax_property['value'].get('value')
+        if self.payload.get('description'):
+            properties['description'] = self.payload['description'].get('value')
+        if mmid is not None:
+            # Same convention as the injection backend: the mmid of the element is carried in 'keyshortcuts'
+            properties['keyshortcuts'] = str(mmid)
+
+        role = {'RootWebArea': 'WebArea', 'StaticText': 'text'}.get(self.role, self.role)
+        node: dict[str, Any] = {'role': role, 'name': (self.payload['name'].get('value') or '') if self.payload.get('name') else ''}
+        for user_string_property in USER_STRING_PROPERTIES:
+            if user_string_property in properties:
+                node[user_string_property] = properties[user_string_property]
+        for boolean_property in BOOLEAN_PROPERTIES:
+            if boolean_property == 'focused' and self.role in ('WebArea', 'RootWebArea'):
+                continue
+            if properties.get(boolean_property):
+                node[boolean_property] = properties[boolean_property]
+        for numerical_property in NUMERICAL_PROPERTIES:
+            if numerical_property in properties:
+                node[numerical_property] = properties[numerical_property]
+        for token_property in TOKEN_PROPERTIES:
+            value = properties.get(token_property)
+            if value and value != 'false':
+                node[token_property] = value
+        if self.payload.get('value') and isinstance(self.payload['value'].get('value'), (str, int, float)):
+            node['value'] = self.payload['value']['value']
+        if 'checked' in properties:
+            node['checked'] = {'true': True, 'false': False}.get(str(properties['checked']), 'mixed')
+        if 'pressed' in properties:
+            node['pressed'] = {'true': True, 'false': False}.get(str(properties['pressed']), 'mixed')
+        return node
+
+
+def __index_dom_nodes(document: dict[str, Any]) -> tuple[dict[int, dict[str, Any]], set[int]]:
+    """
+    Indexes the nodes returned by 'DOM.getDocument' by their backendNodeId. Attribute lists are turned into dictionaries.
+    The document is requested with 'pierce', so the nodes inside shadow roots and iframe documents are indexed too, for their text.
+    Only the nodes of the main document can be found by an [mmid] selector from the page, their backendNodeIds are returned apart.
+    """
+    dom_nodes: dict[int, dict[str, Any]] = {}
+    main_document_nodes: set[int] = set()
+    stack: list[tuple[dict[str, Any], bool]] = [(document, True)]
+    while stack:
+        dom_node, in_main_document = stack.pop()
+        if 'attributes' in dom_node and not isinstance(dom_node['attributes'], dict):
+            flat_attributes = dom_node['attributes']
+            dom_node['attributes'] = dict(zip(flat_attributes[::2], flat_attributes[1::2], strict=True))
+        dom_nodes[dom_node['backendNodeId']] = dom_node
+        if in_main_document:
+            main_document_nodes.add(dom_node['backendNodeId'])
+        stack.extend((child, in_main_document) for child in dom_node.get('children', []))
+        stack.extend((shadow_root, False) for shadow_root in dom_node.get('shadowRoots', []))
+        if 'contentDocument' in dom_node:
+            stack.append((dom_node['contentDocument'], False))
+    return dom_nodes, main_document_nodes
+
+
+def __build_snapshot(ax_payloads: list[dict[str, Any]], dom_nodes: dict[int, dict[str, Any]], main_document_nodes: set[int]) -> dict[str, Any] | None:
+    """
+    Builds a tree with the same shape as page.accessibility.snapshot(interesting_only=True) from the flat list of nodes
+    returned by 'Accessibility.getFullAXTree'. Every node backed by an element of the main document gets its backendNodeId
+    as mmid. Like with the injection backend, the elements inside shadow roots and iframes get none.
+    """
+    if not ax_payloads:
+        return None
+
+    ax_nodes = {payload['nodeId']: _AXNode(payload) for payload in ax_payloads}
+    for ax_node in ax_nodes.values():
+        ax_node.children = [ax_nodes[child_id] for child_id in ax_node.payload.get('childIds') or [] if child_id in ax_nodes]
+    root = ax_nodes[ax_payloads[0]['nodeId']]
+
+    # Post-order pass to compute which nodes have a focusable descendant
+    post_order: list[_AXNode] = []
+    stack = [root]
+    while stack:
+        ax_node = stack.pop()
+        post_order.append(ax_node)
+        stack.extend(ax_node.children)
+    for ax_node in reversed(post_order):
+        ax_node.has_focusable_child = any(child.focusable or child.has_focusable_child for child in ax_node.children)
+
+    # Collect the interesting nodes, not descending into leaves
+    interesting: set[int] = set()
+    stack_with_context: list[tuple[_AXNode, bool]] = [(root, False)]
+    while stack_with_context:
+        ax_node, inside_control = stack_with_context.pop()
+        if ax_node.is_interesting(inside_control):
+            interesting.add(id(ax_node))
+        if ax_node.is_leaf_node():
+            continue
+        inside_control = inside_control or ax_node.is_control()
+        stack_with_context.extend((child, inside_control) for child in ax_node.children)
+
+    def mmid_of(ax_node: _AXNode) -> int | None:
+        backend_node_id = ax_node.payload.get('backendDOMNodeId')
+        dom_node = dom_nodes.get(backend_node_id) # type: ignore
+        if dom_node is not None and dom_node.get('nodeType') == ELEMENT_NODE and backend_node_id in main_document_nodes:
+            return backend_node_id
+        return None
+
+    # Serialize bottom-up: nodes that are not interesting are replaced by their serialized children
+    serialized: dict[int, list[dict[str, Any]]] = {}
+    for ax_node in reversed(post_order):
+        children: list[dict[str, Any]] = []
+        for child in ax_node.children:
+            children.extend(serialized.pop(id(child), []))
+        if ax_node is not root and id(ax_node) not in interesting:
+            serialized[id(ax_node)] = children
+            continue
+        node = ax_node.serialize(mmid_of(ax_node))
+        if children:
+            node['children'] = children
+        serialized[id(ax_node)] = [node]
+    return serialized[id(root)][0]
+
+
+def __text_content(dom_node: dict[str, Any]) -> str:
+    """
+    Approximates innerText with the whitespace-collapsed text of the descendant text nodes.
+    """
+    parts: list[str] = []
+    stack = [dom_node]
+    while stack:
+        current = stack.pop()
+        if current.get('nodeType') == TEXT_NODE:
+            parts.append(current.get('nodeValue', ''))
+        elif current.get('localName') not in TAGS_WITHOUT_TEXT:
+            stack.extend(reversed(current.get('children', [])))
+    return ' '.join(' '.join(parts).split())
+
+
+def __element_children(dom_node: dict[str, Any]) -> list[dict[str, Any]]:
+    return [child for child in dom_node.get('children', []) if child.get('nodeType') == ELEMENT_NODE]
+
+
+def __attribute(dom_node: dict[str, Any], attribute: str) -> str | None:
+    if attribute == 'mmid':
+        return str(dom_node['backendNodeId'])
+    return dom_node.get('attributes', {}).get(attribute)
+
+
+def __select_options(dom_node: dict[str, Any], selected_options: set[int]) -> list[dict[str, Any]]:
+    options: list[dict[str, Any]] = []
+    stack = list(reversed(__element_children(dom_node)))
+    while stack:
+        child = stack.pop()
+        if child.get('localName') == 'option':
+            text = __text_content(child)
+            value = child.get('attributes', {}).get('value')
+            options.append({"mmid": str(child['backendNodeId']), "text": text, "value": text if value is None else value,
+                            "selected": child['backendNodeId'] in selected_options or 'selected' in child.get('attributes', {})})
+        elif child.get('localName') == 'optgroup':
+            stack.extend(reversed(__element_children(child)))
+    return options
+
+
+def __list_item(dom_node: dict[str, Any]) -> dict[str, Any]:
+    attributes_to_include = ['mmid', 'role', 'aria-label', 'value']
+    return {attribute: __attribute(dom_node, attribute) for attribute in attributes_to_include if __attribute(dom_node, attribute) is not None}
+
+
+def __describe_dom_element(dom_node: dict[str, Any], should_fetch_inner_text: bool, params: dict[str, Any], selected_options: set[int]) -> dict[str, Any] | None:
+    """
+    Describes an element from the DOM tree the same way the in-page enrichment JS does, without touching the page.
+    """
+    tag = dom_node.get('localName', '')
+    if dom_node.get('attributes', {}).get('id', '') in params['ids_to_ignore']:
+        return None
+    if tag in params['tags_to_ignore'] or tag == 'option':
+        return None
+
+    attributes_to_values: dict[str, Any] = {'tag': tag}
+    if tag == 'input':
+        input_type = dom_node.get('attributes', {}).get('type', '').lower()
+        attributes_to_values['tag_type'] = input_type if input_type in INPUT_TYPES else 'text'
+    elif tag == 'select':
+        attributes_to_values['mmid'] = __attribute(dom_node, 'mmid')
+        attributes_to_values['role'] = 'combobox'
+        options = __select_options(dom_node, selected_options)
+        limit = params['list_preview_limit']
+        attributes_to_values['options'] = options[:limit]
+        if len(options) > limit:
+            attributes_to_values['options'] += [option for option in options[limit:] if option['selected']]
+            attributes_to_values['options_total'] = len(options)
+        return attributes_to_values
+
+    for attribute in params['attributes']:
+        value = __attribute(dom_node, attribute)
+        if value:
+            attributes_to_values[attribute] = value
+
+    if should_fetch_inner_text:
+        inner_text = __text_content(dom_node)
+        if inner_text:
+            attributes_to_values['description'] = inner_text
+
+    if dom_node.get('attributes', {}).get('role') == 'listbox' or tag == 'ul':
+        children = __element_children(dom_node)
+        attributes_to_values['additional_info'] = [__list_item(child) for child in children[:params['list_preview_limit']]]
+        if len(children) > params['list_preview_limit']:
+            attributes_to_values['additional_info_total'] = len(children)
+
+    minimal_keys = ['tag', 'mmid']
+    keys = list(attributes_to_values.keys())
+    has_more_than_minimal_keys = len(keys) > len(minimal_keys) or any(key not in minimal_keys for key in keys)
+    if not has_more_than_minimal_keys:
+        for backup_attribute in params['backup_attributes']:
+            value = __attribute(dom_node, backup_attribute)
+            if value:
+                attributes_to_values[backup_attribute] = value
+
+        if len(attributes_to_values) <= len(minimal_keys):
+            if tag == 'button':
+                attributes_to_values['mmid'] = __attribute(dom_node, 'mmid')
+                attributes_to_values['role'] = 'button'
+                attributes_to_values['additional_info'] = []
+                attributes_to_exclude = ['width', 'height', 'path', 'class', 'viewBox', 'mmid']
+                if __text_content(dom_node) == '':
+                    for child in __element_children(dom_node):
+                        attributes_to_values['additional_info'].append(
+                            {name: value for name, value in child.get('attributes', {}).items() if name not in attributes_to_exclude})
+                    return attributes_to_values
+            return None
+    return attributes_to_values
+
+
+async def get_cdp_accessibility_snapshot(page: Page):
+    """
+    Captures the accessibility tree of the page over CDP without writing anything into the DOM.
+
+    'Accessibility.getFullAXTree' and 'DOM.getDocument' are sent over the page's reused CDP session (two round trips in total).
+    The AX nodes are mapped to their DOM elements through 'backendDOMNodeId', which also serves as the mmid of the element.
+
+    Args:
+        page (Page): The page to capture the accessibility tree of.
+
+    Returns:
+        tuple[dict[str, Any] | None, Callable]: The accessibility snapshot, in the same shape as page.accessibility.snapshot(),
+            and a function that describes a batch of elements of the snapshot by mmid from the captured DOM.
+    """
+    ax_payloads: list[dict[str, Any]] = (await send_cdp_command(page, "Accessibility.getFullAXTree"))["nodes"]
+    document: dict[str, Any] = (await send_cdp_command(page, "DOM.getDocument", {"depth": -1, "pierce": True}))["root"]
+    dom_nodes, main_document_nodes = __index_dom_nodes(document)
+    snapshot = __build_snapshot(ax_payloads, dom_nodes, main_document_nodes)
+    _pages_with_cdp_mmids.add(page)
+
+    # The live selected state of options is not reflected in attributes, the AX tree has it
+    selected_options: set[int] = set()
+    for payload in ax_payloads:
+        if payload.get('role', {}).get('value') in ('option', 'MenuListOption'):
+            if any(p['name'] == 'selected' and p['value'].get('value') for p in payload.get('properties') or []):
+                selected_options.add(payload.get('backendDOMNodeId')) # type: ignore
+
+    def describe_elements(element_requests: list[dict[str, Any]], params: dict[str, Any]) -> list[dict[str, Any] | None]:
+        descriptions: list[dict[str, Any] | None] = []
+        for request in element_requests:
+            dom_node = dom_nodes.get(request['mmid'])
+            descriptions.append(None if dom_node is None else __describe_dom_element(dom_node, request['should_fetch_inner_text'], params, selected_options))
+        return descriptions
+
+    logger.debug(f"Captured {len(ax_payloads)} AX nodes and {len(dom_nodes)} DOM nodes over CDP")
+    return snapshot, describe_elements
+
+
+async def ensure_mmid_in_dom(page: Page, selector: str) -> bool:
+    """
+    Makes an mmid handed out by the CDP backend resolvable by regular query selectors. The 'mmid' attribute is written only
+    onto the one element the action targets, found through its backendNodeId. Any other element that carries the same
+    mmid (e.g. from an earlier snapshot with the injection backend) loses the attribute so the selector stays unique.
+
+    Args:
+        page (Page): The page the selector will be used on.
+        selector (str): The selector the action is going to use, e.g. [mmid='114'].
+
+    Returns:
+        bool: True if the mmid attribute was written onto the element, False if there was nothing to do or the node is gone.
+    """
+    match = mmid_selector.match(selector)
+    if match is None or page not in _pages_with_cdp_mmids:
+        return False
+
+    mmid = match.group(1)
+    try:
+        resolved = await send_cdp_command(page, "DOM.resolveNode", {"backendNodeId": int(mmid), "objectGroup": "agente-mmid"})
+        await send_cdp_command(page, "Runtime.callFunctionOn", {
+            "objectId": resolved["object"]["objectId"],
+            "functionDeclaration": """function(mmid) {
+                for (const other of document.querySelectorAll(`[mmid="${mmid}"]`)) {
+                    if (other !== this) other.removeAttribute('mmid');
+                }
+                this.setAttribute('mmid', mmid);
+            }""",
+            "arguments": [{"value": mmid}],
+        })
+        await send_cdp_command(page, "Runtime.releaseObjectGroup", {"objectGroup": "agente-mmid"})
+        return True
+    except Exception as e:
+        logger.debug(f"Could not resolve mmid {mmid} through its backendNodeId: {e}")
+        return False
+
+
+async def get_list_items_over_cdp(page: Page, mmid: str) -> list[dict[str, Any]] | None:
+    """
+    Lists every option of a select, or every item of a listbox or list, whose mmid was handed out by the CDP backend. The items
+    are described like in the snapshots, along with their text. The selected state of options is read from their attributes.
+
+    Args:
+        page (Page): The page the list is on.
+        mmid (str): The mmid of the list, which is its backendNodeId.
+
+    Returns:
+        list[dict[str, Any]] | None: The items of the list, or None if the mmids of the page were not handed out by the CDP backend.
+    """
+    if page not in _pages_with_cdp_mmids:
+        return None
+    dom_node: dict[str, Any] = (await send_cdp_command(page, "DOM.describeNode", {"backendNodeId": int(mmid), "depth": -1}))["node"]
+    __index_dom_nodes(dom_node)
+    if dom_node.get('localName') == 'select':
+        return __select_options(dom_node, set())
+    return [{**__list_item(child), "text": __text_content(child)} for child in __element_children(dom_node)]
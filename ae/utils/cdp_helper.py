@@ -0,0 +1,54 @@
+import weakref
+from typing import Any
+
+from playwright.async_api import CDPSession
+from playwright.async_api import Page
+
+from ae.utils.logger import logger
+
+# One CDP session per page, created on first use and reused for every command sent to that page afterwards
+_cdp_sessions: "weakref.WeakKeyDictionary[Page, CDPSession]" = weakref.WeakKeyDictionary()
+
+
+async def get_cdp_session(page: Page) -> CDPSession:
+    """
+    Returns the CDP session attached to the given page. The session is created on first use and reused afterwards,
+    so callers do not pay for attaching a new session on every command.
+
+    Args:
+        page (Page): The page to get the CDP session for.
+
+    Returns:
+        CDPSession: The CDP session attached to the page.
+    """
+    session = _cdp_sessions.get(page)
+    if session is None:
+        session = await page.context.new_cdp_session(page)
+        _cdp_sessions[page] = session
+        logger.debug(f"Attached a new CDP session to page {page.url}")
+    return session
+
+
+async def send_cdp_command(page: Page, method: str, params: dict[str, Any] | None = None) -> dict[str, Any]:
+    """
+    Sends a CDP command over the page's reused CDP session. If the session was detached (e.g. the target was swapped),
+    a new session is attached and the command is retried once.
+
+    Args:
+        page (Page): The page to send the command to.
+        method (str): The CDP method, e.g. 'Accessibility.getFullAXTree'.
+        params (dict[str, Any] | None): The parameters of the CDP method.
+
+    Returns:
+        dict[str, Any]: The result of the CDP command.
+    """
+    session = await get_cdp_session(page)
+    try:
+        return await session.send(method, params or {})
+    except Exception as e:
+        if "closed" not in str(e).lower() and "detached" not in str(e).lower():
+            raise
+        logger.debug(f"CDP session of page {page.url} is no longer usable, attaching a new one. Error: {e}")
+        _cdp_sessions.pop(page, None)
+        session = await get_cdp_session(page)
+        return await session.send(method, params or {})
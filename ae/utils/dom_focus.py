@@ -0,0 +1,59 @@
+from typing import Any
+
+from ae.utils.dom_search_index import ElementIndex
+from ae.utils.dom_search_index import top_elements
+
+# Number of elements kept by default when the tree is focused on a goal
+FOCUS_TOP_K = 20
+
+
+def focus_tree(tree: dict[str, Any], focus: str, top_k: int = FOCUS_TOP_K) -> tuple[dict[str, Any], int]:
+    """
+    Keeps the elements of the tree that are the most relevant to a goal, e.g. 'click the search button', along with their ancestors.
+
+    Every element with an mmid is scored with BM25 against the goal, using the values of its fields and the text of its
+    descendants that have no mmid (e.g. the text of a link), see ElementIndex. The top_k best elements are kept along with
+    those descendants, and their ancestors are kept with their own fields, so the hierarchy and the page order are preserved.
+    Scoring is local and lexical: nothing is sent over the network.
+
+    Args:
+        tree (dict[str, Any]): The enriched accessibility tree. It is not modified.
+        focus (str): The goal to rank the elements against.
+        top_k (int): The number of elements to keep.
+
+    Returns:
+        tuple[dict[str, Any], int]: The focused tree and the number of elements matching the goal. If no element matches,
+            the whole tree is returned.
+    """
+    index = ElementIndex(tree)
+    scores = index.scores(focus)
+    if not scores:
+        return tree, 0
+    matched = set(top_elements(scores, top_k))
+
+    # The matched elements and the nodes that belong to them are kept, then the ancestors of the kept nodes
+    nodes_in_order: list[dict[str, Any]] = []
+    parents: dict[int, dict[str, Any] | None] = {}
+    kept: set[int] = {id(tree)}
+    stack: list[tuple[dict[str, Any], dict[str, Any] | None]] = [(tree, None)]
+    while stack:
+        node, parent = stack.pop()
+        nodes_in_order.append(node)
+        parents[id(node)] = parent
+        if index.owners.get(id(node)) in matched:
+            ancestor: dict[str, Any] | None = node
+            while ancestor is not None and id(ancestor) not in kept:
+                kept.add(id(ancestor))
+                ancestor = parents[id(ancestor)]
+        stack.extend((child, node) for child in reversed(node.get('children', [])))
+
+    copies: dict[int, dict[str, Any]] = {}
+    for node in reversed(nodes_in_order):
+        if id(node) not in kept:
+            continue
+        node_copy = {key: value for key, value in node.items() if key != 'children'}
+        children = [copies.pop(id(child)) for child in node.get('children', []) if id(child) in copies]
+        if children:
+            node_copy['children'] = children
+        copies[id(node)] = node_copy
+    return copies[id(tree)], len(scores)
@@ -1,45 +1,313 @@
 import asyncio
+import os
+import weakref
+from typing import Any
 
 from playwright.async_api import ElementHandle
+from playwright.async_api import Error
+from playwright.async_api import Frame
 from playwright.async_api import Page
+from playwright.async_api import Request
 
 from ae.utils.logger import logger
 
 
 async def wait_for_non_loading_dom_state(page: Page, max_wait_millis: int):
-    max_wait_seconds = max_wait_millis / 1000
-    end_time = asyncio.get_event_loop().time() + max_wait_seconds
-    while asyncio.get_event_loop().time() < end_time:
-        dom_state = await page.evaluate("document.readyState")
+    """
+    Waits until the document of the page is no longer loading (it was parsed, external resources may still be loading), in one
+    round trip that resolves on the readystatechange event, or until max_wait_millis elapsed. If the page navigates meanwhile,
+    waits for the new document.
+    """
+    end_time = asyncio.get_event_loop().time() + max_wait_millis / 1000
+    while (remaining := end_time - asyncio.get_event_loop().time()) > 0:
+        try:
+            dom_state = await page.evaluate(__NON_LOADING_STATE_JS, int(remaining * 1000))
+        except Error as e:
+            # The execution context is destroyed when the page navigates, the new document is waited for
+            logger.debug(f"Page navigated while waiting for the DOM to be ready: {e}")
+            await asyncio.sleep(0.05)
+            continue
+        logger.debug(f"DOM state: {dom_state}")
         if dom_state != "loading":
-            logger.debug(f"DOM state is not 'loading': {dom_state}")
-            break  # Exit the loop if the DOM state is not 'loading'
+            break
+
+
+# Resolves with the ready state of the document as soon as it is not 'loading', or with 'loading' after maxMillis
+__NON_LOADING_STATE_JS = """(maxMillis) => new Promise(resolve => {
+    if (document.readyState !== 'loading') {
+        resolve(document.readyState);
+        return;
+    }
+    const timeout = setTimeout(() => resolve(document.readyState), maxMillis);
+    document.addEventListener('readystatechange', () => {
+        clearTimeout(timeout);
+        resolve(document.readyState);
+    }, {once: true});
+})"""
+
+# Time without DOM mutation, request in flight nor navigation after which a page is considered settled after an action
+SETTLE_QUIET_MILLIS = int(os.getenv("SETTLE_QUIET_MILLIS", 300))
+
+# Maximum time spent waiting for a page to settle after an action
+SETTLE_MAX_WAIT_MILLIS = int(os.getenv("SETTLE_MAX_WAIT_MILLIS", 5000))
+
+# Resource types of the requests that are waited for, the ones that can change the content of the page. Images, fonts, media and
+# long-lived connections (websockets, event sources) are not.
+SETTLE_REQUEST_TYPES = frozenset(('document', 'xhr', 'fetch', 'script', 'stylesheet'))
+
+# Tells whether a mutation changes the content of the page: the attributes injected to label the elements and the changes of the
+# Agent-E overlay are not relevant. Defined as named functions so that the scripts watching the DOM can embed them.
+RELEVANT_MUTATION_JS = """
+function isAgentEOverlay(node) {
+    const element = node.nodeType === Node.ELEMENT_NODE ? node : node.parentElement;
+    return !!(element && element.closest('#agente-overlay, #AgentEOverlayBorder, #agentDriveAutoOverlay'));
+}
+
+function isRelevantMutation(mutation) {
+    if (mutation.type === 'attributes' && ['mmid', 'aria-keyshortcuts', 'orig-aria-keyshortcuts'].includes(mutation.attributeName)) {
+        return false;
+    }
+    if (isAgentEOverlay(mutation.target)) return false;
+    if (mutation.type === 'childList') {
+        return [...mutation.addedNodes, ...mutation.removedNodes].some(node => !isAgentEOverlay(node));
+    }
+    return true;
+}
+"""
+
+# Returns the id of the document, kept on the window so it stays the same for the lifetime of the document and changes on
+# navigation. Defined as a named function so that the scripts identifying the document can embed it.
+DOCUMENT_ID_JS = """
+function documentId() {
+    if (!window.__agenteDocumentId) {
+        window.__agenteDocumentId = `${Date.now()}-${Math.random().toString(36).slice(2)}`;
+    }
+    return window.__agenteDocumentId;
+}
+"""
+
+# Resolves with true once the document went quietMillis without relevant mutation, or with false after maxMillis
+__DOM_QUIET_JS = """({quietMillis, maxMillis}) => new Promise(resolve => {
+    """ + RELEVANT_MUTATION_JS + """
+    let quietTimer = null;
+    let limitTimer = null;
+    const observer = new MutationObserver(mutations => {
+        if (!mutations.some(isRelevantMutation)) return;
+        clearTimeout(quietTimer);
+        quietTimer = setTimeout(() => done(true), quietMillis);
+    });
+    const done = quiet => {
+        observer.disconnect();
+        clearTimeout(quietTimer);
+        clearTimeout(limitTimer);
+        resolve(quiet);
+    };
+    observer.observe(document, {subtree: true, childList: true, attributes: true, characterData: true});
+    quietTimer = setTimeout(() => done(true), quietMillis);
+    limitTimer = setTimeout(() => done(false), maxMillis);
+})"""
+
+
+class PageActivity:
+    """
+    Counts the requests in flight and the navigations of the main frame of a page, from the events of the page.
+
+    Attributes:
+        requests_in_flight (set[Request]): The requests of one of SETTLE_REQUEST_TYPES sent and not yet finished or failed.
+        navigations (int): The number of navigations of the main frame since the page is watched.
+        idle (asyncio.Event): Set while no request is in flight.
+    """
+
+    def __init__(self, page: Page):
+        self.requests_in_flight: set[Request] = set()
+        self.navigations = 0
+        self.idle = asyncio.Event()
+        self.idle.set()
+        page.on("request", self._on_request)
+        page.on("requestfinished", self._on_request_done)
+        page.on("requestfailed", self._on_request_done)
+        page.on("framenavigated", self._on_frame_navigated)
+
+    def _on_request(self, request: Request):
+        if request.resource_type in SETTLE_REQUEST_TYPES:
+            self.requests_in_flight.add(request)
+            self.idle.clear()
+
+    def _on_request_done(self, request: Request):
+        self.requests_in_flight.discard(request)
+        if not self.requests_in_flight:
+            self.idle.set()
+
+    def _on_frame_navigated(self, frame: Frame):
+        if frame.parent_frame is None:
+            self.navigations += 1
+            # The requests of the previous document are abandoned when it is unloaded
+            self.requests_in_flight.clear()
+            self.idle.set()
+
+
+_page_activities: "weakref.WeakKeyDictionary[Page, PageActivity]" = weakref.WeakKeyDictionary()
+
+
+def watch_page_activity(page: Page) -> PageActivity:
+    """
+    Starts counting the requests and navigations of the page, if not already done. Call it before an action, so that the requests
+    the action sends are counted by wait_for_page_to_settle.
+    """
+    activity = _page_activities.get(page)
+    if activity is None:
+        activity = PageActivity(page)
+        _page_activities[page] = activity
+    return activity
+
+
+async def wait_for_page_to_settle(page: Page, max_wait_millis: int = SETTLE_MAX_WAIT_MILLIS,
+                                  quiet_millis: int = SETTLE_QUIET_MILLIS) -> tuple[float, bool]:
+    """
+    Waits for the page to settle after an action: until its DOM went quiet_millis without mutation, no request that can change
+    its content is in flight and the document of any navigation is loaded, or until max_wait_millis elapsed.
+
+    The DOM is watched by a MutationObserver in one evaluate that resolves once the DOM is quiet, the requests and navigations
+    are counted from the events of the page (see watch_page_activity). A page that does not change settles in quiet_millis.
+
+    Args:
+        page (Page): The page to wait for.
+        max_wait_millis (int): The maximum time to wait.
+        quiet_millis (int): How long the DOM must stay unchanged.
+
+    Returns:
+        tuple[float, bool]: The time waited in seconds, and whether the page settled before max_wait_millis.
+    """
+    activity = watch_page_activity(page)
+    loop = asyncio.get_event_loop()
+    start_time = loop.time()
+    end_time = start_time + max_wait_millis / 1000
+    settled = False
+    while (remaining := end_time - loop.time()) > 0:
+        navigations = activity.navigations
+        navigated = False
+        try:
+            dom_quiet = await page.evaluate(__DOM_QUIET_JS, {"quietMillis": quiet_millis, "maxMillis": int(remaining * 1000)})
+        except Error as e:
+            # The execution context is destroyed when the page navigates
+            logger.debug(f"Page navigated while waiting for it to settle: {e}")
+            dom_quiet = False
+            navigated = not page.is_closed()
+        if navigated or activity.navigations != navigations:
+            try:
+                await page.wait_for_load_state("domcontentloaded", timeout=max(end_time - loop.time(), 0.001) * 1000)
+            except Error:
+                break
+            continue
+        if not dom_quiet:
+            break
+        if activity.idle.is_set():
+            settled = True
+            break
+        try:
+            await asyncio.wait_for(activity.idle.wait(), timeout=end_time - loop.time())
+        except asyncio.TimeoutError:
+            break
+        # The responses may still change the DOM, it is watched again
+
+    waited = loop.time() - start_time
+    if settled:
+        logger.debug(f"Page settled in {waited * 1000:.0f} ms")
+    else:
+        logger.info(f"Page not settled after {waited * 1000:.0f} ms: {len(activity.requests_in_flight)} requests in flight")
+    return waited, settled
+
+
+def describe_settle_wait(waited: float, settled: bool) -> str:
+    """
+    Tells how long an action waited for the page to settle, as returned by wait_for_page_to_settle.
+    """
+    if settled:
+        return f"The page settled {waited:.1f} seconds after the action."
+    return f"The page was still changing {waited:.1f} seconds after the action."
+
+
+async def get_document_id(page: Page) -> str:
+    """
+    Returns an id that identifies the document currently loaded in the page. The id is kept on the window,
+    so it stays the same for the lifetime of the document and changes on navigation.
 
-        await asyncio.sleep(0.05)
+    Args:
+        page (Page): The page to get the document id of.
+
+    Returns:
+        str: The id of the current document.
+    """
+    return await page.evaluate(f"() => {{ {DOCUMENT_ID_JS}\n return documentId(); }}")
+
+
+async def get_dom_fingerprint(page: Page) -> dict[str, Any]:
+    """
+    Returns what identifies the current state of the page's DOM, in one round trip: the document id, the URL, the mutation epoch
+    and the scroll position and size of the viewport.
+
+    The mutation epoch is a counter kept on the window, incremented by a MutationObserver on any change to the document and by the
+    input, change and focus events (form values are not attributes, so typing does not mutate the DOM). The attributes injected to
+    label the elements and the changes of the Agent-E overlay are ignored. The observer is installed by the first call on a document.
+    Changes in shadow roots and iframes, and style changes that do not touch the DOM (e.g. :hover), are not detected.
+
+    Args:
+        page (Page): The page to get the fingerprint of.
+
+    Returns:
+        dict[str, Any]: The 'document_id', 'url', 'epoch' and 'viewport' ([scrollX, scrollY, innerWidth, innerHeight]) of the page.
+    """
+    return await page.evaluate("""() => {
+        """ + DOCUMENT_ID_JS + RELEVANT_MUTATION_JS + """
+        if (window.__agenteMutationEpoch === undefined) {
+            window.__agenteMutationEpoch = 0;
+            new MutationObserver(mutations => {
+                if (mutations.some(isRelevantMutation)) window.__agenteMutationEpoch++;
+            }).observe(document, {subtree: true, childList: true, attributes: true, characterData: true});
+            for (const type of ['input', 'change', 'focusin', 'focusout']) {
+                document.addEventListener(type, event => {
+                    if (!isAgentEOverlay(event.target)) window.__agenteMutationEpoch++;
+                }, true);
+            }
+        }
+        return {
+            document_id: documentId(),
+            url: location.href,
+            epoch: window.__agenteMutationEpoch,
+            viewport: [window.scrollX, window.scrollY, window.innerWidth, window.innerHeight]
+        };
+    }""")
+
+
+# Attributes written in the opening tag that describes an element acted on
+OPENING_TAG_ATTRIBUTES = ['id', 'name', 'aria-label', 'placeholder', 'href', 'src', 'aria-autocomplete', 'role', 'type',
+                          'data-testid', 'value', 'selected', 'aria-labelledby', 'aria-describedby', 'aria-haspopup']
+
+# Writes the opening tag of an element with the non empty OPENING_TAG_ATTRIBUTES. Defined as a named function so that the action
+# scripts can embed it.
+OPENING_TAG_JS = """
+function openingTag(element, attributes) {
+    let tag = `<${element.tagName.toLowerCase()}`;
+    for (const attribute of attributes) {
+        const value = element.getAttribute(attribute);
+        if (value) tag += ` ${attribute}="${value}"`;
+    }
+    return tag + '>';
+}
+"""
 
 
 async def get_element_outer_html(element: ElementHandle, page: Page, element_tag_name: str|None = None) -> str:
     """
-    Constructs the opening tag of an HTML element along with its attributes.
+    Constructs the opening tag of an HTML element along with its attributes, in one round trip.
 
     Args:
         element (ElementHandle): The element to retrieve the opening tag for.
         page (Page): The page object associated with the element.
-        element_tag_name (str, optional): The tag name of the element. Defaults to None. If not passed, it will be retrieved from the element.
+        element_tag_name (str, optional): Unused, the tag name is read along with the attributes. Kept for compatibility.
 
     Returns:
         str: The opening tag of the HTML element, including a select set of attributes.
     """
-    tag_name: str = element_tag_name if element_tag_name else await page.evaluate("element => element.tagName.toLowerCase()", element)
-
-    attributes_of_interest: list[str] = ['id', 'name', 'aria-label', 'placeholder', 'href', 'src', 'aria-autocomplete', 'role', 'type',
-                                         'data-testid', 'value', 'selected', 'aria-labelledby', 'aria-describedby', 'aria-haspopup']
-    opening_tag: str = f'<{tag_name}'
-
-    for attr in attributes_of_interest:
-        value: str = await element.get_attribute(attr) # type: ignore
-        if value:
-            opening_tag += f' {attr}="{value}"'
-    opening_tag += '>'
-
-    return opening_tag
+    return await element.evaluate(f"(element, attributes) => {{ {OPENING_TAG_JS}\n return openingTag(element, attributes); }}",
+                                  OPENING_TAG_ATTRIBUTES)
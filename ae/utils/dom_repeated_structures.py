@@ -0,0 +1,126 @@
+from typing import Any
+
+# Minimum number of consecutive siblings with the same shape for them to be written as rows
+MIN_REPEATED_ROWS = 3
+
+# Fields that make up the shape of a node along with its keys, rather than varying between rows
+SHAPE_FIELDS = ('tag', 'role')
+
+
+def __node_label(node: dict[str, Any]) -> str:
+    return node.get('tag') or node.get('role') or 'node'
+
+
+def __compute_shapes(tree: dict[str, Any]) -> dict[int, int]:
+    """
+    Computes the shape of every subtree: the tag and role of its nodes, their keys and the shapes of their children, in order.
+    Shapes are interned into integers bottom-up, so that comparing two subtrees is comparing two integers.
+
+    Returns:
+        dict[int, int]: The shape id of every node, keyed by the id() of the node.
+    """
+    post_order: list[dict[str, Any]] = []
+    stack = [tree]
+    while stack:
+        node = stack.pop()
+        post_order.append(node)
+        stack.extend(node.get('children', []))
+
+    interned_shapes: dict[tuple[Any, ...], int] = {}
+    shapes: dict[int, int] = {}
+    for node in reversed(post_order):
+        shape = (tuple(node.get(field) for field in SHAPE_FIELDS),
+                 tuple(key for key in node if key != 'children'),
+                 tuple(shapes[id(child)] for child in node.get('children', [])))
+        shapes[id(node)] = interned_shapes.setdefault(shape, len(interned_shapes))
+    return shapes
+
+
+def __flatten_row(node: dict[str, Any]) -> list[tuple[str, Any]]:
+    """
+    Flattens a subtree into (column, value) pairs, in document order. Fields of the root are named by their key, fields of the
+    descendants by the tag or role of their node and their key, e.g. 'a.text'. Nodes with the same label get numbered, e.g. 'a2.text'.
+    """
+    row: list[tuple[str, Any]] = []
+    label_counts: dict[str, int] = {}
+    stack: list[tuple[dict[str, Any], bool]] = [(node, True)]
+    while stack:
+        current, is_root = stack.pop()
+        prefix = ""
+        if not is_root:
+            label = __node_label(current)
+            label_counts[label] = label_counts.get(label, 0) + 1
+            prefix = f"{label}{label_counts[label] if label_counts[label] > 1 else ''}."
+        for key, value in current.items():
+            if key == 'children' or (key in SHAPE_FIELDS and key == ('tag' if 'tag' in current else 'role')):
+                continue
+            row.append((prefix + key, value))
+        stack.extend((child, False) for child in reversed(current.get('children', [])))
+    return row
+
+
+def __as_rows(run: list[dict[str, Any]]) -> dict[str, Any]:
+    """
+    Writes a run of subtrees with the same shape as one node: the fields that are the same in every subtree, the names of
+    the fields that vary, and one row of values per subtree.
+    """
+    flattened_rows = [__flatten_row(node) for node in run]
+    columns = [column for column, _ in flattened_rows[0]]
+    common: dict[str, Any] = {}
+    varying_indexes: list[int] = []
+    for index, (column, value) in enumerate(flattened_rows[0]):
+        if all(row[index][1] == value for row in flattened_rows[1:]):
+            common[column] = value
+        else:
+            varying_indexes.append(index)
+
+    return {
+        "repeated": __node_label(run[0]),
+        "count": len(run),
+        "common": common,
+        "columns": [columns[index] for index in varying_indexes],
+        "rows": [[row[index][1] for index in varying_indexes] for row in flattened_rows],
+    }
+
+
+def collapse_repeated_structures(tree: dict[str, Any], min_rows: int = MIN_REPEATED_ROWS) -> dict[str, Any]:
+    """
+    Detects runs of consecutive siblings that have the same shape (e.g. search results, product cards or table rows) and writes
+    each run once, as the fields its subtrees have in common plus one row per subtree with the fields that vary. The mmids vary
+    between subtrees, so every mmid of the tree is kept in the rows.
+
+    Runs are detected top-down: the subtrees of a run are written as rows as a whole, runs inside them are not collapsed again.
+    The tree is not modified, the nodes that change are copied.
+
+    Args:
+        tree (dict[str, Any]): The pruned enriched accessibility tree.
+        min_rows (int): The minimum number of consecutive siblings with the same shape for them to be collapsed.
+
+    Returns:
+        dict[str, Any]: The tree with the repeated structures collapsed.
+    """
+    shapes = __compute_shapes(tree)
+    collapsed_tree = dict(tree)
+    stack = [collapsed_tree]
+    while stack:
+        node = stack.pop()
+        children = node.get('children')
+        if not children:
+            continue
+
+        new_children: list[dict[str, Any]] = []
+        start = 0
+        while start < len(children):
+            end = start + 1
+            while end < len(children) and shapes[id(children[end])] == shapes[id(children[start])]:
+                end += 1
+            if end - start >= min_rows:
+                new_children.append(__as_rows(children[start:end]))
+            else:
+                for child in children[start:end]:
+                    child_copy = dict(child)
+                    new_children.append(child_copy)
+                    stack.append(child_copy)
+            start = end
+        node['children'] = new_children
+    return collapsed_tree
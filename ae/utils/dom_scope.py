@@ -0,0 +1,202 @@
+import json
+import re
+from typing import Any
+
+from playwright.async_api import Page
+
+from ae.utils.cdp_helper import send_cdp_command
+from ae.utils.logger import logger
+
+viewport_scope = re.compile(r'^\s*viewport\s*(?:\+\s*(\d+)\s*(?:screens?)?)?\s*(?:@\s*(\d+))?\s*$', re.IGNORECASE)
+mmid_scope = re.compile(r"""^\s*(?:mmid\s*[:=]\s*['"]?(\d+)['"]?|(\d+)|\[\s*mmid\s*=\s*['"]?(\d+)['"]?\s*\])\s*$""", re.IGNORECASE)
+
+# Computes, in a single pass over the labelled elements, which of them are rendered inside the requested region or container.
+_RESOLVE_SCOPE_JS = """
+(scope) => {
+    const isRendered = (element, rect) => {
+        if (typeof element.checkVisibility === 'function') {
+            if (!element.checkVisibility({ checkVisibilityCSS: true })) return false;
+        } else {
+            const style = window.getComputedStyle(element);
+            if (style.display === 'none' || style.visibility === 'hidden' || style.visibility === 'collapse') return false;
+        }
+        return rect.width > 0 || rect.height > 0;
+    };
+
+    const viewportWidth = window.innerWidth;
+    const viewportHeight = window.innerHeight;
+    const pageHeight = Math.max(document.documentElement.scrollHeight, document.body ? document.body.scrollHeight : 0);
+    const inScope = [];
+
+    if (scope.container_selector !== null) {
+        let container;
+        try {
+            container = document.querySelector(scope.container_selector);
+        } catch (e) {
+            return { error: `Invalid container selector ${scope.container_selector}: ${e.message}` };
+        }
+        if (!container) {
+            return { error: `No element matches the container selector ${scope.container_selector}` };
+        }
+        for (const element of [container, ...container.querySelectorAll('[mmid]')]) {
+            const mmid = element.getAttribute('mmid');
+            if (mmid && isRendered(element, element.getBoundingClientRect())) inScope.push(mmid);
+        }
+        return { in_scope: inScope, page_height: pageHeight, viewport_height: viewportHeight };
+    }
+
+    const top = scope.top === null ? window.scrollY : scope.top;
+    const bottom = top + viewportHeight * scope.screens;
+    for (const element of document.querySelectorAll('[mmid]')) {
+        const rect = element.getBoundingClientRect();
+        if (!isRendered(element, rect)) continue;
+        const elementTop = rect.top + window.scrollY;
+        const elementBottom = elementTop + rect.height;
+        const inRegion = rect.height > 0 ? (elementTop < bottom && elementBottom > top) : (elementTop >= top && elementTop < bottom);
+        if (inRegion && rect.right > 0 && rect.left < viewportWidth) inScope.push(element.getAttribute('mmid'));
+    }
+    return { in_scope: inScope, top: top, bottom: bottom, page_height: pageHeight, viewport_height: viewportHeight };
+}
+"""
+
+
+class DomScope:
+    """
+    The part of the page a DOM extraction is restricted to: a region of the page measured in screens (the viewport by default),
+    or the subtree of a container element given by a query selector or an mmid.
+
+    A scope is resolved against the page once the elements carry their mmids. Resolving computes the bounding box and the visibility
+    of every element in one pass and keeps the mmids of the rendered elements inside the scope. Elements outside of it are not enriched.
+
+    Attributes:
+        scope (str): The scope as given by the caller.
+        screens (int): The height of the region in screens, for region scopes.
+        top (int | None): The document offset the region starts at, or None to start at the current scroll position.
+        container_selector (str | None): The query selector of the container, for container scopes.
+        container_mmid (int | None): The mmid of the container, for container scopes given by mmid.
+        in_scope_mmids (set[int]): The mmids of the elements inside the scope, once resolved.
+        region (dict[str, int] | None): The resolved region boundaries and page height, for region scopes.
+    """
+
+    def __init__(self, scope: str):
+        self.scope = scope
+        self.screens = 1
+        self.top: int | None = None
+        self.container_selector: str | None = None
+        self.container_mmid: int | None = None
+        self.in_scope_mmids: set[int] = set()
+        self.region: dict[str, int] | None = None
+
+        viewport_match = viewport_scope.match(scope)
+        mmid_match = mmid_scope.match(scope)
+        if viewport_match:
+            self.screens = 1 + int(viewport_match.group(1) or 0)
+            self.top = int(viewport_match.group(2)) if viewport_match.group(2) is not None else None
+        elif mmid_match:
+            self.container_mmid = int(next(group for group in mmid_match.groups() if group is not None))
+            self.container_selector = f"[mmid='{self.container_mmid}']"
+        elif scope.strip():
+            self.container_selector = scope.strip()
+        else:
+            raise ValueError("The scope must be 'viewport', 'viewport+N' (N additional screens below the viewport), a container query selector or an mmid.")
+
+    @property
+    def is_region(self) -> bool:
+        return self.container_selector is None
+
+    @property
+    def next_cursor(self) -> str | None:
+        """
+        The scope to request the region right below this one, or None if this is the last region or the scope is a container.
+        """
+        if self.region is None or self.region['bottom'] >= self.region['page_height']:
+            return None
+        extra_screens = f"+{self.screens - 1}" if self.screens > 1 else ""
+        return f"viewport{extra_screens}@{self.region['bottom']}"
+
+    def summary(self) -> dict[str, Any]:
+        """
+        Describes the resolved scope to the caller, along with the cursor of the next region.
+        """
+        summary: dict[str, Any] = {"scope": self.scope, "elements_in_scope": len(self.in_scope_mmids)}
+        if self.region is not None:
+            summary["region"] = self.region
+        summary["next_cursor"] = self.next_cursor
+        return summary
+
+    async def resolve(self, page: Page, backend: str):
+        """
+        Computes the mmids of the rendered elements inside the scope.
+
+        Args:
+            page (Page): The page the elements are on. With the 'inject' backend, the elements must already carry their mmids.
+            backend (str): The accessibility tree backend the mmids come from, 'inject' or 'cdp'.
+
+        Raises:
+            ValueError: If the container can not be found.
+        """
+        if backend == "cdp":
+            await self.__resolve_over_cdp(page)
+        else:
+            result = await page.evaluate(_RESOLVE_SCOPE_JS, {"container_selector": self.container_selector, "top": self.top, "screens": self.screens})
+            if 'error' in result:
+                raise ValueError(result['error'])
+            self.in_scope_mmids = {int(mmid) for mmid in result['in_scope']}
+            if self.is_region:
+                self.region = {"top": int(result['top']), "bottom": int(result['bottom']), "page_height": int(result['page_height'])}
+        logger.debug(f"Scope {self.scope} holds {len(self.in_scope_mmids)} rendered elements, region: {self.region}")
+
+    async def __resolve_over_cdp(self, page: Page):
+        """
+        Same as the in-page resolution, for mmids that are backendNodeIds. The layout of the whole document is captured with one
+        'DOMSnapshot.captureSnapshot', so nothing is written into the page.
+        """
+        container_backend_node_id = self.container_mmid
+        if self.container_selector is not None and container_backend_node_id is None:
+            evaluated = await send_cdp_command(page, "Runtime.evaluate", {"expression": f"document.querySelector({json.dumps(self.container_selector)})",
+                                                                          "objectGroup": "agente-scope"})
+            if 'exceptionDetails' in evaluated or 'objectId' not in evaluated['result']:
+                raise ValueError(f"No element matches the container selector {self.container_selector}")
+            described = await send_cdp_command(page, "DOM.describeNode", {"objectId": evaluated['result']['objectId']})
+            await send_cdp_command(page, "Runtime.releaseObjectGroup", {"objectGroup": "agente-scope"})
+            container_backend_node_id = described['node']['backendNodeId']
+
+        captured = await send_cdp_command(page, "DOMSnapshot.captureSnapshot", {"computedStyles": ["visibility"]})
+        strings: list[str] = captured['strings']
+        document = captured['documents'][0]
+        backend_node_ids: list[int] = document['nodes']['backendNodeId']
+        parent_indexes: list[int] = document['nodes']['parentIndex']
+
+        # Nodes are listed in document order, so a node's parent always comes before it
+        inside_container: list[bool] | None = None
+        if container_backend_node_id is not None:
+            if container_backend_node_id not in backend_node_ids:
+                raise ValueError(f"No element matches the container {self.scope}")
+            inside_container = [False] * len(backend_node_ids)
+            for index, backend_node_id in enumerate(backend_node_ids):
+                parent_index = parent_indexes[index]
+                inside_container[index] = backend_node_id == container_backend_node_id or (parent_index >= 0 and inside_container[parent_index])
+
+        if self.is_region:
+            metrics = await send_cdp_command(page, "Page.getLayoutMetrics")
+            viewport = metrics.get('cssLayoutViewport') or metrics['layoutViewport']
+            content_size = metrics.get('cssContentSize') or metrics['contentSize']
+            top = viewport['pageY'] if self.top is None else self.top
+            bottom = top + viewport['clientHeight'] * self.screens
+            left, right = viewport['pageX'], viewport['pageX'] + viewport['clientWidth']
+            self.region = {"top": int(top), "bottom": int(bottom), "page_height": int(content_size['height'])}
+
+        layout = document['layout']
+        self.in_scope_mmids = set()
+        for node_index, (x, y, width, height), styles in zip(layout['nodeIndex'], layout['bounds'], layout['styles'], strict=True):
+            if (width <= 0 and height <= 0) or (styles and strings[styles[0]] in ('hidden', 'collapse')):
+                continue
+            if inside_container is not None:
+                if not inside_container[node_index]:
+                    continue
+            else:
+                in_region = (y < bottom and y + height > top) if height > 0 else (top <= y < bottom)
+                if not in_region or x + width <= left or x >= right:
+                    continue
+            self.in_scope_mmids.add(backend_node_ids[node_index])
+
@@ -0,0 +1,184 @@
+import math
+import re
+from collections import Counter
+from typing import Any
+
+# BM25 parameters: term frequency saturation and document length normalization
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+token_pattern = re.compile(r'[a-z0-9]+')
+
+# Fields that identify the element rather than describe it to the user
+IGNORED_FIELDS = ('mmid', 'children', 'keyshortcuts')
+
+
+def tokenize(text: str) -> list[str]:
+    """
+    Splits text into lowercase alphanumeric tokens. Plurals are folded so that 'results' matches 'result'.
+    """
+    return [token[:-1] if len(token) > 3 and token.endswith('s') and not token.endswith('ss') else token
+            for token in token_pattern.findall(text.lower())]
+
+
+def node_tokens(node: dict[str, Any]) -> list[str]:
+    """
+    Tokenizes the values of the fields of a node (name, labels, placeholder, text...), including the texts of the lists of
+    objects it holds (e.g. select options), but not its children.
+    """
+    tokens: list[str] = []
+    for key, value in node.items():
+        if key in IGNORED_FIELDS:
+            continue
+        if isinstance(value, str):
+            tokens.extend(tokenize(value))
+        elif isinstance(value, list):
+            for item in value:
+                if isinstance(item, dict):
+                    tokens.extend(token for item_value in item.values() if isinstance(item_value, str) for token in tokenize(item_value))
+    return tokens
+
+
+def bm25_scores(query: str, postings: dict[str, dict[int, int]], lengths: list[int], average_length: float) -> dict[int, float]:
+    """
+    Scores the documents that contain at least one term of the query with Okapi BM25.
+
+    Args:
+        query (str): The query, tokenized like the documents.
+        postings (dict[str, dict[int, int]]): For every term, the number of occurrences in every document that contains it.
+        lengths (list[int]): The number of tokens of every document.
+        average_length (float): The average number of tokens of the documents.
+
+    Returns:
+        dict[int, float]: The score of every matching document, keyed by its index.
+    """
+    document_count = len(lengths)
+    scores: dict[int, float] = {}
+    for term in set(tokenize(query)):
+        document_counts = postings.get(term)
+        if not document_counts:
+            continue
+        idf = math.log(1 + (document_count - len(document_counts) + 0.5) / (len(document_counts) + 0.5))
+        for document, count in document_counts.items():
+            length_norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths[document] / max(average_length, 1))
+            scores[document] = scores.get(document, 0.0) + idf * count * (BM25_K1 + 1) / (count + length_norm)
+    return scores
+
+
+class ElementIndex:
+    """
+    An inverted index over the elements of an enriched accessibility tree, searched with Okapi BM25.
+
+    The documents are the elements with an mmid. The text of an element is the values of its fields and of the fields of its
+    descendants that have no mmid (e.g. the text of a link or a button). Building the index takes one pass over the tree,
+    a search only looks at the postings of the terms of the query.
+
+    Attributes:
+        elements (list[dict[str, Any]]): The elements, in document order.
+        parents (list[int | None]): For every element, the index of the closest ancestor element, if any.
+        owners (dict[int, int]): The index of the element every node of the tree belongs to, keyed by the id() of the node.
+            Nodes outside of any element (e.g. the root) are not listed.
+        postings (dict[str, dict[int, int]]): For every term, the number of occurrences in every element that contains it.
+    """
+
+    def __init__(self, tree: dict[str, Any]):
+        self.elements: list[dict[str, Any]] = []
+        self.parents: list[int | None] = []
+        self.owners: dict[int, int] = {}
+        self.postings: dict[str, dict[int, int]] = {}
+        lengths: list[int] = []
+
+        stack: list[tuple[dict[str, Any], int | None]] = [(tree, None)]
+        while stack:
+            node, owner = stack.pop()
+            parent = owner
+            if 'mmid' in node:
+                owner = len(self.elements)
+                self.elements.append(node)
+                self.parents.append(parent)
+                lengths.append(0)
+            if owner is not None:
+                self.owners[id(node)] = owner
+                tokens = node_tokens(node)
+                lengths[owner] += len(tokens)
+                for term, count in Counter(tokens).items():
+                    element_counts = self.postings.setdefault(term, {})
+                    element_counts[owner] = element_counts.get(owner, 0) + count
+            stack.extend((child, owner) for child in reversed(node.get('children', [])))
+
+        self.lengths = lengths
+        self.average_length = sum(lengths) / max(len(lengths), 1)
+
+    def scores(self, query: str) -> dict[int, float]:
+        """
+        Scores the elements that contain at least one term of the query.
+
+        Returns:
+            dict[int, float]: The BM25 score of every matching element, keyed by its index in elements.
+        """
+        return bm25_scores(query, self.postings, self.lengths, self.average_length)
+
+
+def top_elements(scores: dict[int, float], k: int) -> list[int]:
+    """
+    Returns the indexes of the k best scored elements (or passages), best first. Ties are broken by document order.
+    """
+    return [element for element, _ in sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:k]]
+
+
+def split_passages(text: str, passage_chars: int) -> list[tuple[int, int]]:
+    """
+    Splits text into passages of at most passage_chars characters, cut at a line break when there is one in the second half
+    of the passage, otherwise at a space.
+
+    Returns:
+        list[tuple[int, int]]: The start and end offsets of the passages in the text. Blank passages are left out.
+    """
+    passages: list[tuple[int, int]] = []
+    start = 0
+    while start < len(text):
+        end = min(start + passage_chars, len(text))
+        if end < len(text):
+            line_break = text.rfind('\n', start + passage_chars // 2, end)
+            if line_break != -1:
+                end = line_break + 1
+            else:
+                space = text.rfind(' ', start + passage_chars // 2, end)
+                if space != -1:
+                    end = space + 1
+        if text[start:end].strip():
+            passages.append((start, end))
+        start = end
+    return passages
+
+
+class PassageIndex:
+    """
+    An inverted index over the passages of a text (e.g. the text of a page), searched with Okapi BM25.
+
+    Attributes:
+        text (str): The indexed text.
+        passages (list[tuple[int, int]]): The start and end offsets of the passages in the text, see split_passages.
+        postings (dict[str, dict[int, int]]): For every term, the number of occurrences in every passage that contains it.
+    """
+
+    def __init__(self, text: str, passage_chars: int):
+        self.text = text
+        self.passages = split_passages(text, passage_chars)
+        self.postings: dict[str, dict[int, int]] = {}
+        self.lengths: list[int] = []
+        for passage, (start, end) in enumerate(self.passages):
+            tokens = tokenize(text[start:end])
+            self.lengths.append(len(tokens))
+            for term, count in Counter(tokens).items():
+                self.postings.setdefault(term, {})[passage] = count
+        self.average_length = sum(self.lengths) / max(len(self.lengths), 1)
+
+    def scores(self, query: str) -> dict[int, float]:
+        """
+        Scores the passages that contain at least one term of the query.
+
+        Returns:
+            dict[int, float]: The BM25 score of every matching passage, keyed by its index in passages.
+        """
+        return bm25_scores(query, self.postings, self.lengths, self.average_length)
@@ -0,0 +1,157 @@
+import json
+import re
+from typing import Any
+
+# Values that can be written without quotes
+bare_value = re.compile(r'^[\w.:/#@%+-]+$')
+
+# Keys that are part of the head of a line rather than key=value pairs
+HEAD_KEYS = ('mmid', 'tag', 'tag_type', 'name', 'children')
+
+
+def __format_value(value: Any) -> str:
+    if isinstance(value, str):
+        return value if bare_value.fullmatch(value) else json.dumps(value, ensure_ascii=False)
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False, separators=(',', ':'))
+    return json.dumps(value)
+
+
+def __format_node(node: dict[str, Any], kind: str | None = None) -> tuple[str, list[tuple[str, list[dict[str, Any]]]]]:
+    """
+    Formats the fields of a node, without its children, as one line: [mmid] kind "name" key=value...
+
+    Returns:
+        tuple[str, list[tuple[str, list[dict[str, Any]]]]]: The line, and the lists of objects held by the node (e.g. select options)
+            which are written as lines of their own below it.
+    """
+    # Items of a list of objects are written as bullets
+    parts: list[str] = ['-'] if kind == '-' else []
+    kind = None if kind == '-' else kind
+    if node.get('mmid') is not None:
+        parts.append(f"[{node['mmid']}]")
+    skipped_keys = list(HEAD_KEYS)
+    if kind is None:
+        kind = node.get('tag') or node.get('role')
+        if not node.get('tag'):
+            skipped_keys.append('role')
+    if node.get('tag_type'):
+        kind = f"{kind}:{node['tag_type']}"
+    # Text nodes are written as their text alone
+    if kind and not (kind == 'text' and node.get('name') and len(node) == 2):
+        parts.append(kind)
+    name = node.get('name')
+    if kind == 'option':
+        # Options are named by their text, and only the selected ones are flagged
+        name = node.get('text')
+        skipped_keys.append('text')
+        if not node.get('selected'):
+            skipped_keys.append('selected')
+    if name:
+        parts.append(json.dumps(name, ensure_ascii=False))
+
+    object_lists: list[tuple[str, list[dict[str, Any]]]] = []
+    for key, value in node.items():
+        if key in skipped_keys:
+            continue
+        if isinstance(value, list) and value and all(isinstance(item, dict) for item in value):
+            object_lists.append((key, value))
+        elif value is True:
+            parts.append(key)
+        else:
+            parts.append(f"{key}={__format_value(value)}")
+    return ' '.join(parts), object_lists
+
+
+def __format_rows(node: dict[str, Any], depth: int) -> list[str]:
+    """
+    Formats a run of repeated structures as a header with the fields they have in common, the varying columns and one line per row.
+    """
+    common = ' '.join(f"{key}={__format_value(value)}" for key, value in node.get('common', {}).items())
+    lines = ['  ' * depth + f"{node['count']} x {node['repeated']}" + (f" {common}" if common else "")]
+    lines.append('  ' * (depth + 1) + "columns: " + ' | '.join(node['columns']))
+    for row in node['rows']:
+        lines.append('  ' * (depth + 1) + "- " + ' | '.join('' if value is None else __format_value(value) for value in row))
+    return lines
+
+
+def __format_parent(parent_mmid: Any) -> str:
+    return "root" if parent_mmid is None else f"[{parent_mmid}]"
+
+
+def serialize_tree_compact(tree: dict[str, Any], indent: int = 0) -> str:
+    """
+    Serializes an enriched accessibility tree with one element per line, e.g. [114] button "Search" placeholder="Search the site".
+    Children are indented below their parent, in document order. Lists of objects (e.g. the options of a select) are written as
+    indented lines below their element.
+
+    Args:
+        tree (dict[str, Any]): The enriched accessibility tree, as returned by do_get_accessibility_info.
+        indent (int): The depth of the root, when the tree is part of a larger output.
+
+    Returns:
+        str: The serialized tree.
+    """
+    lines: list[str] = []
+    stack: list[tuple[dict[str, Any], int, str | None]] = [(tree, indent, None)]
+    while stack:
+        node, depth, kind = stack.pop()
+        if 'rows' in node and 'columns' in node:
+            lines.extend(__format_rows(node, depth))
+            continue
+        line, object_lists = __format_node(node, kind)
+        lines.append('  ' * depth + line)
+
+        pending: list[tuple[dict[str, Any], int, str | None]] = []
+        for key, items in object_lists:
+            if key == 'options':
+                pending.extend((item, depth + 1, 'option') for item in items)
+            else:
+                pending.append(({}, depth + 1, f"{key}:"))
+                pending.extend((item, depth + 2, '-') for item in items)
+        pending.extend((child, depth + 1, None) for child in node.get('children', []))
+        stack.extend(reversed(pending))
+    return '\n'.join(lines)
+
+
+def serialize_dom_output_compact(extracted_data: dict[str, Any]) -> str:
+    """
+    Serializes the output of get_dom_with_content_type in the compact line format. Besides a plain tree, this handles the outputs
+    of scoped and delta extractions: their scalar fields are written as 'key: value' header lines, followed by the tree or the changes.
+
+    Args:
+        extracted_data (dict[str, Any]): The enriched tree, or a dictionary holding it along with the scope and snapshot information.
+
+    Returns:
+        str: The serialized output.
+    """
+    if 'tree' not in extracted_data and 'added' not in extracted_data:
+        return serialize_tree_compact(extracted_data)
+
+    lines: list[str] = []
+    for key, value in extracted_data.items():
+        if key in ('tree', 'added', 'removed', 'changed'):
+            continue
+        lines.append(f"{key}: {__format_value(value)}")
+    if 'tree' in extracted_data:
+        lines.append("tree:")
+        lines.append(serialize_tree_compact(extracted_data['tree'], indent=1))
+    if 'added' in extracted_data:
+        lines.append("added:")
+        for subtree in extracted_data['added']:
+            subtree = dict(subtree)
+            # Added subtrees collapsed into rows share their parent
+            parent_mmid = subtree.pop('parent_mmid', subtree.get('common', {}).get('parent_mmid'))
+            lines.append(f"  under {__format_parent(parent_mmid)}:")
+            lines.append(serialize_tree_compact(subtree, indent=2))
+        lines.append("removed:")
+        for removed in extracted_data['removed']:
+            if isinstance(removed, dict):
+                removed = dict(removed)
+                lines.append(f"  under {__format_parent(removed.pop('parent_mmid', None))}: {__format_node(removed)[0]}")
+            else:
+                lines.append(f"  [{removed}]")
+        lines.append("changed:")
+        for changed in extracted_data['changed']:
+            lines.append('  ' + __format_node(changed)[0])
+    return '\n'.join(lines)
@@ -0,0 +1,125 @@
+import asyncio
+import os
+import weakref
+from typing import Any
+
+from playwright.async_api import Page
+
+from ae.utils.dom_helper import get_dom_fingerprint
+from ae.utils.dom_scope import DomScope
+from ae.utils.get_detailed_accessibility_tree import derive_input_fields
+from ae.utils.get_detailed_accessibility_tree import do_get_accessibility_info
+from ae.utils.get_detailed_accessibility_tree import input_fields_extraction
+from ae.utils.logger import logger
+
+DOM_SNAPSHOT_CACHE_ENABLED = os.getenv("DOM_SNAPSHOT_CACHE_ENABLED", "true").lower() == "true"
+
+# An extraction: the enriched tree and the scope it was restricted to, resolved
+CachedSnapshot = tuple[dict[str, Any] | None, DomScope | None]
+
+
+class PageSnapshotCache:
+    """
+    Keeps the enriched accessibility trees extracted from one page while its DOM does not change, along with the extractions in flight.
+
+    Attributes:
+        fingerprint (tuple[Any, ...]): The document id, URL and mutation epoch of the page when the trees were extracted.
+        entries (dict[tuple[Any, ...], CachedSnapshot]): The extractions, keyed by content type, how the tree was extracted and scope.
+        in_flight (dict[tuple[Any, ...], asyncio.Task[CachedSnapshot]]): The extractions running, keyed the same way.
+    """
+
+    def __init__(self, fingerprint: tuple[Any, ...]):
+        self.fingerprint = fingerprint
+        self.entries: dict[tuple[Any, ...], CachedSnapshot] = {}
+        self.in_flight: dict[tuple[Any, ...], asyncio.Task[CachedSnapshot]] = {}
+
+
+# Snapshot cache of each page. A cache is dropped as soon as the fingerprint of its page changes.
+_page_caches: "weakref.WeakKeyDictionary[Page, PageSnapshotCache]" = weakref.WeakKeyDictionary()
+
+# hits: served from the cache, derived: input fields pruned from cached all fields (only when they are extracted by the full
+# pipeline), coalesced: waited for an identical extraction in flight, misses: extracted from the page
+_cache_stats = {"hits": 0, "derived": 0, "coalesced": 0, "misses": 0}
+
+
+def get_snapshot_cache_stats() -> dict[str, Any]:
+    """
+    Returns the counters of the snapshot cache since the process started, and whether it is enabled.
+    """
+    return {"enabled": DOM_SNAPSHOT_CACHE_ENABLED, **_cache_stats}
+
+
+async def get_accessibility_info_cached(page: Page, only_input_fields: bool, dom_scope: DomScope | None = None,
+                                        input_fields_fast_path: bool = True) -> CachedSnapshot:
+    """
+    Returns the enriched accessibility tree of the page, as do_get_accessibility_info would, reusing the previous extraction
+    while the DOM of the page has not changed.
+
+    The page is fingerprinted in one round trip (see get_dom_fingerprint). Extractions are cached per page for the current
+    document, URL and mutation epoch, and per scope. Scoped extractions also depend on the scroll position and size of the viewport.
+    Input fields extracted by the full pipeline are derived from cached all fields, without querying the page. Input fields
+    extracted by the fast path are not, as the fast path names and filters them differently (see input_fields_extraction).
+    Concurrent identical requests share one extraction.
+
+    Args:
+        page (Page): The page to extract the tree from.
+        only_input_fields (bool): Whether to return the input fields only.
+        dom_scope (DomScope | None, optional): The part of the page to restrict the tree to. Defaults to None (the whole page).
+        input_fields_fast_path (bool, optional): Passed on to do_get_accessibility_info. Defaults to True.
+
+    Returns:
+        CachedSnapshot: The enriched tree, which must not be modified, and the scope resolved against the page. On a cache hit,
+            this is the scope of the cached extraction, not dom_scope.
+    """
+    async def extract() -> CachedSnapshot:
+        tree = await do_get_accessibility_info(page, only_input_fields=only_input_fields, dom_scope=dom_scope,
+                                               input_fields_fast_path=input_fields_fast_path)
+        return tree, dom_scope
+
+    if not DOM_SNAPSHOT_CACHE_ENABLED:
+        return await extract()
+
+    fingerprint = await get_dom_fingerprint(page)
+    page_fingerprint = (fingerprint['document_id'], fingerprint['url'], fingerprint['epoch'])
+    cache = _page_caches.get(page)
+    if cache is None or cache.fingerprint != page_fingerprint:
+        cache = PageSnapshotCache(page_fingerprint)
+        _page_caches[page] = cache
+
+    scope_key = None if dom_scope is None else (dom_scope.scope, tuple(fingerprint['viewport']))
+    # The same content type gives different trees depending on how it is extracted, which is part of the key
+    extraction = input_fields_extraction(input_fields_fast_path=input_fields_fast_path) if only_input_fields else "pipeline"
+    key = (only_input_fields, extraction, scope_key)
+    all_fields_key = (False, "pipeline", scope_key)
+
+    if key in cache.entries:
+        _cache_stats["hits"] += 1
+        logger.debug(f"Snapshot cache hit for {key} on {page.url}")
+        return cache.entries[key]
+
+    if extraction == "pipeline" and only_input_fields and (all_fields_key in cache.entries or all_fields_key in cache.in_flight):
+        if all_fields_key in cache.entries:
+            all_fields_tree, resolved_scope = cache.entries[all_fields_key]
+        else:
+            all_fields_tree, resolved_scope = await asyncio.shield(cache.in_flight[all_fields_key])
+        _cache_stats["derived"] += 1
+        logger.debug(f"Deriving the input fields from the cached all fields for {key} on {page.url}")
+        cache.entries[key] = (None if all_fields_tree is None else derive_input_fields(all_fields_tree), resolved_scope)
+        return cache.entries[key]
+
+    if key in cache.in_flight:
+        _cache_stats["coalesced"] += 1
+        logger.debug(f"Waiting for the extraction in flight for {key} on {page.url}")
+        return await asyncio.shield(cache.in_flight[key])
+
+    _cache_stats["misses"] += 1
+    task = asyncio.ensure_future(extract())
+    cache.in_flight[key] = task
+    try:
+        # Shielded so that a cancelled caller does not cancel the extraction the other callers wait for
+        result = await asyncio.shield(task)
+    finally:
+        cache.in_flight.pop(key, None)
+    # Mutations during the extraction change the fingerprint, so the next call does not get this entry
+    cache.entries[key] = result
+    return result
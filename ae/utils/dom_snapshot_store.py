@@ -0,0 +1,136 @@
+import weakref
+from typing import Any
+
+from playwright.async_api import Page
+
+from ae.utils.dom_helper import get_document_id
+from ae.utils.logger import logger
+
+
+class PageSnapshotHistory:
+    """
+    Keeps the last enriched accessibility tree of each content type captured from one document.
+    Every recorded snapshot gets the next snapshot version of the document.
+
+    Attributes:
+        document_id (str): The id of the document the snapshots were captured from.
+        version (int): The version of the last recorded snapshot.
+        trees (dict[str, tuple[int, dict[str, Any]]]): The version and tree of the last snapshot of each content type.
+    """
+
+    def __init__(self, document_id: str):
+        self.document_id = document_id
+        self.version = 0
+        self.trees: dict[str, tuple[int, dict[str, Any]]] = {}
+
+    def record(self, content_type: str, tree: dict[str, Any]) -> tuple[int, int | None, dict[str, Any] | None]:
+        """
+        Records a new snapshot of the given content type.
+
+        Returns:
+            tuple[int, int | None, dict[str, Any] | None]: The version of the new snapshot, and the version and tree of
+                the previous snapshot of the same content type (None if there is none).
+        """
+        self.version += 1
+        base_version, base_tree = self.trees.get(content_type, (None, None))
+        self.trees[content_type] = (self.version, tree)
+        return self.version, base_version, base_tree
+
+
+# Snapshot history of each page. A history is dropped when the page navigates to a new document.
+_page_histories: "weakref.WeakKeyDictionary[Page, PageSnapshotHistory]" = weakref.WeakKeyDictionary()
+
+
+async def record_snapshot(page: Page, content_type: str, tree: dict[str, Any]) -> tuple[int, int | None, dict[str, Any] | None]:
+    """
+    Records the enriched tree of a snapshot of the page's current document.
+
+    Args:
+        page (Page): The page the snapshot was captured from.
+        content_type (str): The content type of the snapshot, e.g. 'all_fields'.
+        tree (dict[str, Any]): The enriched accessibility tree. It must not be modified afterwards.
+
+    Returns:
+        tuple[int, int | None, dict[str, Any] | None]: The version of the snapshot, and the version and tree of the previous
+            snapshot of the same content type and document (None if there is none).
+    """
+    document_id = await get_document_id(page)
+    history = _page_histories.get(page)
+    if history is None or history.document_id != document_id:
+        logger.debug(f"Starting a new snapshot history for document {document_id} of {page.url}")
+        history = PageSnapshotHistory(document_id)
+        _page_histories[page] = history
+    return history.record(content_type, tree)
+
+
+def __flatten_tree(tree: dict[str, Any]) -> dict[str, tuple[dict[str, Any], str | None, dict[str, Any]]]:
+    """
+    Flattens the tree into a dictionary keyed by a stable node key, in document order.
+    Nodes with an mmid are keyed by it. Other nodes (e.g. text) are keyed by their parent key, role, name and occurrence.
+    The root is always keyed 'root', so a change of the page title shows up as a change instead of a new tree.
+
+    Returns:
+        dict[str, tuple[dict[str, Any], str | None, dict[str, Any]]]: For every key: the node's own fields (without
+            children), the key of its parent and the node itself.
+    """
+    flattened: dict[str, tuple[dict[str, Any], str | None, dict[str, Any]]] = {}
+    stack: list[tuple[dict[str, Any], str | None]] = [(tree, None)]
+    while stack:
+        node, parent_key = stack.pop()
+        if parent_key is None:
+            key = "root"
+        elif 'mmid' in node:
+            key = f"mmid:{node['mmid']}"
+        else:
+            key = f"{parent_key}>{node.get('role')}:{node.get('name')}"
+        if key in flattened:
+            occurrence = 2
+            while f"{key}#{occurrence}" in flattened:
+                occurrence += 1
+            key = f"{key}#{occurrence}"
+        own_fields = {name: value for name, value in node.items() if name != 'children'}
+        flattened[key] = (own_fields, parent_key, node)
+        stack.extend((child, key) for child in reversed(node.get('children', [])))
+    return flattened
+
+
+def diff_snapshots(previous_tree: dict[str, Any], current_tree: dict[str, Any]) -> dict[str, list[Any]]:
+    """
+    Computes the nodes added, removed and changed between two enriched trees of the same document.
+    mmids are stable for the lifetime of a document, so nodes are matched by mmid.
+
+    Args:
+        previous_tree (dict[str, Any]): The enriched tree of the previous snapshot.
+        current_tree (dict[str, Any]): The enriched tree of the current snapshot.
+
+    Returns:
+        dict[str, list[Any]]: 'added' holds the top-most added subtrees along with the mmid of their parent,
+            'removed' holds the top-most removed nodes (their mmid, or role and name for nodes without mmid),
+            'changed' holds the own fields (without children) of the nodes whose fields changed.
+    """
+    previous = __flatten_tree(previous_tree)
+    current = __flatten_tree(current_tree)
+
+    def parent_mmid(flattened: dict[str, tuple[dict[str, Any], str | None, dict[str, Any]]], parent_key: str | None) -> Any:
+        if parent_key is None:
+            return None
+        return flattened[parent_key][0].get('mmid')
+
+    added: list[dict[str, Any]] = []
+    changed: list[dict[str, Any]] = []
+    for key, (own_fields, parent_key, node) in current.items():
+        if key not in previous:
+            if parent_key is None or parent_key in previous:
+                added.append({"parent_mmid": parent_mmid(current, parent_key), **node})
+        elif previous[key][0] != own_fields:
+            changed.append(own_fields)
+
+    removed: list[Any] = []
+    for key, (own_fields, parent_key, _node) in previous.items():
+        if key not in current and (parent_key is None or parent_key in current):
+            if 'mmid' in own_fields:
+                removed.append(own_fields['mmid'])
+            else:
+                removed.append({"parent_mmid": parent_mmid(previous, parent_key), "role": own_fields.get('role'), "name": own_fields.get('name')})
+
+    return {"added": added, "removed": removed, "changed": changed}
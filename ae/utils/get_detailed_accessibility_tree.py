@@ -2,6 +2,7 @@ import json
 import os
 import re
 import traceback
+from collections.abc import Callable
 from typing import Annotated
 from typing import Any
 
@@ -9,8 +10,21 @@ from playwright.async_api import Page
 
 from ae.config import SOURCE_LOG_FOLDER_PATH
 from ae.core.playwright_manager import PlaywrightManager
+from ae.utils.accessibility_node import AccessibilityNode
+from ae.utils.cdp_accessibility_tree import get_cdp_accessibility_snapshot
+from ae.utils.dom_scope import DomScope
 from ae.utils.logger import logger
 
+# 'inject' writes mmids into the DOM and reads the accessibility tree through Playwright.
+# 'cdp' reads the full AX tree and the DOM over CDP without mutating the page, the mmid being the backendNodeId of the element.
+ACCESSIBILITY_TREE_BACKEND = os.getenv("ACCESSIBILITY_TREE_BACKEND", "inject")
+
+# Number of options of a select, or items of a listbox or list, described in a snapshot. Longer lists get their total count
+# ('options_total' or 'additional_info_total') and are read further with the expand_list skill, using the mmid of the list.
+LIST_PREVIEW_ITEMS = int(os.getenv("LIST_PREVIEW_ITEMS", 20))
+
+ElementDescriber = Callable[[list[dict[str, Any]], dict[str, Any]], list[dict[str, Any] | None]]
+
 space_delimited_mmid = re.compile(r'^[\d ]+$')
 
 def is_space_delimited_mmid(s: str) -> bool:
@@ -27,304 +41,566 @@ def is_space_delimited_mmid(s: str) -> bool:
     return bool(space_delimited_mmid.fullmatch(s))
 
 
+# JS function that labels elements with their mmid, allocated by the persistent allocator kept on the window.
+# It is shared by the injection into all the elements and the input fields fast path, so an element gets the same mmid from both.
+# 'mmid', and 'aria-keyshortcuts' that the accessibility snapshot is reconciled through, are only written to elements that do
+# not carry them yet: an unchanged element costs two attribute reads on a repeated snapshot, and no write. The input fields
+# fast path does not take an accessibility snapshot and writes no 'aria-keyshortcuts'.
+__LABEL_ELEMENTS_JS = """
+(elements, with_keyshortcuts) => {
+    if (!window.__agenteMmidAllocator) {
+        window.__agenteMmidAllocator = { ids: new WeakMap(), last_mmid: 0 };
+    }
+    const allocator = window.__agenteMmidAllocator;
+    let labelled = 0;
+    let attribute_writes = 0;
+    for (const element of elements) {
+        let mmid = allocator.ids.get(element);
+        if (mmid === undefined) {
+            mmid = `${++allocator.last_mmid}`;
+            allocator.ids.set(element, mmid);
+        }
+        if (element.getAttribute('mmid') !== mmid) {
+            element.setAttribute('mmid', mmid);
+            labelled++;
+            attribute_writes++;
+        }
+        if (!with_keyshortcuts) continue;
+        const origAriaAttribute = element.getAttribute('aria-keyshortcuts');
+        if (origAriaAttribute !== mmid) {
+            if (origAriaAttribute) {
+                element.setAttribute('orig-aria-keyshortcuts', origAriaAttribute);
+                attribute_writes++;
+            }
+            element.setAttribute('aria-keyshortcuts', mmid);
+            attribute_writes++;
+        }
+    }
+    return { labelled: labelled, attribute_writes: attribute_writes, last_mmid: allocator.last_mmid };
+}
+"""
+
+# JS function that gives the elements that had their own 'aria-keyshortcuts' their value back once the snapshot is taken.
+# These are the only elements the next snapshot labels again. It returns the number of elements restored.
+__RESTORE_ARIA_KEYSHORTCUTS_JS = """
+() => {
+    const elements = document.querySelectorAll('[orig-aria-keyshortcuts]');
+    for (const element of elements) {
+        element.setAttribute('aria-keyshortcuts', element.getAttribute('orig-aria-keyshortcuts'));
+        element.removeAttribute('orig-aria-keyshortcuts');
+    }
+    return elements.length;
+}
+"""
+
+
 async def __inject_attributes(page: Page):
     """
     Injects 'mmid' and 'aria-keyshortcuts' into all DOM elements. If an element already has an 'aria-keyshortcuts',
     it renames it to 'orig-aria-keyshortcuts' before injecting the new 'aria-keyshortcuts'
     This will be captured in the accessibility tree and thus make it easier to reconcile the tree with the DOM.
     'aria-keyshortcuts' is choosen because it is not widely used aria attribute.
+
+    The mmids are allocated by a persistent allocator kept on the window (a WeakMap from element to mmid and a monotonic
+    counter). An element keeps its mmid for the lifetime of the document, and both attributes stay on it between snapshots,
+    so only elements that have not been labelled yet (or whose labels were changed by the page) are written to. The allocator
+    is reset on navigation along with the window. __cleanup_dom gives the elements that had their own 'aria-keyshortcuts'
+    their value back once the snapshot is taken.
     """
 
-    last_mmid = await page.evaluate("""() => {
-        const allElements = document.querySelectorAll('*');
-        let id = 0;
-        allElements.forEach(element => {
-            const origAriaAttribute = element.getAttribute('aria-keyshortcuts');
-            const mmid = `${++id}`;
-            element.setAttribute('mmid', mmid);
-            element.setAttribute('aria-keyshortcuts', mmid);
-            //console.log(`Injected 'mmid'into element with tag: ${element.tagName} and mmid: ${mmid}`);
-            if (origAriaAttribute) {
-                element.setAttribute('orig-aria-keyshortcuts', origAriaAttribute);
-            }
-        });
-        return id;
+    injection_result = await page.evaluate("""() => {
+        const label_elements = """ + __LABEL_ELEMENTS_JS + """;
+        return label_elements(document.querySelectorAll('*'), true);
     }""")
-    logger.debug(f"Added MMID into {last_mmid} elements")
+    logger.debug(f"Added MMID into {injection_result['labelled']} new elements with {injection_result['attribute_writes']} attribute writes, "
+                 f"last MMID is {injection_result['last_mmid']}")
+
+
+# JS function that describes a single element that carries an 'mmid'. It is shared by the per-node and the batched
+# enrichment modes so both produce exactly the same attributes for an element.
+__DESCRIBE_ELEMENT_JS = """
+(element, should_fetch_inner_text, input_params) => {
+    const attributes = input_params.attributes;
+    const tags_to_ignore = input_params.tags_to_ignore;
+    const ids_to_ignore = input_params.ids_to_ignore;
+
+    if (ids_to_ignore.includes(element.id)) {
+        return null;
+    }
+    //Ignore "option" because it would have been processed with the select element
+    if (tags_to_ignore.includes(element.tagName.toLowerCase()) || element.tagName.toLowerCase() === "option") return null;
+
+    let attributes_to_values = {
+        'tag': element.tagName.toLowerCase() // Always include the tag name
+    };
+
+    // If the element is an input, include its type as well
+    if (element.tagName.toLowerCase() === 'input') {
+        attributes_to_values['tag_type'] = element.type; // This will capture 'checkbox', 'radio', etc.
+    }
+    else if (element.tagName.toLowerCase() === 'select') {
+        attributes_to_values["mmid"] = element.getAttribute('mmid');
+        attributes_to_values["role"] = "combobox";
+        attributes_to_values["options"] = [];
+
+        // Large selects (e.g. countries) are summarized to their first options and the selected ones,
+        // the others are listed with expand_list
+        const options = element.options;
+        let described_options = Array.from({length: Math.min(options.length, input_params.list_preview_limit)}, (_, i) => options[i]);
+        if (options.length > input_params.list_preview_limit) {
+            attributes_to_values["options_total"] = options.length;
+            described_options = described_options.concat(
+                Array.from(element.selectedOptions).filter(option => option.index >= input_params.list_preview_limit));
+        }
+        for (const option of described_options) {
+            let option_attributes_to_values = {
+                "mmid": option.getAttribute('mmid'),
+                "text": option.text,
+                "value": option.value,
+                "selected": option.selected
+            };
+            attributes_to_values["options"].push(option_attributes_to_values);
+        }
+        return attributes_to_values;
+    }
+
+    for (const attribute of attributes) {
+        let value = element.getAttribute(attribute);
+
+        if(value){
+            attributes_to_values[attribute] = value;
+        }
+    }
+
+    if (should_fetch_inner_text && element.innerText) {
+        attributes_to_values['description'] = element.innerText;
+    }
+
+    let role = element.getAttribute('role');
+    if(role==='listbox' || element.tagName.toLowerCase()=== 'ul'){
+        let children=element.children;
+        let attributes_to_include = ['mmid', 'role', 'aria-label','value'];
+        attributes_to_values["additional_info"]=[]
+        if (children.length > input_params.list_preview_limit) {
+            attributes_to_values["additional_info_total"] = children.length;
+        }
+        for (let i = 0; i < Math.min(children.length, input_params.list_preview_limit); i++) {
+            const child = children[i];
+            let children_attributes_to_values = {};
+
+            for (let attr of child.attributes) {
+                // If the attribute is in the predefined list, add it to children_attributes_to_values
+                if (attributes_to_include.includes(attr.name)) {
+                    children_attributes_to_values[attr.name] = attr.value;
+                }
+            }
+
+            attributes_to_values["additional_info"].push(children_attributes_to_values);
+        }
+    }
+    // Check if attributes_to_values contains more than just 'name', 'role', and 'mmid'
+    const keys = Object.keys(attributes_to_values);
+    const minimalKeys = ['tag', 'mmid'];
+    const hasMoreThanMinimalKeys = keys.length > minimalKeys.length || keys.some(key => !minimalKeys.includes(key));
+
+    if (!hasMoreThanMinimalKeys) {
+        //If there were no attributes found, then try to get the backup attributes
+        for (const backupAttribute of input_params.backup_attributes) {
+            let value = element.getAttribute(backupAttribute);
+            if(value){
+                attributes_to_values[backupAttribute] = value;
+            }
+        }
+
+        //if even the backup attributes are not found, then return null, which will cause this element to be skipped
+        if(Object.keys(attributes_to_values).length <= minimalKeys.length) {
+            if (element.tagName.toLowerCase() === 'button') {
+                attributes_to_values["mmid"] = element.getAttribute('mmid');
+                attributes_to_values["role"] = "button";
+                attributes_to_values["additional_info"] = [];
+                let children=element.children;
+                let attributes_to_exclude = ['width', 'height', 'path', 'class', 'viewBox', 'mmid']
+
+                // Check if the button has no text and no attributes
+                if (element.innerText.trim() === '') {
+
+                    for (const child of children) {
+                        let children_attributes_to_values = {};
+
+                        for (let attr of child.attributes) {
+                            // If the attribute is not in the predefined list, add it to children_attributes_to_values
+                            if (!attributes_to_exclude.includes(attr.name)) {
+                                children_attributes_to_values[attr.name] = attr.value;
+                            }
+                        }
+
+                        attributes_to_values["additional_info"].push(children_attributes_to_values);
+                    }
+                    return attributes_to_values;
+                }
+            }
 
+            return null; // Return null if only minimal keys are present
+        }
+    }
+    return attributes_to_values;
+}
+"""
+
+# Describes one element, looked up by its mmid. One CDP round trip per node.
+__FETCH_SINGLE_ELEMENT_INFO_JS = """
+(input_params) => {
+    const describe_element = """ + __DESCRIBE_ELEMENT_JS + """;
+    const element = document.querySelector(`[mmid="${input_params.mmid}"]`);
+
+    if (!element) {
+        console.log(`No element found with mmid: ${input_params.mmid}`);
+        return null;
+    }
+    return describe_element(element, input_params.should_fetch_inner_text, input_params);
+}
+"""
+
+# Describes every requested element in a single pass. The mmid to element index is built with one querySelectorAll
+# instead of one querySelector per node. The results are returned in the same order as the requested elements.
+__FETCH_ALL_ELEMENTS_INFO_JS = """
+(input_params) => {
+    const describe_element = """ + __DESCRIBE_ELEMENT_JS + """;
+    const elements_by_mmid = new Map();
+    for (const element of document.querySelectorAll('[mmid]')) {
+        const mmid = element.getAttribute('mmid');
+        if (!elements_by_mmid.has(mmid)) {
+            elements_by_mmid.set(mmid, element);
+        }
+    }
 
-async def __fetch_dom_info(page: Page, accessibility_tree: dict[str, Any], only_input_fields: bool):
+    return input_params.elements.map(request => {
+        const element = elements_by_mmid.get(`${request.mmid}`);
+        if (!element) {
+            return null;
+        }
+        return describe_element(element, request.should_fetch_inner_text, input_params);
+    });
+}
+"""
+
+
+# Finds the rendered input fields of the document (the elements kept by the input fields pruning: inputs, buttons and textareas,
+# and elements with the button role), labels them with their mmid, and describes each of them in one pass: the accessibility
+# fields the snapshot would have given (role, name, value and states, the name being computed from the labelling context),
+# and the attributes describe_element fetches. The other elements of the page are neither labelled nor described.
+__FETCH_INPUT_FIELDS_JS = """
+(input_params) => {
+    const describe_element = """ + __DESCRIBE_ELEMENT_JS + """;
+    const label_elements = """ + __LABEL_ELEMENTS_JS + """;
+    const overlay_selector = '#agente-overlay, #AgentEOverlayBorder, #agentDriveAutoOverlay';
+
+    const text_of = element => (element.innerText || element.textContent || '').replace(/\\s+/g, ' ').trim();
+
+    const is_rendered = element => {
+        if (element.type === 'hidden' || element.closest('[aria-hidden="true"], [inert]') || element.closest(overlay_selector)) {
+            return false;
+        }
+        return element.checkVisibility ? element.checkVisibility({visibilityProperty: true}) : element.getClientRects().length > 0;
+    };
+
+    const role_of = element => {
+        const explicit_role = (element.getAttribute('role') || '').trim().split(/\\s+/)[0];
+        if (explicit_role) return explicit_role;
+        const tag = element.tagName.toLowerCase();
+        if (tag === 'button') return 'button';
+        if (tag === 'textarea') return 'textbox';
+        const type = (element.getAttribute('type') || 'text').toLowerCase();
+        if (['button', 'submit', 'reset', 'image', 'file'].includes(type)) return 'button';
+        if (['checkbox', 'radio'].includes(type)) return type;
+        if (type === 'range') return 'slider';
+        if (type === 'number') return 'spinbutton';
+        if (element.list) return 'combobox';
+        return type === 'search' ? 'searchbox' : 'textbox';
+    };
+
+    // Follows the order of the accessible name computation for these elements, without its recursion
+    const name_of = element => {
+        const labelledby = (element.getAttribute('aria-labelledby') || '').split(/\\s+/).filter(Boolean);
+        const labelledby_text = labelledby.map(id => document.getElementById(id)).filter(Boolean).map(text_of).join(' ').trim();
+        if (labelledby_text) return labelledby_text;
+        const aria_label = (element.getAttribute('aria-label') || '').trim();
+        if (aria_label) return aria_label;
+        const labels_text = Array.from(element.labels || [], text_of).join(' ').trim();
+        if (labels_text) return labels_text;
+        const type = (element.getAttribute('type') || '').toLowerCase();
+        if (element.tagName.toLowerCase() === 'input') {
+            if (['submit', 'reset', 'button'].includes(type)) return element.value || {submit: 'Submit', reset: 'Reset'}[type] || '';
+            if (type === 'image') return element.alt || '';
+        } else if (element.tagName.toLowerCase() !== 'textarea') {
+            const content_text = text_of(element);
+            if (content_text) return content_text;
+        }
+        return (element.getAttribute('title') || element.getAttribute('placeholder') || '').trim();
+    };
+
+    const accessibility_fields_of = (element, mmid) => {
+        const role = role_of(element);
+        const fields = {role: role, name: name_of(element), keyshortcuts: mmid};
+        const type = (element.getAttribute('type') || '').toLowerCase();
+        if (['textbox', 'searchbox', 'combobox', 'spinbutton', 'slider'].includes(role) && type !== 'password'
+                && typeof element.value === 'string' && element.value !== '') {
+            fields.value = element.value;
+        }
+        if (['checkbox', 'radio', 'switch'].includes(role)) {
+            const aria_checked = element.getAttribute('aria-checked');
+            fields.checked = aria_checked === 'mixed' ? 'mixed' : (element.checked !== undefined ? element.checked : aria_checked === 'true');
+        }
+        const aria_pressed = element.getAttribute('aria-pressed');
+        if (aria_pressed) fields.pressed = aria_pressed === 'mixed' ? 'mixed' : aria_pressed === 'true';
+        if (element.disabled || element.getAttribute('aria-disabled') === 'true') fields.disabled = true;
+        if (element === document.activeElement) fields.focused = true;
+        if (element.required || element.getAttribute('aria-required') === 'true') fields.required = true;
+        if (element.readOnly && role !== 'button') fields.readonly = true;
+        const aria_expanded = element.getAttribute('aria-expanded');
+        if (aria_expanded) fields.expanded = aria_expanded === 'true';
+        if (element.tagName.toLowerCase() === 'textarea') fields.multiline = true;
+        return fields;
+    };
+
+    const input_fields = Array.from(document.querySelectorAll('input, button, textarea, [role="button"]')).filter(is_rendered);
+    const labelling = label_elements(input_fields, false);
+    const fields = input_fields.map(element => {
+        const mmid = element.getAttribute('mmid');
+        return [accessibility_fields_of(element, mmid), describe_element(element, true, input_params)];
+    });
+    return {title: document.title, fields: fields, labelled: labelling.labelled};
+}
+"""
+
+
+# What describe_element fetches for each element
+__ENRICHMENT_PARAMS = {
+    "list_preview_limit": LIST_PREVIEW_ITEMS,
+    "attributes": ['name', 'aria-label', 'placeholder', 'mmid', "id", "for", "data-testid"],
+    "backup_attributes": [], #if the attributes are not found, then try to get these attributes
+    "tags_to_ignore": ['head','style', 'script', 'link', 'meta', 'noscript', 'template', 'iframe', 'g', 'main', 'c-wiz','svg', 'path'],
+    "ids_to_ignore": ['agentDriveAutoOverlay'],
+}
+
+
+def __get_node_mmid(node: dict[str, Any]) -> int | None:
     """
-    Iterates over the accessibility tree, fetching additional information from the DOM based on 'mmid',
-    and constructs a new JSON structure with detailed information.
+    Extracts the injected mmid of an accessibility node from its 'keyshortcuts' property.
 
     Args:
-        page (Page): The page object representing the web page.
-        accessibility_tree (dict[str, Any]): The accessibility tree JSON structure.
-        only_input_fields (bool): Flag indicating whether to include only input fields in the new JSON structure.
+        node (dict[str, Any]): The accessibility node.
 
     Returns:
-        dict[str, Any]: The pruned tree with detailed information from the DOM.
+        int | None: The mmid of the node, or None if the node does not carry a valid numeric mmid.
     """
+    # Use 'keyshortcuts' attribute from the accessibility node as 'mmid'
+    mmid_temp: str = node.get('keyshortcuts') # type: ignore
 
-    logger.debug("Reconciling the Accessibility Tree with the DOM")
-    # Define the attributes to fetch for each element
-    attributes = ['name', 'aria-label', 'placeholder', 'mmid', "id", "for", "data-testid"]
-    backup_attributes = [] #if the attributes are not found, then try to get these attributes
-    tags_to_ignore = ['head','style', 'script', 'link', 'meta', 'noscript', 'template', 'iframe', 'g', 'main', 'c-wiz','svg', 'path']
-    attributes_to_delete = ["level", "multiline", "haspopup", "id", "for"]
-    ids_to_ignore = ['agentDriveAutoOverlay']
+    # If the name has multiple mmids, take the last one
+    if(mmid_temp and is_space_delimited_mmid(mmid_temp)):
+        #TODO: consider if we should grab each of the mmids and process them separately as seperate nodes copying this node's attributes
+        mmid_temp = mmid_temp.split(' ')[-1]
 
-    # Recursive function to process each node in the accessibility tree
-    async def process_node(node: dict[str, Any]):
-        if 'children' in node:
-            for child in node['children']:
-                await process_node(child)
+    #focusing on nodes with mmid, which is the attribute we inject
+    try:
+        return int(mmid_temp)
+    except (ValueError, TypeError):
+        return None
 
-        # Use 'name' attribute from the accessibility node as 'mmid'
-        mmid_temp: str = node.get('keyshortcuts') # type: ignore
 
-        # If the name has multiple mmids, take the last one
-        if(mmid_temp and is_space_delimited_mmid(mmid_temp)):
-            #TODO: consider if we should grab each of the mmids and process them separately as seperate nodes copying this node's attributes
-            mmid_temp = mmid_temp.split(' ')[-1]
+def __needs_element_info(node: dict[str, Any], mmid: int | None) -> bool:
+    """
+    Determines if the DOM element behind an accessibility node has to be looked up for enrichment.
+    """
+    return bool(mmid) and node['role'] != 'menuitem'
 
-        #focusing on nodes with mmid, which is the attribute we inject
-        try:
-            mmid = int(mmid_temp)
-        except (ValueError, TypeError):
-            #logger.error(f"'name attribute contains \"{node.get('name')}\", which is not a valid numeric mmid. Adding node as is: {node}")
-            return node.get('name')
 
-        if node['role'] == 'menuitem':
-            return node.get('name')
+def __merge_element_info(node: dict[str, Any], mmid: int, element_attributes: dict[str, Any] | None):
+    """
+    Merges the attributes fetched from the DOM element into its accessibility node and removes duplicated information.
 
-        if node.get('role') == 'dialog' and node.get('modal') == True:  # noqa: E712
-            node["important information"] = "This is a modal dialog. Please interact with this dialog and close it to be able to interact with the full page (e.g. by pressing the close button or selecting an option)."
+    Args:
+        node (dict[str, Any]): The accessibility node to update in place.
+        mmid (int): The mmid of the node.
+        element_attributes (dict[str, Any] | None): The attributes fetched from the DOM, or None if the element was skipped.
+    """
+    attributes_to_delete = ["level", "multiline", "haspopup", "id", "for"]
 
-        if mmid:
-            # Determine if we need to fetch 'innerText' based on the absence of 'children' in the accessibility node
-            should_fetch_inner_text = 'children' not in node
+    if node.get('role') == 'dialog' and node.get('modal') == True:  # noqa: E712
+        node["important information"] = "This is a modal dialog. Please interact with this dialog and close it to be able to interact with the full page (e.g. by pressing the close button or selecting an option)."
 
-            js_code = """
-            (input_params) => {
-                const should_fetch_inner_text = input_params.should_fetch_inner_text;
-                const mmid = input_params.mmid;
-                const attributes = input_params.attributes;
-                const tags_to_ignore = input_params.tags_to_ignore;
-                const ids_to_ignore = input_params.ids_to_ignore;
+    if 'keyshortcuts' in node:
+            del node['keyshortcuts'] #remove keyshortcuts since it is not needed
 
-                const element = document.querySelector(`[mmid="${mmid}"]`);
+    node["mmid"]=mmid
 
-                if (!element) {
-                    console.log(`No element found with mmid: ${mmid}`);
-                    return null;
-                }
+    # Update the node with fetched information
+    if element_attributes:
+        node.update(element_attributes)
 
-                if (ids_to_ignore.includes(element.id)) {
-                    console.log(`Ignoring element with id: ${element.id}`, element);
-                    return null;
-                }
-                //Ignore "option" because it would have been processed with the select element
-                if (tags_to_ignore.includes(element.tagName.toLowerCase()) || element.tagName.toLowerCase() === "option") return null;
+        # check if 'name' and 'mmid' are the same
+        if node.get('name') == node.get('mmid') and node.get('role') != "textbox":
+            del node['name']  # Remove 'name' from the node
 
-                let attributes_to_values = {
-                    'tag': element.tagName.toLowerCase() // Always include the tag name
-                };
+        if 'name' in node and 'description' in node and (node['name'] == node['description'] or node['name'] == node['description'].replace('\n', ' ') or node['description'].replace('\n', '') in node['name']):
+            del node['description'] #if the name is same as description, then remove the description to avoid duplication
 
-                // If the element is an input, include its type as well
-                if (element.tagName.toLowerCase() === 'input') {
-                    attributes_to_values['tag_type'] = element.type; // This will capture 'checkbox', 'radio', etc.
-                }
-                else if (element.tagName.toLowerCase() === 'select') {
-                    attributes_to_values["mmid"] = element.getAttribute('mmid');
-                    attributes_to_values["role"] = "combobox";
-                    attributes_to_values["options"] = [];
-
-                    for (const option of element.options) {
-                        let option_attributes_to_values = {
-                            "mmid": option.getAttribute('mmid'),
-                            "text": option.text,
-                            "value": option.value,
-                            "selected": option.selected
-                        };
-                        attributes_to_values["options"].push(option_attributes_to_values);
-                    }
-                    return attributes_to_values;
-                }
+        if 'name' in node and 'aria-label' in node and  node['aria-label'] in node['name']:
+            del node['aria-label'] #if the name is same as the aria-label, then remove the aria-label to avoid duplication
 
-                for (const attribute of attributes) {
-                    let value = element.getAttribute(attribute);
+        if 'name' in node and 'text' in node and node['name'] == node['text']:
+            del node['text'] #if the name is same as the text, then remove the text to avoid duplication
 
-                    if(value){
-                        /*
-                        if(attribute === 'href'){
-                            value = value.split('?')[0]
-                        }
-                        */
-                        attributes_to_values[attribute] = value;
-                    }
-                }
+        if node.get('tag') == "select": #children are not needed for select menus since "options" attriburte is already added
+            node.pop("children", None)
+            node.pop("role", None)
+            node.pop("description", None)
 
-                if (should_fetch_inner_text && element.innerText) {
-                    attributes_to_values['description'] = element.innerText;
-                }
+        #role and tag can have the same info. Get rid of role if it is the same as tag
+        if node.get('role') == node.get('tag'):
+            del node['role']
 
-                let role = element.getAttribute('role');
-                if(role==='listbox' || element.tagName.toLowerCase()=== 'ul'){
-                    let children=element.children;
-                    let filtered_children = Array.from(children).filter(child => child.getAttribute('role') === 'option');
-                    console.log("Listbox or ul found: ", filtered_children);
-                    let attributes_to_include = ['mmid', 'role', 'aria-label','value'];
-                    attributes_to_values["additional_info"]=[]
-                    for (const child of children) {
-                        let children_attributes_to_values = {};
+        # avoid duplicate aria-label
+        if node.get("aria-label") and node.get("placeholder") and node.get("aria-label") == node.get("placeholder"):
+            del node["aria-label"]
 
-                        for (let attr of child.attributes) {
-                            // If the attribute is not in the predefined list, add it to children_attributes_to_values
-                            if (attributes_to_include.includes(attr.name)) {
-                                children_attributes_to_values[attr.name] = attr.value;
-                            }
-                        }
+        if node.get("role") == "link":
+            del node["role"]
+            if node.get("description"):
+                node["text"] = node["description"]
+                del node["description"]
 
-                        attributes_to_values["additional_info"].push(children_attributes_to_values);
-                    }
-                }
-                // Check if attributes_to_values contains more than just 'name', 'role', and 'mmid'
-                const keys = Object.keys(attributes_to_values);
-                const minimalKeys = ['tag', 'mmid'];
-                const hasMoreThanMinimalKeys = keys.length > minimalKeys.length || keys.some(key => !minimalKeys.includes(key));
-
-                if (!hasMoreThanMinimalKeys) {
-                    //If there were no attributes found, then try to get the backup attributes
-                    for (const backupAttribute of input_params.backup_attributes) {
-                        let value = element.getAttribute(backupAttribute);
-                        if(value){
-                            attributes_to_values[backupAttribute] = value;
-                        }
-                    }
+        #textbox just means a text input and that is expressed well enough with the rest of the attributes returned
+        #if node.get('role') == "textbox":
+        #    del node['role']
 
-                    //if even the backup attributes are not found, then return null, which will cause this element to be skipped
-                    if(Object.keys(attributes_to_values).length <= minimalKeys.length) {
-                        if (element.tagName.toLowerCase() === 'button') {
-                                attributes_to_values["mmid"] = element.getAttribute('mmid');
-                                attributes_to_values["role"] = "button";
-                                attributes_to_values["additional_info"] = [];
-                                let children=element.children;
-                                let attributes_to_exclude = ['width', 'height', 'path', 'class', 'viewBox', 'mmid']
-
-                                // Check if the button has no text and no attributes
-                                if (element.innerText.trim() === '') {
-
-                                    for (const child of children) {
-                                        let children_attributes_to_values = {};
-
-                                        for (let attr of child.attributes) {
-                                            // If the attribute is not in the predefined list, add it to children_attributes_to_values
-                                            if (!attributes_to_exclude.includes(attr.name)) {
-                                                children_attributes_to_values[attr.name] = attr.value;
-                                            }
-                                        }
-
-                                        attributes_to_values["additional_info"].push(children_attributes_to_values);
-                                    }
-                                    console.log("Button with no text and no attributes: ", attributes_to_values);
-                                    return attributes_to_values;
-                                }
-                        }
+    #remove attributes that are not needed once processing of a node is complete
+    for attribute_to_delete in attributes_to_delete:
+        if attribute_to_delete in node:
+            node.pop(attribute_to_delete, None)
 
-                        return null; // Return null if only minimal keys are present
-                    }
-                }
-                return attributes_to_values;
-            }
-            """
-
-            # Fetch attributes and possibly 'innerText' from the DOM element by 'mmid'
-            element_attributes = await page.evaluate(js_code,
-                                                     {"mmid": mmid, "attributes": attributes, "backup_attributes": backup_attributes,
-                                                      "should_fetch_inner_text": should_fetch_inner_text,
-                                                      "tags_to_ignore": tags_to_ignore,
-                                                      "ids_to_ignore": ids_to_ignore})
-
-            if 'keyshortcuts' in node:
-                    del node['keyshortcuts'] #remove keyshortcuts since it is not needed
-
-            node["mmid"]=mmid
-
-            # Update the node with fetched information
-            if element_attributes:
-                node.update(element_attributes)
-
-                # check if 'name' and 'mmid' are the same
-                if node.get('name') == node.get('mmid') and node.get('role') != "textbox":
-                    del node['name']  # Remove 'name' from the node
-
-                if 'name' in node and 'description' in node and (node['name'] == node['description'] or node['name'] == node['description'].replace('\n', ' ') or node['description'].replace('\n', '') in node['name']):
-                    del node['description'] #if the name is same as description, then remove the description to avoid duplication
-
-                if 'name' in node and 'aria-label' in node and  node['aria-label'] in node['name']:
-                    del node['aria-label'] #if the name is same as the aria-label, then remove the aria-label to avoid duplication
-
-                if 'name' in node and 'text' in node and node['name'] == node['text']:
-                    del node['text'] #if the name is same as the text, then remove the text to avoid duplication
-
-                if node.get('tag') == "select": #children are not needed for select menus since "options" attriburte is already added
-                    node.pop("children", None)
-                    node.pop("role", None)
-                    node.pop("description", None)
-
-                #role and tag can have the same info. Get rid of role if it is the same as tag
-                if node.get('role') == node.get('tag'):
-                    del node['role']
-
-                # avoid duplicate aria-label
-                if node.get("aria-label") and node.get("placeholder") and node.get("aria-label") == node.get("placeholder"):
-                    del node["aria-label"]
-
-                if node.get("role") == "link":
-                    del node["role"]
-                    if node.get("description"):
-                        node["text"] = node["description"]
-                        del node["description"]
-
-                #textbox just means a text input and that is expressed well enough with the rest of the attributes returned
-                #if node.get('role') == "textbox":
-                #    del node['role']
-
-                if node.get('role') == "textbox":
-                    #get the id attribute of this field from the DOM
-                    if "id" in element_attributes and element_attributes["id"]:
-                        #find if there is an element in the DOM that has this id in aria-labelledby.
-                        js_code = """
-                        (inputParams) => {
-                            let referencingElements = [];
-                            const referencedElement = document.querySelector(`[aria-labelledby="${inputParams.aria_labelled_by_query_value}"]`);
-                            if(referencedElement) {
-                                const mmid = referencedElement.getAttribute('mmid');
-                                if (mmid) {
-                                    return {"mmid": mmid, "tag": referencedElement.tagName.toLowerCase()};
-                                }
-                            }
-                            return null;
-                        }
-                        """
-                    #textbox just means a text input and that is expressed well enough with the rest of the attributes returned
-                    #del node['role']
-
-            #remove attributes that are not needed once processing of a node is complete
-            for attribute_to_delete in attributes_to_delete:
-                if attribute_to_delete in node:
-                    node.pop(attribute_to_delete, None)
+
+def __restrict_tree_to_scope(accessibility_tree: dict[str, Any], dom_scope: DomScope) -> dict[str, Any]:
+    """
+    Removes the nodes outside of the scope from the accessibility tree, before it is enriched, so that they are never looked up in the DOM.
+
+    A node is in scope if its element is one of the scope's mmids. Nodes without an mmid (e.g. text) follow their parent, the root being
+    in scope for regions only. When a node is out of scope, its descendants that are in scope (e.g. a fixed header inside a page-long
+    wrapper) are lifted into the nearest ancestor that is kept. The root is always kept.
+
+    Args:
+        accessibility_tree (dict[str, Any]): The accessibility tree to restrict, modified in place.
+        dom_scope (DomScope): The resolved scope.
+
+    Returns:
+        dict[str, Any]: The root of the restricted tree.
+    """
+    # Pre-order pass deciding which nodes are in scope, then a post-order pass rebuilding the children lists
+    nodes_in_order: list[tuple[dict[str, Any], bool]] = []
+    stack: list[tuple[dict[str, Any], bool]] = [(accessibility_tree, dom_scope.is_region)]
+    while stack:
+        node, parent_in_scope = stack.pop()
+        mmid = __get_node_mmid(node)
+        in_scope = parent_in_scope if mmid is None else mmid in dom_scope.in_scope_mmids
+        nodes_in_order.append((node, in_scope))
+        stack.extend((child, in_scope) for child in reversed(node.get('children', [])))
+
+    kept_nodes: dict[int, list[dict[str, Any]]] = {}
+    for node, in_scope in reversed(nodes_in_order):
+        children: list[dict[str, Any]] = []
+        for child in node.get('children', []):
+            children.extend(kept_nodes.pop(id(child)))
+        if in_scope or node is accessibility_tree:
+            if 'children' in node:
+                # An emptied children list is kept, so that the text of the out of scope children is not fetched as a description
+                node['children'] = children
+            kept_nodes[id(node)] = [node]
         else:
-            logger.debug(f"No element found with mmid: {mmid}, deleting node: {node}")
-            node["marked_for_deletion_by_mm"] = True
+            kept_nodes[id(node)] = children
+    return kept_nodes[id(accessibility_tree)][0]
+
+
+async def __fetch_dom_info(page: Page, accessibility_tree: dict[str, Any], only_input_fields: bool, batch_enrichment: bool = True,
+                           element_describer: ElementDescriber | None = None):
+    """
+    Iterates over the accessibility tree, fetching additional information from the DOM based on 'mmid',
+    and constructs a new JSON structure with detailed information.
+
+    Args:
+        page (Page): The page object representing the web page.
+        accessibility_tree (dict[str, Any]): The accessibility tree JSON structure.
+        only_input_fields (bool): Flag indicating whether to include only input fields in the new JSON structure.
+        batch_enrichment (bool): If True, all the elements are described in a single page.evaluate call and the results
+            are merged in Python. If False, one page.evaluate call is made per node. Both modes produce the same tree.
+        element_describer (ElementDescriber | None): Describes elements without querying the page, used by the CDP backend.
+            If given, no page.evaluate call is made for the enrichment.
+
+    Returns:
+        dict[str, Any]: The pruned tree with detailed information from the DOM.
+    """
+
+    logger.debug("Reconciling the Accessibility Tree with the DOM")
+    enrichment_params = __ENRICHMENT_PARAMS
+
+    async def describe_elements(element_requests: list[dict[str, Any]]) -> list[dict[str, Any] | None]:
+        if element_describer is not None:
+            return element_describer(element_requests, enrichment_params)
+        return await page.evaluate(__FETCH_ALL_ELEMENTS_INFO_JS, {"elements": element_requests, **enrichment_params})
+
+    # Recursive function to process each node in the accessibility tree, one DOM lookup per node
+    async def process_node(node: dict[str, Any]):
+        if 'children' in node:
+            for child in node['children']:
+                await process_node(child)
 
+        mmid = __get_node_mmid(node)
+        if not __needs_element_info(node, mmid):
+            return node.get('name')
+
+        # Determine if we need to fetch 'innerText' based on the absence of 'children' in the accessibility node
+        should_fetch_inner_text = 'children' not in node
+
+        # Fetch attributes and possibly 'innerText' from the DOM element by 'mmid'
+        if element_describer is not None:
+            element_attributes = element_describer([{"mmid": mmid, "should_fetch_inner_text": should_fetch_inner_text}], enrichment_params)[0]
+        else:
+            element_attributes = await page.evaluate(__FETCH_SINGLE_ELEMENT_INFO_JS,
+                                                     {"mmid": mmid, "should_fetch_inner_text": should_fetch_inner_text, **enrichment_params})
+        __merge_element_info(node, mmid, element_attributes) # type: ignore
+
+    async def process_tree_in_batch(root: dict[str, Any]):
+        # Collect every node that needs a DOM lookup along with what needs to be fetched for it
+        nodes_to_enrich: list[tuple[dict[str, Any], int]] = []
+        element_requests: list[dict[str, Any]] = []
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            if 'children' in node:
+                stack.extend(node['children'])
+            mmid = __get_node_mmid(node)
+            if __needs_element_info(node, mmid):
+                nodes_to_enrich.append((node, mmid)) # type: ignore
+                element_requests.append({"mmid": mmid, "should_fetch_inner_text": 'children' not in node})
+
+        if not element_requests:
+            return
+
+        # Describe all the elements in one round trip and merge the results back into the tree
+        all_element_attributes = await describe_elements(element_requests)
+        for (node, mmid), element_attributes in zip(nodes_to_enrich, all_element_attributes, strict=True):
+            __merge_element_info(node, mmid, element_attributes)
+        logger.debug(f"Enriched {len(element_requests)} accessibility nodes in a single round trip")
 
     # Process each node in the tree starting from the root
-    await process_node(accessibility_tree)
+    if batch_enrichment:
+        await process_tree_in_batch(accessibility_tree)
+    else:
+        await process_node(accessibility_tree)
 
-    pruned_tree = __prune_tree(accessibility_tree, only_input_fields)
+    pruned_tree = __prune_tree(accessibility_tree, only_input_fields=False)
+    if only_input_fields:
+        pruned_tree = __collect_input_fields(pruned_tree)
 
     logger.debug("Reconciliation complete")
     return pruned_tree
@@ -332,87 +608,145 @@ async def __fetch_dom_info(page: Page, accessibility_tree: dict[str, Any], only_
 
 async def __cleanup_dom(page: Page):
     """
-    Cleans up the DOM by removing injected 'aria-description' attributes and restoring any original 'aria-keyshortcuts'
-    from 'orig-aria-keyshortcuts'.
+    Cleans up the DOM by restoring any original 'aria-keyshortcuts' from 'orig-aria-keyshortcuts'.
+    Only the few elements that had their own 'aria-keyshortcuts' are written to. The injected 'mmid' and 'aria-keyshortcuts'
+    of the other elements are left in place so that the next snapshot only has to label new elements.
     """
     logger.debug("Cleaning up the DOM's previous injections")
-    await page.evaluate("""() => {
-        const allElements = document.querySelectorAll('*[mmid]');
-        allElements.forEach(element => {
-            element.removeAttribute('aria-keyshortcuts');
-            const origAriaLabel = element.getAttribute('orig-aria-keyshortcuts');
-            if (origAriaLabel) {
-                element.setAttribute('aria-keyshortcuts', origAriaLabel);
-                element.removeAttribute('orig-aria-keyshortcuts');
-            }
-        });
-    }""")
-    logger.debug("DOM cleanup complete")
+    restored = await page.evaluate(__RESTORE_ARIA_KEYSHORTCUTS_JS)
+    logger.debug(f"DOM cleanup complete, restored the aria-keyshortcuts of {restored} elements")
 
 
 def __prune_tree(node: dict[str, Any], only_input_fields: bool) -> dict[str, Any] | None:
     """
-    Recursively prunes a tree starting from `node`, based on pruning conditions and handling of 'unraveling'.
+    Prunes a tree starting from `node`, based on pruning conditions and handling of 'unraveling'.
 
     The function has two main jobs:
     1. Pruning: Remove nodes that don't meet certain conditions, like being marked for deletion.
     2. Unraveling: For nodes marked with 'marked_for_unravel_children', we replace them with their children,
        effectively removing the node and lifting its children up a level in the tree.
 
-    This happens in place, meaning we modify the tree as we go, which is efficient but means you should
-    be cautious about modifying the tree outside this function during a prune operation.
+    The tree is walked iteratively, so deeply nested pages can not exceed the recursion limit. The nodes that have children are
+    collected in pre-order, then each children list is rebuilt in a single pass, deepest nodes first, so that wide nodes are
+    pruned in linear time. This happens in place, meaning we modify the nodes of the tree.
 
     Args:
-    - node (Dict[str, Any]): The node we're currently looking at. We'll check this node, its children,
-      and so on, recursively down the tree.
+    - node (Dict[str, Any]): The root of the tree to prune.
     - only_input_fields (bool): If True, we're only interested in pruning input-related nodes (like form fields).
       This lets you narrow the focus if, for example, you're only interested in cleaning up form-related parts
       of a larger tree.
 
     Returns:
-    - dict[str, Any] | None: The pruned version of `node`, or None if `node` was pruned away. When we 'unravel'
-      a node, we directly replace it with its children in the parent's list of children, so the return value
-      will be the parent, updated in place.
+    - dict[str, Any] | None: The pruned version of `node`, or None if `node` was pruned away.
 
     Notes:
-    - 'marked_for_deletion_by_mm' is our flag for nodes that should definitely be removed.
+    - 'marked_for_deletion_by_mm' is our flag for nodes that should definitely be removed, along with their subtree.
     - Unraveling is neat for flattening the tree when a node is just a wrapper without semantic meaning.
-    - We use a while loop with manual index management to safely modify the list of children as we iterate over it.
+      The children lifted up by unraveling are kept as they are, they are not pruned themselves.
     """
     if "marked_for_deletion_by_mm" in node:
         return None
 
-    if 'children' in node:
-        i = 0
-        while i < len(node['children']):
-            child = node['children'][i]
+    # Collect the nodes that have children, not descending into the nodes that are deleted or unraveled
+    parents: list[dict[str, Any]] = []
+    stack = [node]
+    while stack:
+        current = stack.pop()
+        if 'children' in current:
+            parents.append(current)
+            stack.extend(child for child in current['children']
+                         if 'children' in child and 'marked_for_unravel_children' not in child and 'marked_for_deletion_by_mm' not in child)
+
+    # Parents are processed after their descendants, so the children of a parent are already pruned when its list is rebuilt
+    should_prune_node = __should_prune_node
+    for current in reversed(parents):
+        kept_children: list[dict[str, Any]] = []
+        for child in current['children']:
             if 'marked_for_unravel_children' in child:
-                # Replace the current child with its children
-                if 'children' in child:
-                    node['children'] = node['children'][:i] + child['children'] + node['children'][i+1:]
-                    i += len(child['children']) - 1  # Adjust the index for the new children
-                else:
-                    # If the node marked for unraveling has no children, remove it
-                    node['children'].pop(i)
-                    i -= 1  # Adjust the index since we removed an element
-            else:
-                # Recursively prune the child if it's not marked for unraveling
-                pruned_child = __prune_tree(child, only_input_fields)
-                if pruned_child is None:
-                    # If the child is pruned, remove it from the children list
-                    node['children'].pop(i)
-                    i -= 1  # Adjust the index since we removed an element
-                else:
-                    # Update the child with the pruned version
-                    node['children'][i] = pruned_child
-            i += 1  # Move to the next child
+                # Replace the child with its children, or remove it if it has none
+                kept_children.extend(child.get('children', ()))
+            elif 'marked_for_deletion_by_mm' not in child and not should_prune_node(child, only_input_fields):
+                kept_children.append(child)
 
         # After processing all children, if the children array is empty, remove it
-        if not node['children']:
-            del node['children']
+        if kept_children:
+            current['children'] = kept_children
+        else:
+            del current['children']
+
+    # Apply existing conditions to decide if the root should be pruned, its descendants were decided by their parent
+    return None if should_prune_node(node, only_input_fields) else node
+
 
-    # Apply existing conditions to decide if the current node should be pruned
-    return None if __should_prune_node(node, only_input_fields) else node
+# Characters ignored when deciding if a name carries information
+__IGNORED_NAME_CHARACTERS = str.maketrans('', '', ',:\n')
+
+
+def __is_input_field(node: dict[str, Any]) -> bool:
+    return node.get("tag") in ("input", "button", "textarea") or node.get("role") == "button"
+
+
+async def __get_input_fields_info(page: Page, dom_scope: DomScope | None) -> dict[str, Any] | None:
+    """
+    Fast path for the input fields: finds, labels and describes the input fields in the page in one round trip, without taking
+    the accessibility snapshot of the whole page nor describing its other elements. The cost follows the number of input fields,
+    not the size of the page. The nodes are merged and pruned like the nodes of the full pipeline, and laid out like
+    __collect_input_fields does.
+
+    Args:
+        page (Page): The page to get the input fields of.
+        dom_scope (DomScope | None): If given, only the input fields inside this region or container are returned.
+
+    Returns:
+        dict[str, Any] | None: The root and the input fields, or None if there are none.
+    """
+    result = await page.evaluate(__FETCH_INPUT_FIELDS_JS, __ENRICHMENT_PARAMS)
+    logger.debug(f"Found {len(result['fields'])} rendered input fields, labelled {result['labelled']} new elements")
+    if dom_scope is not None:
+        await dom_scope.resolve(page, "inject")
+
+    input_fields: list[dict[str, Any]] = []
+    for input_field, element_attributes in result['fields']:
+        mmid = __get_node_mmid(input_field)
+        if mmid is None or (dom_scope is not None and mmid not in dom_scope.in_scope_mmids):
+            continue
+        __merge_element_info(input_field, mmid, element_attributes)
+        if not __should_prune_node(input_field, only_input_fields=True):
+            input_fields.append(input_field)
+
+    root: dict[str, Any] = {"role": "WebArea", "name": result['title']}
+    if input_fields:
+        root['children'] = input_fields
+    return None if __should_prune_node(root, only_input_fields=True) else root
+
+
+def __collect_input_fields(tree: dict[str, Any] | None) -> dict[str, Any] | None:
+    """
+    Lists the input fields of a pruned enriched tree, without their children, in document order as the children of the root.
+    Input fields nested in other elements (e.g. a button in a list item or a form landmark) are kept. The tree is not modified.
+
+    Args:
+        tree (dict[str, Any] | None): The enriched tree, pruned for all fields.
+
+    Returns:
+        dict[str, Any] | None: The root and the input fields, or None if there are none.
+    """
+    if tree is None:
+        return None
+    input_fields: list[dict[str, Any]] = []
+    stack = list(reversed(tree.get('children', [])))
+    while stack:
+        node = stack.pop()
+        if __is_input_field(node):
+            input_field = {key: value for key, value in node.items() if key != 'children'}
+            if not __should_prune_node(input_field, only_input_fields=True):
+                input_fields.append(input_field)
+        stack.extend(reversed(node.get('children', [])))
+
+    root = {key: value for key, value in tree.items() if key != 'children'}
+    if input_fields:
+        root['children'] = input_fields
+    return None if __should_prune_node(root, only_input_fields=True) else root
 
 
 def __should_prune_node(node: dict[str, Any], only_input_fields: bool):
@@ -426,30 +760,26 @@ def __should_prune_node(node: dict[str, Any], only_input_fields: bool):
     Returns:
         bool: True if the node should be pruned, False otherwise.
     """
+    role = node.get("role")
     #If the request is for only input fields and this is not an input field, then mark the node for prunning
-    if node.get("role") != "WebArea" and only_input_fields and not (node.get("tag") in ("input", "button", "textarea") or node.get("role") == "button"):
+    if role != "WebArea" and only_input_fields and not __is_input_field(node):
         return True
 
-    if node.get('role') == 'generic' and 'children' not in node and not ('name' in node and node.get('name')):  # The presence of 'children' is checked after potentially deleting it above
+    if role == 'generic' and 'children' not in node and not ('name' in node and node.get('name')):  # The presence of 'children' is checked after potentially deleting it above
         return True
 
-    if node.get('role') in ['separator', 'LineBreak']:
-        return True
-    processed_name = ""
-    if 'name' in node:
-        processed_name:str =node.get('name') # type: ignore
-        processed_name = processed_name.replace(',', '')
-        processed_name = processed_name.replace(':', '')
-        processed_name = processed_name.replace('\n', '')
-        processed_name = processed_name.strip()
-        if len(processed_name) <3:
-            processed_name = ""
-
-    #check if the node only have name and role, then delete that node
-    if len(node) == 2 and 'name' in node and 'role' in node and not (node.get('role') == "text" and processed_name != ""):
+    if role in ('separator', 'LineBreak'):
         return True
+
+    #check if the node only have name and role, then delete that node, unless it is a text with a name of at least 3 characters
+    if len(node) == 2 and 'name' in node and 'role' in node:
+        if role != "text":
+            return True
+        processed_name: str = node['name'].translate(__IGNORED_NAME_CHARACTERS).strip()
+        return len(processed_name) < 3
     return False
 
+
 async def get_node_dom_element(page: Page, mmid: str):
     return await page.evaluate("""
         (mmid) => {
@@ -475,6 +805,34 @@ async def get_element_attributes(page: Page, mmid: str, attributes: list[str]):
     """, {"mmid": mmid, "attributes": attributes})
 
 
+def input_fields_extraction(backend: str | None = None, input_fields_fast_path: bool = True) -> str:
+    """
+    Tells how do_get_accessibility_info extracts the input fields with the given backend and fast path setting.
+
+    Returns:
+        str: 'fast_path' when they are found and named in the page, without an accessibility snapshot, or 'pipeline' when they
+            are collected from the enriched accessibility tree, in which case derive_input_fields gives the same tree.
+    """
+    backend = backend or ACCESSIBILITY_TREE_BACKEND
+    return "fast_path" if input_fields_fast_path and backend == "inject" else "pipeline"
+
+
+def derive_input_fields(all_fields_tree: dict[str, Any]) -> dict[str, Any] | None:
+    """
+    Derives the input fields tree from the all fields tree of the same page state, without querying the page.
+    Input fields are collected from the all fields tree by the full pipeline too, so this gives the tree do_get_accessibility_info
+    would return with only_input_fields=True when input_fields_extraction is 'pipeline'. The fast path names and filters the
+    fields differently, its trees must not be mixed with derived ones.
+
+    Args:
+        all_fields_tree (dict[str, Any]): The tree returned by do_get_accessibility_info with only_input_fields=False. It is not modified.
+
+    Returns:
+        dict[str, Any] | None: The input fields tree, or None if there are no input fields.
+    """
+    return __collect_input_fields(all_fields_tree)
+
+
 async def get_dom_with_accessibility_info() -> Annotated[dict[str, Any] | None, "A minified representation of the HTML DOM for the current webpage"]:
     """
     Retrieves, processes, and minifies the Accessibility tree of the active page in a browser instance.
@@ -493,7 +851,9 @@ async def get_dom_with_accessibility_info() -> Annotated[dict[str, Any] | None,
     return await do_get_accessibility_info(page)
 
 
-async def do_get_accessibility_info(page: Page, only_input_fields: bool = False):
+async def do_get_accessibility_info(page: Page, only_input_fields: bool = False, batch_enrichment: bool = True, backend: str | None = None,
+                                     dom_scope: DomScope | None = None, compact_nodes: bool = True, input_fields_fast_path: bool = True,
+                                     save_log_files: bool = True):
     """
     Retrieves the accessibility information of a web page and saves it as JSON files.
 
@@ -501,26 +861,69 @@ async def do_get_accessibility_info(page: Page, only_input_fields: bool = False)
         page (Page): The page object representing the web page.
         only_input_fields (bool, optional): If True, only retrieves accessibility information for input fields.
             Defaults to False.
+        batch_enrichment (bool, optional): If True, the DOM information of all the nodes is fetched in a single round trip
+            to the browser instead of one round trip per node. Defaults to True.
+        backend (str | None, optional): 'inject' to inject mmids into the DOM, or 'cdp' to read the accessibility tree and the
+            DOM over CDP without mutating the page. Defaults to the ACCESSIBILITY_TREE_BACKEND environment variable ('inject').
+        dom_scope (DomScope | None, optional): If given, only the rendered elements inside this region or container are enriched and
+            returned. The scope is resolved against the page along the way. Defaults to None (the whole document).
+        compact_nodes (bool, optional): If True, the tree is converted to AccessibilityNode objects once it is saved, and enriched
+            and pruned in that form, which takes a fraction of the memory of dictionaries. It is converted back to dictionaries
+            before it is returned. Defaults to True.
+        input_fields_fast_path (bool, optional): If True, input fields are found and described in the page without taking the
+            accessibility snapshot of the whole page, with the inject backend. Their names are computed in the page from their
+            labelling context rather than by the browser. Defaults to True.
+        save_log_files (bool, optional): If True, the accessibility tree and the enhanced tree are saved as JSON files in the log
+            folder. Defaults to True.
 
     Returns:
         dict[str, Any] or None: The enhanced accessibility tree as a dictionary, or None if an error occurred.
     """
-    await __inject_attributes(page)
-    accessibility_tree: dict[str, Any] = await page.accessibility.snapshot(interesting_only=True)  # type: ignore
-
-    with open(os.path.join(SOURCE_LOG_FOLDER_PATH, 'json_accessibility_dom.json'), 'w',  encoding='utf-8') as f:
-        f.write(json.dumps(accessibility_tree, indent=2))
-        logger.debug("json_accessibility_dom.json saved")
-
-    await __cleanup_dom(page)
+    backend = backend or ACCESSIBILITY_TREE_BACKEND
+    if only_input_fields and input_fields_extraction(backend, input_fields_fast_path) == "fast_path":
+        input_fields_tree = await __get_input_fields_info(page, dom_scope)
+        if save_log_files:
+            with open(os.path.join(SOURCE_LOG_FOLDER_PATH, 'json_accessibility_dom_enriched.json'), 'w',  encoding='utf-8') as f:
+                json.dump(input_fields_tree, f, indent=2)
+        return input_fields_tree
+
+    element_describer: ElementDescriber | None = None
+    if backend == "cdp":
+        accessibility_tree, element_describer = await get_cdp_accessibility_snapshot(page) # type: ignore
+    elif backend == "inject":
+        await __inject_attributes(page)
+        accessibility_tree = await page.accessibility.snapshot(interesting_only=True)  # type: ignore
+    else:
+        raise ValueError(f"Unsupported accessibility tree backend: {backend}")
+
+    if save_log_files:
+        # Streamed to the file, so that the whole JSON text of large trees is never held in memory
+        with open(os.path.join(SOURCE_LOG_FOLDER_PATH, 'json_accessibility_dom.json'), 'w',  encoding='utf-8') as f:
+            json.dump(accessibility_tree, f, indent=2)
+            logger.debug("json_accessibility_dom.json saved")
+
+    if compact_nodes and accessibility_tree is not None:
+        # The dictionaries of the snapshot are released as they are converted
+        accessibility_tree = AccessibilityNode.from_tree(accessibility_tree)
+
+    if backend == "inject":
+        await __cleanup_dom(page)
+
+    if dom_scope is not None and accessibility_tree is not None:
+        # The mmids are left in the DOM by the cleanup, so the scope can still be resolved against them
+        await dom_scope.resolve(page, backend)
+        accessibility_tree = __restrict_tree_to_scope(accessibility_tree, dom_scope)
     try:
-        enhanced_tree = await __fetch_dom_info(page, accessibility_tree, only_input_fields)
+        enhanced_tree = await __fetch_dom_info(page, accessibility_tree, only_input_fields, batch_enrichment, element_describer) # type: ignore
+        if isinstance(enhanced_tree, AccessibilityNode):
+            enhanced_tree = enhanced_tree.to_dict(release_nodes=True)
 
         logger.debug("Enhanced Accessibility Tree ready")
 
-        with open(os.path.join(SOURCE_LOG_FOLDER_PATH, 'json_accessibility_dom_enriched.json'), 'w',  encoding='utf-8') as f:
-            f.write(json.dumps(enhanced_tree, indent=2))
-            logger.debug("json_accessibility_dom_enriched.json saved")
+        if save_log_files:
+            with open(os.path.join(SOURCE_LOG_FOLDER_PATH, 'json_accessibility_dom_enriched.json'), 'w',  encoding='utf-8') as f:
+                json.dump(enhanced_tree, f, indent=2)
+                logger.debug("json_accessibility_dom_enriched.json saved")
 
         return enhanced_tree
     except Exception as e:
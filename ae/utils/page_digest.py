@@ -0,0 +1,106 @@
+import os
+from typing import Any
+
+from playwright.async_api import Page
+
+from ae.utils.page_markdown import MARKDOWN_EXTRACTOR_JS
+from ae.utils.page_markdown import PAGE_TEXT_MAX_CHARS
+from ae.utils.page_markdown import with_cut_note
+
+# Maximum number of outbound links and of forms listed in a page digest
+DIGEST_MAX_LINKS = int(os.getenv("DIGEST_MAX_LINKS", 100))
+DIGEST_MAX_FORMS = int(os.getenv("DIGEST_MAX_FORMS", 20))
+
+# Maximum number of fields named in the summary of a form
+DIGEST_MAX_FORM_FIELDS = 10
+
+# Extracts, in one evaluate: the Markdown text of the page, the GIF and video URLs, the PDF URLs, the links to other sites
+# and a summary of the forms. Every list is deduplicated in the page, in document order.
+__DIGEST_JS = """
+(params) => {
+    """ + MARKDOWN_EXTRACTOR_JS + """
+    const text = extractMarkdown(params.maxChars);
+
+    const unique = () => {
+        const seen = new Set();
+        return url => {
+            if (!url || seen.has(url)) return false;
+            seen.add(url);
+            return true;
+        };
+    };
+
+    const media = [];
+    const isNewMedia = unique();
+    for (const element of document.querySelectorAll('img[src], video[src], source[src]')) {
+        const url = element.src;
+        const pattern = element.tagName === 'IMG' ? /\\.gif/i : /\\.(mp4|mov)/i;
+        if (pattern.test(url) && isNewMedia(url)) media.push(url);
+    }
+
+    const pdfs = [];
+    const isNewPdf = unique();
+    const links = [];
+    const isNewLink = unique();
+    let linksTotal = 0;
+    for (const element of document.querySelectorAll('a[href], img[src]')) {
+        const url = element.tagName === 'A' ? element.href : element.src;
+        if (/\\.pdf/i.test(url)) {
+            if (isNewPdf(url)) pdfs.push(url);
+            continue;
+        }
+        if (element.tagName !== 'A' || !/^https?:/.test(url)) continue;
+        let origin;
+        try {
+            origin = new URL(url).origin;
+        } catch (e) {
+            continue;
+        }
+        if (origin === location.origin || !isNewLink(url)) continue;
+        linksTotal += 1;
+        if (links.length < params.maxLinks) {
+            links.push({url: url, text: (element.textContent || element.getAttribute('aria-label') || '').replace(/\\s+/g, ' ').trim().slice(0, 80)});
+        }
+    }
+
+    const labelOf = field => {
+        const label = field.labels && field.labels.length ? field.labels[0].textContent : '';
+        return (field.getAttribute('aria-label') || label || field.getAttribute('placeholder') || field.getAttribute('name')
+                || field.id || field.type || '').replace(/\\s+/g, ' ').trim().slice(0, 60);
+    };
+    const forms = Array.from(document.forms).slice(0, params.maxForms).map(form => {
+        const fields = Array.from(form.elements).filter(field => field.type !== 'hidden' && field.tagName !== 'FIELDSET'
+                                                                  && field.tagName !== 'BUTTON' && field.type !== 'submit');
+        const summary = {fields: fields.slice(0, params.maxFormFields).map(labelOf), field_count: fields.length};
+        const name = form.getAttribute('aria-label') || form.getAttribute('name') || form.id;
+        if (name) summary.name = name;
+        if (form.getAttribute('action')) summary.action = form.action;
+        const submit = form.querySelector('button[type="submit"], input[type="submit"], button:not([type])');
+        if (submit) summary.submit = (submit.value || submit.textContent || '').replace(/\\s+/g, ' ').trim().slice(0, 60);
+        return summary;
+    });
+
+    return {text: text.markdown, truncated: text.truncated, blocks: text.blocks, media_urls: media, pdf_urls: pdfs, outbound_links: links,
+            outbound_links_total: linksTotal, forms: forms, forms_total: document.forms.length};
+}
+"""
+
+
+async def get_page_digest(page: Page, max_chars: int = PAGE_TEXT_MAX_CHARS) -> dict[str, Any]:
+    """
+    Extracts what the text_only content type returns, in one round trip: the text of the page as Markdown (see get_page_markdown),
+    the GIF and video URLs, the PDF URLs, the links to other sites and a summary of the forms, all deduplicated in document order.
+
+    Args:
+        page (Page): The page to digest.
+        max_chars (int): The maximum number of characters of text to extract. A note is appended when the text is cut.
+
+    Returns:
+        dict[str, Any]: The 'text', its landmark 'blocks' (see MARKDOWN_EXTRACTOR_JS), 'media_urls', 'pdf_urls', 'outbound_links' (url and text of the first DIGEST_MAX_LINKS links),
+            'outbound_links_total', 'forms' (name, action, fields and submit button of the first DIGEST_MAX_FORMS forms) and
+            'forms_total' of the page.
+    """
+    digest: dict[str, Any] = await page.evaluate(__DIGEST_JS, {"maxChars": max_chars, "maxLinks": DIGEST_MAX_LINKS,
+                                                              "maxForms": DIGEST_MAX_FORMS, "maxFormFields": DIGEST_MAX_FORM_FIELDS})
+    digest['text'] = with_cut_note(page, digest['text'], digest.pop('truncated'), max_chars)
+    return digest
@@ -0,0 +1,226 @@
+import os
+from typing import Any
+
+from playwright.async_api import Page
+
+from ae.utils.logger import logger
+
+# Maximum number of characters of the text extracted from a page, the extraction stops there
+PAGE_TEXT_MAX_CHARS = int(os.getenv("PAGE_TEXT_MAX_CHARS", 200000))
+
+# Walks the rendered nodes of the document once with a TreeWalker and writes them as compact Markdown: headings, list items,
+# table rows, preformatted blocks and image alt texts. The subtrees of hidden elements and of the Agent-E overlay are rejected by
+# the walker's filter, so no style is changed and the layout is not computed, unlike innerText. The walk stops as soon as the
+# text reaches maxChars. The offsets of the outermost landmark blocks (header, navigation, footer, aside, dialog, cookie banner)
+# in the text are returned too, to recognise the blocks repeated from page to page. Defined as a named function so that other
+# extraction scripts can embed it.
+MARKDOWN_EXTRACTOR_JS = """
+function extractMarkdown(maxChars) {
+    const root = document.body || document.documentElement;
+    if (!root) return {markdown: "", truncated: false, blocks: []};
+    const skippedTags = new Set(['SCRIPT', 'STYLE', 'NOSCRIPT', 'TEMPLATE', 'HEAD', 'IFRAME', 'OBJECT', 'EMBED', 'CANVAS', 'svg', 'SVG']);
+    const blockTags = new Set(['P', 'DIV', 'SECTION', 'ARTICLE', 'HEADER', 'FOOTER', 'NAV', 'ASIDE', 'MAIN', 'FORM', 'FIELDSET',
+        'BLOCKQUOTE', 'FIGURE', 'FIGCAPTION', 'ADDRESS', 'DL', 'DT', 'DD', 'UL', 'OL', 'LI', 'TABLE', 'THEAD', 'TBODY', 'TFOOT',
+        'TR', 'CAPTION', 'H1', 'H2', 'H3', 'H4', 'H5', 'H6', 'PRE', 'HR', 'DETAILS', 'SUMMARY', 'LEGEND', 'BR']);
+    const landmarkRoles = {banner: 'header', navigation: 'navigation', contentinfo: 'footer', complementary: 'aside', dialog: 'dialog',
+                           alertdialog: 'dialog'};
+    const landmarkTags = {HEADER: 'header', NAV: 'navigation', FOOTER: 'footer', ASIDE: 'aside', DIALOG: 'dialog'};
+    const blockKind = node => landmarkRoles[node.getAttribute('role')] || landmarkTags[node.tagName]
+        || (/cookie|consent|gdpr/i.test(`${node.id} ${typeof node.className === 'string' ? node.className : ''}`) ? 'cookie banner' : null);
+
+    // Elements accepted whose own text is hidden by the visibility property, while their children may set it back to visible.
+    // Each element is checked once, when the walker reaches it, and its text nodes look it up here.
+    const hiddenText = new Set();
+    if (root.checkVisibility && !root.checkVisibility({visibilityProperty: true})) hiddenText.add(root);
+    const filter = {
+        acceptNode(node) {
+            if (node.nodeType === Node.TEXT_NODE) {
+                return hiddenText.has(node.parentElement) ? NodeFilter.FILTER_SKIP : NodeFilter.FILTER_ACCEPT;
+            }
+            if (skippedTags.has(node.tagName) || node.id === 'agente-overlay' || node.hidden) return NodeFilter.FILTER_REJECT;
+            // A single check covers most elements: rendered and visible
+            if (!node.checkVisibility || node.checkVisibility({visibilityProperty: true})) return NodeFilter.FILTER_ACCEPT;
+            if (node.checkVisibility()) {
+                hiddenText.add(node);
+                return NodeFilter.FILTER_ACCEPT;
+            }
+            // Elements with display: contents have no box but their children are rendered
+            const style = getComputedStyle(node);
+            if (style.display !== 'contents') return NodeFilter.FILTER_REJECT;
+            if (style.visibility !== 'visible') hiddenText.add(node);
+            return NodeFilter.FILTER_ACCEPT;
+        }
+    };
+
+    const lines = [];
+    let length = 0;
+    let truncated = false;
+    let line = "";
+    let prefix = "";
+    const lists = [];      // {ordered, count} of the open lists
+    let row = null;        // cells of the open table row
+    let cell = null;       // text of the open table cell
+    let nestedCells = 0;   // cells of tables nested in the open cell, written as part of its text
+    const tables = [];     // number of rows written in each open table
+    let preDepth = 0;
+    const blocks = [];     // {start, end, kind} of the landmark blocks written
+    let block = null;      // the open landmark block
+
+    const write = text => {
+        lines.push(text);
+        length += text.length + 1;
+        if (length >= maxChars) truncated = true;
+    };
+    const flush = () => {
+        const text = preDepth ? line : line.replace(/[ \\t]+/g, ' ').trim();
+        if (text) write(prefix + text);
+        line = "";
+        prefix = "";
+    };
+    const append = text => {
+        if (cell !== null) cell += text;
+        else line += text;
+    };
+
+    const enter = node => {
+        if (node.nodeType === Node.TEXT_NODE) {
+            append(preDepth ? node.data : node.data.replace(/\\s+/g, ' '));
+            return;
+        }
+        const tag = node.tagName;
+        if (tag === 'IMG') {
+            const alt = (node.getAttribute('alt') || '').trim();
+            if (alt) append(` ![${alt}] `);
+            return;
+        }
+        if (cell !== null) {
+            if (tag === 'TD' || tag === 'TH') nestedCells += 1;
+            if (blockTags.has(tag)) cell += ' ';
+            return;
+        }
+        if (block === null) {
+            const kind = blockKind(node);
+            if (kind) {
+                flush();
+                block = {node: node, start: length, kind: kind};
+            }
+        }
+        if (tag === 'TD' || tag === 'TH') {
+            cell = "";
+            return;
+        }
+        if (!blockTags.has(tag)) return;
+        flush();
+        if (/^H[1-6]$/.test(tag)) prefix = '#'.repeat(Number(tag[1])) + ' ';
+        else if (tag === 'UL' || tag === 'OL') lists.push({ordered: tag === 'OL', count: 0});
+        else if (tag === 'LI') {
+            const list = lists[lists.length - 1];
+            const indent = '  '.repeat(Math.max(lists.length - 1, 0));
+            if (list) list.count += 1;
+            prefix = indent + (list && list.ordered ? `${list.count}. ` : '- ');
+        }
+        else if (tag === 'BLOCKQUOTE') prefix = '> ';
+        else if (tag === 'TABLE') tables.push(0);
+        else if (tag === 'TR') row = [];
+        else if (tag === 'PRE') {
+            write('```');
+            preDepth += 1;
+        }
+        else if (tag === 'HR') write('---');
+    };
+
+    const close = node => {
+        const tag = node.tagName;
+        if ((tag === 'TD' || tag === 'TH') && nestedCells) {
+            nestedCells -= 1;
+            cell += ' ';
+            return;
+        }
+        if (tag === 'TD' || tag === 'TH') {
+            if (row !== null) row.push(cell.replace(/\\s+/g, ' ').trim().replace(/\\|/g, '\\\\|'));
+            cell = null;
+            return;
+        }
+        if (cell !== null || !blockTags.has(tag)) return;
+        if (tag === 'TR') {
+            if (row && row.length) {
+                write(`| ${row.join(' | ')} |`);
+                if (tables.length && tables[tables.length - 1]++ === 0) write(`|${' --- |'.repeat(row.length)}`);
+            }
+            row = null;
+            return;
+        }
+        flush();
+        if (tag === 'UL' || tag === 'OL') lists.pop();
+        else if (tag === 'TABLE') tables.pop();
+        else if (tag === 'PRE') {
+            preDepth -= 1;
+            write('```');
+        }
+    };
+    const exit = node => {
+        if (node.nodeType !== Node.ELEMENT_NODE) return;
+        close(node);
+        if (block !== null && block.node === node) {
+            flush();
+            if (length > block.start) blocks.push({start: block.start, end: length, kind: block.kind});
+            block = null;
+        }
+    };
+
+    const walker = document.createTreeWalker(root, NodeFilter.SHOW_ELEMENT | NodeFilter.SHOW_TEXT, filter);
+    let node = walker.firstChild();
+    while (node && !truncated) {
+        enter(node);
+        if (node.nodeType === Node.ELEMENT_NODE && walker.firstChild()) {
+            node = walker.currentNode;
+            continue;
+        }
+        node = null;
+        while (!truncated) {
+            exit(walker.currentNode);
+            if (walker.nextSibling()) {
+                node = walker.currentNode;
+                break;
+            }
+            if (!walker.parentNode() || walker.currentNode === root) break;
+        }
+    }
+    if (!truncated) flush();
+
+    let markdown = lines.join('\\n');
+    if (markdown.length > maxChars) {
+        markdown = markdown.slice(0, maxChars);
+        truncated = true;
+    }
+    return {markdown: markdown, truncated: truncated, blocks: blocks};
+}
+"""
+
+
+async def get_page_markdown(page: Page, max_chars: int = PAGE_TEXT_MAX_CHARS) -> str:
+    """
+    Extracts the rendered text of the page as compact Markdown, in one pass over the DOM (see MARKDOWN_EXTRACTOR_JS).
+
+    Headings, list items, table rows, preformatted blocks and image alt texts are kept, links are written as their text.
+    The Agent-E overlay is left out.
+
+    Args:
+        page (Page): The page to extract the text of.
+        max_chars (int): The maximum number of characters to extract. A note is appended when the text is cut.
+
+    Returns:
+        str: The Markdown text of the page.
+    """
+    result: dict[str, Any] = await page.evaluate(f"(maxChars) => {{ {MARKDOWN_EXTRACTOR_JS}\n return extractMarkdown(maxChars); }}", max_chars)
+    return with_cut_note(page, result['markdown'], result['truncated'], max_chars)
+
+
+def with_cut_note(page: Page, markdown: str, truncated: bool, max_chars: int) -> str:
+    """
+    Appends a note to the text extracted from the page when it was cut at max_chars characters.
+    """
+    if not truncated:
+        return markdown
+    logger.info(f"The text of {page.url} was cut at {max_chars} characters")
+    return markdown + f"\n\n[The text of the page was cut at {max_chars} characters]"
@@ -1,15 +1,132 @@
-import aiofiles, time, base64, tempfile
+import base64
+import math
+import os
+import time
+from typing import Any
+
+from playwright.async_api import Page
+
+from ae.utils.cdp_helper import send_cdp_command
 from ae.utils.logger import logger
 
-def encode_image(image_path):
-    with open(image_path, "rb") as image_file:
-        return base64.b64encode(image_file.read()).decode("utf-8")
-
-async def screenshot_page(page):
-    new_screenshot = await page.screenshot()
-    current_timestamp = "_" + int(time.time()).__str__()
-    screenshot_png_name = tempfile.mktemp(prefix='page-screenshot-', suffix=f"{current_timestamp}.png")
-    async with aiofiles.open(screenshot_png_name, "wb") as file:  # type: ignore
-        await file.write(new_screenshot)  # type: ignore
-    logger.info(f"Screenshot saved as {screenshot_png_name}")
-    return {"type": "image_url", "image_url": "data:image/png;base64," + encode_image(screenshot_png_name)}
+# Format and quality of the screenshots returned to the LLM. Quality applies to jpeg and webp.
+SCREENSHOT_FORMAT = os.getenv("SCREENSHOT_FORMAT", "jpeg").lower()
+SCREENSHOT_QUALITY = int(os.getenv("SCREENSHOT_QUALITY", 70))
+
+# Largest size of a screenshot, in pixels. The viewport is scaled down to fit, never up.
+SCREENSHOT_MAX_WIDTH = int(os.getenv("SCREENSHOT_MAX_WIDTH", 1280))
+SCREENSHOT_MAX_HEIGHT = int(os.getenv("SCREENSHOT_MAX_HEIGHT", 800))
+
+# Largest size of a screenshot image, in bytes, before its base64 encoding. A larger one is taken again at a lower quality and
+# scale, and is left out of the tool output if it still does not fit.
+DEFAULT_SCREENSHOT_MAX_BYTES = int(os.getenv("SCREENSHOT_MAX_BYTES", 200000))
+
+# Times a screenshot is taken again to fit its byte limit
+SCREENSHOT_MAX_RETRIES = 2
+
+
+def __parse_tool_limits(limits: str) -> dict[str, int]:
+    """
+    Parses per-tool limits given as 'tool_name=bytes,tool_name=bytes'.
+    """
+    tool_limits: dict[str, int] = {}
+    for entry in limits.split(','):
+        if '=' in entry:
+            tool_name, max_bytes = entry.split('=', 1)
+            tool_limits[tool_name.strip()] = int(max_bytes)
+    return tool_limits
+
+
+SCREENSHOT_MAX_BYTES_PER_TOOL: dict[str, int] = __parse_tool_limits(os.getenv("SCREENSHOT_MAX_BYTES_PER_TOOL", ""))
+
+
+def get_screenshot_max_bytes(tool_name: str | None) -> int:
+    return SCREENSHOT_MAX_BYTES_PER_TOOL.get(tool_name or "", DEFAULT_SCREENSHOT_MAX_BYTES)
+
+
+def __image_size(encoded: str) -> int:
+    """
+    Returns the size in bytes of the image encoded in base64, without decoding it.
+    """
+    return len(encoded) * 3 // 4 - encoded.count('=', max(0, len(encoded) - 2))
+
+
+async def __capture(page: Page, image_format: str, quality: int, max_width: int, max_height: int) -> tuple[str, str, bool]:
+    """
+    Captures the viewport in memory with CDP Page.captureScreenshot, scaled down to fit max_width x max_height pixels, and
+    returns it base64 encoded as CDP sends it, along with its format and whether it was scaled to fit. Falls back to the
+    Playwright screenshot on browsers without CDP: it is taken at CSS pixel scale, as Playwright cannot scale a screenshot down,
+    and max_width and max_height do not apply. Playwright does not take webp screenshots, jpeg is used instead.
+    """
+    viewport: dict[str, float] = await page.evaluate("""() => {
+        const viewport = window.visualViewport;
+        return viewport ? {x: viewport.pageLeft, y: viewport.pageTop, width: viewport.width, height: viewport.height, ratio: window.devicePixelRatio}
+                        : {x: window.scrollX, y: window.scrollY, width: window.innerWidth, height: window.innerHeight, ratio: window.devicePixelRatio};
+    }""")
+    # The image is captured at the device pixel ratio, the clip scale brings it down to the largest size allowed
+    pixel_scale = min(1.0, max_width / (viewport["width"] * viewport["ratio"]), max_height / (viewport["height"] * viewport["ratio"]))
+    params: dict[str, Any] = {
+        "format": image_format,
+        "clip": {"x": viewport["x"], "y": viewport["y"], "width": viewport["width"], "height": viewport["height"], "scale": pixel_scale},
+        "captureBeyondViewport": False,
+    }
+    if image_format != "png":
+        params["quality"] = quality
+    try:
+        screenshot = await send_cdp_command(page, "Page.captureScreenshot", params)
+        return screenshot["data"], image_format, True
+    except Exception as e:
+        logger.debug(f"CDP screenshot failed, taking it with Playwright. Error: {e}")
+        if image_format == "png":
+            image = await page.screenshot(type="png", scale="css")
+        else:
+            image_format = "jpeg"
+            image = await page.screenshot(type="jpeg", quality=quality, scale="css")
+        return base64.b64encode(image).decode("utf-8"), image_format, False
+
+
+async def screenshot_page(page: Page, tool_name: str | None = None) -> dict[str, Any]:
+    """
+    Takes a screenshot of the viewport, encoded in memory as a message content part for the LLM. Nothing is written to disk.
+    The screenshot is taken in SCREENSHOT_FORMAT at SCREENSHOT_QUALITY, scaled down to fit SCREENSHOT_MAX_WIDTH x
+    SCREENSHOT_MAX_HEIGHT, and its image has to fit the byte limit of the tool (SCREENSHOT_MAX_BYTES_PER_TOOL, else
+    SCREENSHOT_MAX_BYTES). A screenshot over the limit is taken again smaller and at a lower quality, or only at a lower quality
+    when it was taken with Playwright, which cannot scale it down.
+
+    Args:
+        page (Page): The page to take the screenshot of.
+        tool_name (str | None): The tool the screenshot is returned by, whose byte limit applies.
+
+    Returns:
+        dict[str, Any]: An 'image_url' content part holding the screenshot as a data URL, or a 'text' content part saying the
+            screenshot was left out when it could not fit the byte limit.
+    """
+    max_bytes = get_screenshot_max_bytes(tool_name)
+    image_format = SCREENSHOT_FORMAT
+    quality = SCREENSHOT_QUALITY
+    max_width, max_height = SCREENSHOT_MAX_WIDTH, SCREENSHOT_MAX_HEIGHT
+    started = time.monotonic()
+    retries = 0
+    encoded, captured_format, scalable = await __capture(page, image_format, quality, max_width, max_height)
+    image_size = __image_size(encoded)
+    while image_size > max_bytes and retries < SCREENSHOT_MAX_RETRIES:
+        logger.info(f"Screenshot for {tool_name} is {image_size} bytes, over the limit of {max_bytes} bytes")
+        if scalable:
+            # The size of an image goes roughly with its area, both sides are scaled down to fit
+            shrink = math.sqrt(max_bytes / image_size) * 0.9
+            max_width, max_height = max(1, int(max_width * shrink)), max(1, int(max_height * shrink))
+        elif captured_format == "jpeg" and quality == 30:
+            # Playwright cannot take it any smaller
+            break
+        if image_format == "png":
+            image_format = "jpeg"
+        quality = max(30, quality - 15)
+        retries += 1
+        encoded, captured_format, scalable = await __capture(page, image_format, quality, max_width, max_height)
+        image_size = __image_size(encoded)
+    if image_size > max_bytes:
+        logger.warning(f"Screenshot for {tool_name} left out, it is {image_size} bytes after {retries} retries, over the limit of {max_bytes} bytes")
+        return {"type": "text", "text": "The screenshot of the page was left out, it is too large."}
+
+    logger.info(f"Screenshot for {tool_name} taken as {captured_format} in {image_size} bytes, {retries} retries, {time.monotonic() - started:.2f} seconds")
+    return {"type": "image_url", "image_url": f"data:image/{captured_format};base64,{encoded}"}
@@ -0,0 +1,116 @@
+import argparse
+import asyncio
+import json
+import time
+from typing import Any
+
+from ae.utils.get_detailed_accessibility_tree import do_get_accessibility_info
+from playwright.async_api import async_playwright
+
+
+class RoundTripCountingPage:
+    """
+    Wraps a Playwright page and counts the calls that need a round trip to the browser, CDP commands included.
+    """
+
+    counted_methods = ("evaluate", "evaluate_handle", "query_selector", "query_selector_all")
+
+    def __init__(self, page: Any):
+        self._page = page
+        self.round_trips = 0
+        self.accessibility = _CountingAccessibility(self, page.accessibility)
+        self.context = _CountingContext(self, page)
+
+    def __getattr__(self, name: str) -> Any:
+        attribute = getattr(self._page, name)
+        if name not in self.counted_methods:
+            return attribute
+
+        async def counted(*args: Any, **kwargs: Any) -> Any:
+            self.round_trips += 1
+            return await attribute(*args, **kwargs)
+        return counted
+
+
+class _CountingAccessibility:
+    def __init__(self, counting_page: RoundTripCountingPage, accessibility: Any):
+        self._counting_page = counting_page
+        self._accessibility = accessibility
+
+    async def snapshot(self, *args: Any, **kwargs: Any) -> Any:
+        self._counting_page.round_trips += 1
+        return await self._accessibility.snapshot(*args, **kwargs)
+
+
+class _CountingContext:
+    """
+    Attaches the CDP sessions asked for the counting page to the page it wraps, and counts their commands.
+    """
+
+    def __init__(self, counting_page: RoundTripCountingPage, page: Any):
+        self._counting_page = counting_page
+        self._page = page
+
+    async def new_cdp_session(self, page: Any) -> "_CountingCDPSession":
+        self._counting_page.round_trips += 1
+        return _CountingCDPSession(self._counting_page, await self._page.context.new_cdp_session(self._page))
+
+
+class _CountingCDPSession:
+    def __init__(self, counting_page: RoundTripCountingPage, session: Any):
+        self._counting_page = counting_page
+        self._session = session
+
+    async def send(self, method: str, params: dict[str, Any] | None = None) -> Any:
+        self._counting_page.round_trips += 1
+        return await self._session.send(method, params)
+
+
+async def measure(page: Any, batch_enrichment: bool, only_input_fields: bool, backend: str | None, repeat: int) -> dict[str, Any]:
+    timings: list[float] = []
+    round_trips = 0
+    tree = None
+    for _ in range(repeat):
+        counting_page = RoundTripCountingPage(page)
+        start = time.perf_counter()
+        # The input fields fast path does not enrich an accessibility tree, the pipeline is measured in both modes
+        tree = await do_get_accessibility_info(counting_page, only_input_fields=only_input_fields, batch_enrichment=batch_enrichment, # type: ignore
+                                               backend=backend, input_fields_fast_path=False, save_log_files=False)
+        timings.append(time.perf_counter() - start)
+        round_trips = counting_page.round_trips
+    return {"round_trips": round_trips, "best_seconds": min(timings), "mean_seconds": sum(timings) / len(timings), "tree": tree}
+
+
+async def main(url: str, cdp_url: str | None, only_input_fields: bool, backend: str | None, repeat: int):
+    async with async_playwright() as playwright:
+        if cdp_url:
+            browser = await playwright.chromium.connect_over_cdp(cdp_url)
+            context = browser.contexts[0]
+        else:
+            browser = await playwright.chromium.launch(headless=True)
+            context = await browser.new_context()
+        page = await context.new_page()
+        await page.goto(url, wait_until="load")
+
+        per_node = await measure(page, batch_enrichment=False, only_input_fields=only_input_fields, backend=backend, repeat=repeat)
+        batched = await measure(page, batch_enrichment=True, only_input_fields=only_input_fields, backend=backend, repeat=repeat)
+        await browser.close()
+
+    identical = json.dumps(per_node["tree"], sort_keys=True) == json.dumps(batched["tree"], sort_keys=True)
+    print(f"URL: {url}")
+    print(f"{'mode':<10} {'round trips':>12} {'best (s)':>10} {'mean (s)':>10}")
+    for mode, result in (("per-node", per_node), ("batched", batched)):
+        print(f"{mode:<10} {result['round_trips']:>12} {result['best_seconds']:>10.3f} {result['mean_seconds']:>10.3f}")
+    print(f"Speedup (best): {per_node['best_seconds'] / max(batched['best_seconds'], 1e-9):.1f}x")
+    print(f"Identical output: {identical}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compares per-node and batched accessibility tree enrichment.")
+    parser.add_argument("url", type=str, help="The page to benchmark against.")
+    parser.add_argument("--cdp-url", type=str, default=None, help="Connect to a remote browser over CDP (e.g. a Browserbase session) instead of launching a local one.")
+    parser.add_argument("--input-fields", action="store_true", help="Benchmark the input_fields extraction instead of all_fields.")
+    parser.add_argument("--backend", type=str, choices=["inject", "cdp"], default=None, help="The accessibility tree backend. Defaults to ACCESSIBILITY_TREE_BACKEND.")
+    parser.add_argument("--repeat", type=int, default=3, help="Number of runs per mode.")
+    args = parser.parse_args()
+    asyncio.run(main(args.url, args.cdp_url, args.input_fields, args.backend, args.repeat))
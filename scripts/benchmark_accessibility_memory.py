@@ -0,0 +1,131 @@
+import argparse
+import asyncio
+import json
+import random
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+from typing import Any
+
+from ae.utils.get_detailed_accessibility_tree import do_get_accessibility_info
+
+ROLES = ('generic', 'text', 'link', 'button', 'listitem', 'heading', 'img', 'textbox', 'combobox', 'cell', 'row')
+TAGS = ('div', 'a', 'button', 'input', 'span', 'li', 'td', 'img')
+NAMES = ('', 'Go', 'Search products', 'Add to cart', 'Read more about this item', 'Free delivery on orders over $25')
+
+
+def synthetic_snapshot(n_nodes: int, seed: int) -> dict[str, Any]:
+    """
+    Generates a snapshot as returned by page.accessibility.snapshot() after the mmids were injected: every node carries its mmid
+    in 'keyshortcuts', except the text nodes.
+    """
+    rng = random.Random(seed)
+    root: dict[str, Any] = {'role': 'WebArea', 'name': 'Synthetic page', 'children': []}
+    nodes = [root]
+    for mmid in range(1, n_nodes):
+        role = rng.choice(ROLES)
+        node: dict[str, Any] = {'role': role, 'name': f"{rng.choice(NAMES)} {mmid}"}
+        if role != 'text':
+            node['keyshortcuts'] = str(mmid)
+        if role == 'heading':
+            node['level'] = rng.randint(1, 4)
+        nodes[rng.randrange(len(nodes))].setdefault('children', []).append(node)
+        nodes.append(node)
+    return root
+
+
+def describe_element(request: dict[str, Any], rng: random.Random) -> dict[str, Any]:
+    """
+    Describes an element the way the enrichment script does: its tag and a few of its attributes.
+    """
+    description: dict[str, Any] = {'tag': rng.choice(TAGS), 'mmid': str(request['mmid'])}
+    if rng.random() < 0.3:
+        description['aria-label'] = rng.choice(NAMES)
+    if rng.random() < 0.1:
+        description['data-testid'] = f"item-{request['mmid']}"
+    if request['should_fetch_inner_text'] and rng.random() < 0.5:
+        description['description'] = rng.choice(NAMES)
+    return description
+
+
+class FakeAccessibility:
+    def __init__(self, n_nodes: int):
+        self.n_nodes = n_nodes
+
+    async def snapshot(self, interesting_only: bool = True) -> dict[str, Any]:
+        return synthetic_snapshot(self.n_nodes, seed=self.n_nodes)
+
+
+class FakePage:
+    """
+    Answers the calls do_get_accessibility_info makes to the page with synthetic data, so that the memory of the tree processing
+    is measured without a browser.
+    """
+
+    def __init__(self, n_nodes: int):
+        self.accessibility = FakeAccessibility(n_nodes)
+        self.rng = random.Random(n_nodes)
+
+    async def evaluate(self, expression: str, arg: Any = None) -> Any:
+        if isinstance(arg, dict) and 'elements' in arg:
+            return [describe_element(request, self.rng) for request in arg['elements']]
+        if 'labelled' in expression:
+            return {'labelled': 0, 'last_mmid': 0}
+        return None
+
+
+def measure(n_nodes: int, compact_nodes: bool) -> dict[str, Any]:
+    """
+    Runs do_get_accessibility_info once, in this process. Meant to be run in a fresh process per measurement,
+    as the peak RSS of a process never goes down.
+    """
+    page = FakePage(n_nodes)
+    baseline_rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    tracemalloc.start()
+    start = time.perf_counter()
+    tree = asyncio.run(do_get_accessibility_info(page, backend="inject", compact_nodes=compact_nodes, save_log_files=False)) # type: ignore
+    seconds = time.perf_counter() - start
+    _, traced_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    peak_rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return {
+        "seconds": seconds,
+        "traced_peak_bytes": traced_peak,
+        "peak_rss_bytes": peak_rss_kb * 1024,
+        "rss_growth_bytes": (peak_rss_kb - baseline_rss_kb) * 1024,
+        "output_bytes": len(json.dumps(tree)),
+    }
+
+
+def main(sizes: list[int]):
+    print("Memory per 10k nodes. tracemalloc timings are slower than untraced runs.")
+    print(f"{'nodes':>8} {'model':<8} {'peak RSS (MB)':>14} {'RSS growth/10k (MB)':>20} {'traced peak/10k (MB)':>21} {'time (s)':>9} {'output':>8}")
+    outputs: dict[int, set[int]] = {}
+    for size in sizes:
+        for compact_nodes in (False, True):
+            completed = subprocess.run([sys.executable, __file__, "--measure", str(size), str(int(compact_nodes))],
+                                       capture_output=True, text=True, check=True)
+            result = json.loads(completed.stdout.strip().splitlines()[-1])
+            outputs.setdefault(size, set()).add(result["output_bytes"])
+            per_10k = 10_000 / size / 2**20
+            print(f"{size:>8} {'slots' if compact_nodes else 'dict':<8} {result['peak_rss_bytes'] / 2**20:>14.1f} "
+                  f"{result['rss_growth_bytes'] * per_10k:>20.2f} {result['traced_peak_bytes'] * per_10k:>21.2f} "
+                  f"{result['seconds']:>9.2f} {result['output_bytes']:>8}")
+    for size, output_sizes in outputs.items():
+        if len(output_sizes) > 1:
+            print(f"The outputs of both models differ in size for {size} nodes")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measures the peak memory of do_get_accessibility_info on synthetic snapshots, "
+                                                 "with the dictionary and the compact node models.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 50_000, 200_000], help="Numbers of nodes of the synthetic snapshots.")
+    parser.add_argument("--measure", type=int, nargs=2, metavar=("NODES", "COMPACT"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.measure:
+        print(json.dumps(measure(args.measure[0], bool(args.measure[1]))))
+    else:
+        main(args.sizes)
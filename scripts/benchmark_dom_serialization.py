@@ -0,0 +1,62 @@
+import argparse
+import json
+import os
+from collections.abc import Callable
+from typing import Any
+
+from ae.config import SOURCE_LOG_FOLDER_PATH
+from ae.utils.dom_serializer import serialize_dom_output_compact
+
+
+def get_token_counter(encoding_name: str) -> tuple[str, Callable[[str], int]]:
+    """
+    Returns a token counter using tiktoken if it is installed, otherwise an estimate of 4 characters per token.
+    """
+    try:
+        import tiktoken
+    except ImportError:
+        return "estimated (chars / 4)", lambda text: (len(text) + 3) // 4
+    encoding = tiktoken.get_encoding(encoding_name)
+    return f"tiktoken {encoding_name}", lambda text: len(encoding.encode(text))
+
+
+def serializations(tree: dict[str, Any]) -> dict[str, str]:
+    return {
+        "str(dict)": str(tree), # what get_dom_with_content_type returns for output_format='json'
+        "json": json.dumps(tree, ensure_ascii=False),
+        "compact": serialize_dom_output_compact(tree),
+    }
+
+
+def main(paths: list[str], encoding_name: str):
+    counter_name, count_tokens = get_token_counter(encoding_name)
+    print(f"Token counts: {counter_name}")
+    print(f"{'page':<40} {'format':<10} {'bytes':>10} {'tokens':>10} {'vs str(dict)':>13}")
+
+    totals: dict[str, list[int]] = {}
+    for path in paths:
+        with open(path, encoding='utf-8') as f:
+            tree = json.load(f)
+        baseline_tokens = None
+        for format_name, serialized in serializations(tree).items():
+            size = len(serialized.encode('utf-8'))
+            tokens = count_tokens(serialized)
+            baseline_tokens = baseline_tokens or tokens
+            totals.setdefault(format_name, [0, 0])
+            totals[format_name][0] += size
+            totals[format_name][1] += tokens
+            print(f"{os.path.basename(path)[:40]:<40} {format_name:<10} {size:>10} {tokens:>10} {tokens / baseline_tokens:>12.0%}")
+
+    if len(paths) > 1:
+        baseline_tokens = totals["str(dict)"][1]
+        for format_name, (size, tokens) in totals.items():
+            print(f"{'TOTAL':<40} {format_name:<10} {size:>10} {tokens:>10} {tokens / baseline_tokens:>12.0%}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compares the size of the JSON and compact serializations of enriched accessibility trees.")
+    parser.add_argument("paths", nargs="*", default=[os.path.join(SOURCE_LOG_FOLDER_PATH, 'json_accessibility_dom_enriched.json')],
+                        help="Enriched trees saved by do_get_accessibility_info. Defaults to the last one saved in the log folder.")
+    parser.add_argument("--encoding", type=str, default="o200k_base", help="The tiktoken encoding to count tokens with.")
+    args = parser.parse_args()
+    main(args.paths, args.encoding)
@@ -0,0 +1,92 @@
+import argparse
+import asyncio
+import time
+from typing import Any
+
+from ae.utils.page_markdown import get_page_markdown
+from ae.utils.page_markdown import PAGE_TEXT_MAX_CHARS
+from playwright.async_api import async_playwright
+
+# The text_only extraction this replaces: hides the overlay through its style, reads innerText and appends every image alt text
+INNER_TEXT_JS = """
+() => {
+    const originalStyles = [];
+    document.querySelectorAll('#agente-overlay').forEach(element => {
+        originalStyles.push({element: element, originalStyle: element.style.visibility});
+        element.style.visibility = 'hidden';
+    });
+    let textContent = document?.body?.innerText || document?.documentElement?.innerText || "";
+    let altTexts = Array.from(document.querySelectorAll('img')).map(img => img.alt);
+    altTexts = "Other Alt Texts in the page: " + altTexts.join(' ');
+    originalStyles.forEach(entry => {
+        entry.element.style.visibility = entry.originalStyle;
+    });
+    return textContent + " " + altTexts;
+}
+"""
+
+# Changes the layout of the page before every run, as the page would change between two extractions
+INVALIDATE_LAYOUT_JS = "(run) => { document.body.style.paddingLeft = `${run % 2}px`; }"
+
+
+def synthetic_page(sections: int) -> str:
+    """
+    Generates an article-like page: every section has a heading, paragraphs with links, a list, a table and an image,
+    plus a hidden block and the Agent-E overlay.
+    """
+    parts = ['<html><body><div id="agente-overlay">Agent-E overlay</div><nav><ul><li><a href="/">Home</a></li><li><a href="/docs">Docs</a></li></ul></nav>']
+    for section in range(sections):
+        parts.append(f'<section><h2>Section {section}</h2>')
+        parts.append(f'<p>Paragraph {section} with <a href="/p/{section}">a link</a> and <b>bold text</b>. ' + 'Lorem ipsum dolor sit amet. ' * 8 + '</p>')
+        parts.append('<ul>' + ''.join(f'<li>Item {item} of section {section}</li>' for item in range(5)) + '</ul>')
+        parts.append('<table><tr><th>Name</th><th>Value</th></tr>' + ''.join(f'<tr><td>Row {row}</td><td>{row * section}</td></tr>' for row in range(5)) + '</table>')
+        parts.append(f'<img src="/img/{section}.png" alt="Figure {section}"><div style="display:none">Hidden {section}</div></section>')
+    parts.append('</body></html>')
+    return ''.join(parts)
+
+
+async def measure(page: Any, extract: Any, repeat: int) -> dict[str, Any]:
+    timings: list[float] = []
+    text = ""
+    for run in range(repeat):
+        await page.evaluate(INVALIDATE_LAYOUT_JS, run)
+        start = time.perf_counter()
+        text = await extract()
+        timings.append(time.perf_counter() - start)
+    return {"best_seconds": min(timings), "mean_seconds": sum(timings) / len(timings), "chars": len(text)}
+
+
+async def main(url: str | None, sections: int, cdp_url: str | None, max_chars: int, repeat: int):
+    async with async_playwright() as playwright:
+        if cdp_url:
+            browser = await playwright.chromium.connect_over_cdp(cdp_url)
+            context = browser.contexts[0]
+        else:
+            browser = await playwright.chromium.launch(headless=True)
+            context = await browser.new_context()
+        page = await context.new_page()
+        if url:
+            await page.goto(url, wait_until="load")
+        else:
+            await page.set_content(synthetic_page(sections))
+
+        inner_text = await measure(page, lambda: page.evaluate(INNER_TEXT_JS), repeat)
+        markdown = await measure(page, lambda: get_page_markdown(page, max_chars), repeat)
+        await browser.close()
+
+    print(f"Page: {url or f'synthetic, {sections} sections'}")
+    print(f"{'mode':<10} {'chars':>10} {'best (s)':>10} {'mean (s)':>10}")
+    for mode, result in (("innerText", inner_text), ("markdown", markdown)):
+        print(f"{mode:<10} {result['chars']:>10} {result['best_seconds']:>10.3f} {result['mean_seconds']:>10.3f}")
+    print(f"Speedup (best): {inner_text['best_seconds'] / max(markdown['best_seconds'], 1e-9):.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compares the innerText text extraction with the single pass Markdown extraction.")
+    parser.add_argument("url", type=str, nargs="?", default=None, help="The page to benchmark against. A synthetic page is generated if omitted.")
+    parser.add_argument("--sections", type=int, default=2000, help="Number of sections of the synthetic page.")
+    parser.add_argument("--cdp-url", type=str, default=None, help="Connect to a remote browser over CDP (e.g. a Browserbase session) instead of launching a local one.")
+    parser.add_argument("--max-chars", type=int, default=PAGE_TEXT_MAX_CHARS, help="Character budget of the Markdown extraction.")
+    parser.add_argument("--repeat", type=int, default=5, help="Number of runs per mode.")
+    args = parser.parse_args()
+    asyncio.run(main(args.url, args.sections, args.cdp_url, args.max_chars, args.repeat))
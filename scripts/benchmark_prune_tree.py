@@ -0,0 +1,60 @@
+import argparse
+import sys
+import time
+from typing import Any
+
+import ae.utils.get_detailed_accessibility_tree as accessibility_tree_module
+from test.unit.tree_fixtures import copy_tree
+from test.unit.tree_fixtures import flatten_tree
+from test.unit.tree_fixtures import reference_prune_tree
+from test.unit.tree_fixtures import synthetic_tree
+
+prune_tree = getattr(accessibility_tree_module, '__prune_tree')
+
+def best_time(function: Any, tree: dict[str, Any], only_input_fields: bool, repeat: int) -> tuple[float, Any]:
+    timings: list[float] = []
+    result = None
+    for _ in range(repeat):
+        tree_copy = copy_tree(tree)
+        start = time.perf_counter()
+        result = function(tree_copy, only_input_fields)
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main(sizes: list[int], shapes: list[str], repeat: int, reference_limit: int, deep_chain_length: int):
+    print(f"{'nodes':>8} {'shape':<6} {'inputs':<6} {'iterative (ms)':>15} {'reference (ms)':>15} {'speedup':>8} {'identical':>10}")
+    mismatches = 0
+    for size in sizes:
+        for shape in shapes:
+            tree = synthetic_tree(size, shape, seed=size, deep_chain_length=deep_chain_length)
+            for only_input_fields in (False, True):
+                iterative_seconds, iterative_result = best_time(prune_tree, tree, only_input_fields, repeat)
+                reference_column, speedup_column, identical_column = "skipped", "", ""
+                if size <= reference_limit:
+                    try:
+                        reference_seconds, reference_result = best_time(reference_prune_tree, tree, only_input_fields, 1)
+                        identical = flatten_tree(iterative_result) == flatten_tree(reference_result)
+                        mismatches += not identical
+                        reference_column = f"{reference_seconds * 1000:.1f}"
+                        speedup_column = f"{reference_seconds / max(iterative_seconds, 1e-9):.1f}x"
+                        identical_column = str(identical)
+                    except RecursionError:
+                        # The reference implementation recurses once per level of the tree
+                        reference_column = "recursion"
+                print(f"{size:>8} {shape:<6} {str(only_input_fields):<6} {iterative_seconds * 1000:>15.1f} {reference_column:>15} {speedup_column:>8} {identical_column:>10}")
+    if mismatches:
+        print(f"{mismatches} outputs differ from the reference implementation")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks __prune_tree on synthetic trees and checks it against the recursive reference implementation.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 50_000, 200_000], help="Numbers of nodes of the synthetic trees.")
+    parser.add_argument("--shapes", type=str, nargs="+", default=["mixed", "wide", "deep"], choices=["mixed", "wide", "deep"], help="Shapes of the synthetic trees.")
+    parser.add_argument("--repeat", type=int, default=3, help="Number of runs of the iterative implementation per tree.")
+    parser.add_argument("--reference-limit", type=int, default=50_000, help="Largest tree to run the quadratic reference implementation on.")
+    parser.add_argument("--deep-chain-length", type=int, default=2000,
+                        help="Depth of the chains of the deep trees. Above the recursion limit, the reference implementation fails.")
+    args = parser.parse_args()
+    main(args.sizes, args.shapes, args.repeat, args.reference_limit, args.deep_chain_length)
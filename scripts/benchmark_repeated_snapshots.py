@@ -0,0 +1,62 @@
+import argparse
+import asyncio
+import time
+from typing import Any
+
+from ae.utils.get_detailed_accessibility_tree import do_get_accessibility_info
+from playwright.async_api import async_playwright
+
+# Counts the attribute writes the labelling and the cleanup make, from a MutationObserver kept on the window
+COUNT_LABEL_WRITES_JS = """() => {
+    window.__agenteBenchmarkWrites = 0;
+    if (!window.__agenteBenchmarkObserver) {
+        window.__agenteBenchmarkObserver = new MutationObserver(mutations => {
+            window.__agenteBenchmarkWrites += mutations.length;
+        });
+        window.__agenteBenchmarkObserver.observe(document, {
+            attributes: true, subtree: true, attributeFilter: ['mmid', 'aria-keyshortcuts', 'orig-aria-keyshortcuts'],
+        });
+    }
+}"""
+
+READ_LABEL_WRITES_JS = """() => new Promise(resolve => setTimeout(() => resolve(window.__agenteBenchmarkWrites), 0))"""
+
+
+async def measure(page: Any, snapshots: int) -> list[dict[str, Any]]:
+    results: list[dict[str, Any]] = []
+    for _ in range(snapshots):
+        await page.evaluate(COUNT_LABEL_WRITES_JS)
+        start = time.perf_counter()
+        await do_get_accessibility_info(page, only_input_fields=False, save_log_files=False)
+        seconds = time.perf_counter() - start
+        results.append({"seconds": seconds, "attribute_writes": await page.evaluate(READ_LABEL_WRITES_JS)})
+    return results
+
+
+async def main(url: str, cdp_url: str | None, snapshots: int):
+    async with async_playwright() as playwright:
+        if cdp_url:
+            browser = await playwright.chromium.connect_over_cdp(cdp_url)
+            context = browser.contexts[0]
+        else:
+            browser = await playwright.chromium.launch(headless=True)
+            context = await browser.new_context()
+        page = await context.new_page()
+        await page.goto(url, wait_until="load")
+        elements = await page.evaluate("document.querySelectorAll('*').length")
+        results = await measure(page, snapshots)
+        await browser.close()
+
+    print(f"URL: {url} ({elements} elements)")
+    print(f"{'snapshot':>8} {'attribute writes':>17} {'seconds':>9}")
+    for number, result in enumerate(results, start=1):
+        print(f"{number:>8} {result['attribute_writes']:>17} {result['seconds']:>9.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Takes repeated accessibility snapshots of an unchanged page and counts the attribute writes of each.")
+    parser.add_argument("url", type=str, help="The page to benchmark against.")
+    parser.add_argument("--cdp-url", type=str, default=None, help="Connect to a remote browser over CDP (e.g. a Browserbase session) instead of launching a local one.")
+    parser.add_argument("--snapshots", type=int, default=5, help="Number of snapshots to take.")
+    args = parser.parse_args()
+    asyncio.run(main(args.url, args.cdp_url, args.snapshots))
@@ -0,0 +1,67 @@
+import ae.utils.get_detailed_accessibility_tree as accessibility_tree_module
+import pytest
+from ae.utils.accessibility_node import AccessibilityNode
+
+from test.unit.tree_fixtures import copy_tree
+from test.unit.tree_fixtures import flatten_tree
+from test.unit.tree_fixtures import synthetic_tree
+
+
+def test_node_behaves_like_a_dict():
+    node = AccessibilityNode()
+    node['name'] = "Search"
+    node['role'] = "button"
+    node['placeholder'] = "Search the site"
+    assert node['role'] == "button"
+    assert node.get('mmid') is None
+    assert 'placeholder' in node and 'mmid' not in node
+    assert len(node) == 3
+    # Slot fields come first, in their canonical order
+    assert list(node.items()) == [('role', 'button'), ('name', 'Search'), ('placeholder', 'Search the site')]
+
+    assert node.pop('placeholder') == "Search the site"
+    assert not hasattr(node, 'extra')
+    del node['name']
+    with pytest.raises(KeyError):
+        node['name']
+    with pytest.raises(KeyError):
+        del node['name']
+    node.update({'mmid': "7", 'checked': True})
+    assert dict(node.items()) == {'role': 'button', 'mmid': '7', 'checked': True}
+
+
+def test_roles_and_tags_are_interned():
+    first, second = AccessibilityNode(), AccessibilityNode()
+    first['role'] = ''.join(['list', 'item'])
+    second['role'] = ''.join(['listi', 'tem'])
+    assert first['role'] is second['role']
+
+
+def test_from_tree_and_to_dict_round_trip():
+    tree = synthetic_tree(3000, "mixed", seed=7, deep_chain_length=50)
+    nodes = AccessibilityNode.from_tree(copy_tree(tree))
+    assert nodes.to_dict() == tree
+    assert nodes.to_dict(release_nodes=True) == tree
+    assert not hasattr(nodes, 'children')
+
+
+@pytest.mark.parametrize("only_input_fields", [False, True])
+def test_nodes_are_pruned_like_dicts(only_input_fields: bool):
+    prune_tree = getattr(accessibility_tree_module, '__prune_tree')
+    tree = synthetic_tree(3000, "mixed", seed=11, deep_chain_length=50)
+    pruned_dicts = prune_tree(copy_tree(tree), only_input_fields)
+    pruned_nodes = prune_tree(AccessibilityNode.from_tree(copy_tree(tree)), only_input_fields)
+    assert flatten_tree(None if pruned_nodes is None else pruned_nodes.to_dict()) == flatten_tree(pruned_dicts)
+
+
+def test_to_dict_writes_fields_in_canonical_order():
+    tree = {"children": [{"checked": False, "mmid": "3", "role": "checkbox", "tag": "input"}], "name": "Form", "role": "form"}
+    converted = AccessibilityNode.from_tree(tree).to_dict()
+    assert list(converted) == ["role", "name", "children"]
+    assert list(converted['children'][0]) == ["role", "mmid", "tag", "checked"]
+
+
+def test_deep_trees_do_not_recurse():
+    tree = synthetic_tree(20000, "deep", seed=0, deep_chain_length=20000)
+    # Comparing the trees with == would recurse, they are compared flattened
+    assert flatten_tree(AccessibilityNode.from_tree(copy_tree(tree)).to_dict()) == flatten_tree(tree)
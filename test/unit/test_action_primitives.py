@@ -0,0 +1,89 @@
+import asyncio
+from typing import Any
+
+import pytest
+from ae.utils.action_primitives import click_in_one_round_trip
+from ae.utils.action_primitives import CLICK_STARTED_BINDING
+from ae.utils.action_primitives import fill_fields_in_one_round_trip
+from playwright.async_api import Error
+
+CONTEXT_DESTROYED = "Execution context was destroyed, most likely because of a navigation"
+
+
+class FakePage:
+    """
+    Answers the action scripts with a given outcome. With click_started, the click script calls the exposed binding before
+    answering, the way Playwright dispatches it: in a task of its own.
+    """
+
+    def __init__(self, outcome: Any = None, error: str | None = None, click_started: bool = True):
+        self.outcome = outcome
+        self.error = error
+        self.click_started = click_started
+        self.bindings: dict[str, Any] = {}
+        self.params: dict | None = None
+
+    async def expose_binding(self, name: str, callback: Any):
+        self.bindings[name] = callback
+
+    async def evaluate(self, expression: str, params: dict) -> Any:
+        self.params = params
+        if self.click_started and 'token' in params:
+            asyncio.get_running_loop().create_task(self.__call_binding(params['binding'], params['token']))
+        if self.error:
+            raise Error(self.error)
+        return self.outcome
+
+    async def __call_binding(self, name: str, token: str):
+        self.bindings[name](None, token)
+
+
+def test_clicks_are_described_and_the_binding_exposed_once():
+    page = FakePage({"performed": True, "tag": "button", "opening_tag": "<button mmid='4'>", "opened_menu": False})
+
+    async def clicks() -> list:
+        return [await click_in_one_round_trip(page, "[mmid='4']") for _ in range(2)] # type: ignore
+    first, second = asyncio.run(clicks())
+    assert first == second == page.outcome
+    assert list(page.bindings) == [CLICK_STARTED_BINDING]
+    assert page.params and page.params['selector'] == "[mmid='4']" and page.params['binding'] == CLICK_STARTED_BINDING
+
+
+def test_covered_elements_are_reported_with_what_covers_them():
+    covered = {"performed": False, "reason": "covered", "tag": "button", "opening_tag": "<button mmid='4'>",
+               "covered_by": "<div mmid='90' aria-label='Cookie consent'>"}
+    page = FakePage(covered, click_started=False)
+    assert asyncio.run(click_in_one_round_trip(page, "[mmid='4']")) == covered # type: ignore
+
+
+def test_documents_destroyed_by_the_click_are_taken_as_navigations():
+    page = FakePage(error=CONTEXT_DESTROYED)
+    outcome = asyncio.run(click_in_one_round_trip(page, "[mmid='4']")) # type: ignore
+    assert outcome == {"performed": True, "tag": None, "opening_tag": None, "navigated": True}
+
+
+def test_documents_destroyed_before_the_click_are_not_taken_as_clicks():
+    page = FakePage(error=CONTEXT_DESTROYED, click_started=False)
+    outcome = asyncio.run(click_in_one_round_trip(page, "[mmid='4']")) # type: ignore
+    assert outcome['performed'] is False and outcome['context_destroyed'] is True
+
+
+def test_other_script_errors_are_not_context_destroyed():
+    page = FakePage(error="SyntaxError: '[mmid=' is not a valid selector")
+    outcome = asyncio.run(click_in_one_round_trip(page, "[mmid=")) # type: ignore
+    assert outcome['performed'] is False and outcome['context_destroyed'] is False
+
+
+@pytest.mark.parametrize("error", [None, CONTEXT_DESTROYED])
+def test_fill_outcomes_are_one_per_entry(error: str | None):
+    entries = [{"query_selector": "[mmid='1']", "text": "Ada"}, {"query_selector": "[mmid='2']", "text": "Paris"}]
+    outcomes = [{"selector": "[mmid='1']", "performed": True, "tag": "input", "opening_tag": "<input mmid='1'>"},
+                {"selector": "[mmid='2']", "performed": False, "reason": "needs typing", "typeable": True}]
+    page = FakePage(outcomes, error=error)
+    filled = asyncio.run(fill_fields_in_one_round_trip(page, entries, highlight=False)) # type: ignore
+    assert page.params and page.params['entries'] == [{"selector": "[mmid='1']", "text": "Ada"}, {"selector": "[mmid='2']", "text": "Paris"}]
+    if error is None:
+        assert filled == outcomes
+    else:
+        # Every entry is left to be typed when the script failed
+        assert [(outcome['selector'], outcome['performed'], outcome['typeable']) for outcome in filled] == [("[mmid='1']", False, True), ("[mmid='2']", False, True)]
@@ -0,0 +1,95 @@
+from ae.utils.boilerplate_memo import BoilerplateMemo
+from ae.utils.boilerplate_memo import clear_boilerplate_memos
+from ae.utils.boilerplate_memo import get_boilerplate_memo
+from ae.utils.boilerplate_memo import suppress_repeated_text_blocks
+from ae.utils.boilerplate_memo import suppress_repeated_tree_blocks
+
+# Both blocks are longer than BOILERPLATE_MIN_BLOCK_CHARS once normalized
+NAVIGATION = "Home | Products | Pricing | Documentation | Blog | Careers | Press | Partners | Investors | Support | Contact us | Sign in | Create an account\n"
+FOOTER = "Copyright Example Inc. All rights reserved. Privacy policy, terms of service, cookie settings and accessibility.\n"
+
+
+def page_text(body: str) -> tuple[str, list[dict]]:
+    text = NAVIGATION + body + FOOTER
+    blocks = [{"start": 0, "end": len(NAVIGATION), "kind": "navigation"},
+              {"start": len(NAVIGATION) + len(body), "end": len(text), "kind": "footer"}]
+    return text, blocks
+
+
+def page_tree(title: str) -> dict:
+    return {"role": "WebArea", "name": title, "children": [
+        {"mmid": "1", "tag": "nav", "role": "navigation", "children": [
+            {"mmid": str(2 + i), "tag": "a", "role": "link", "name": name} for i, name in enumerate(NAVIGATION.split(" | "))
+        ]},
+        {"role": "heading", "name": title},
+    ]}
+
+
+class FakeContext:
+    pass
+
+
+class FakePage:
+    def __init__(self, context: FakeContext):
+        self.context = context
+
+
+def test_text_blocks_are_replaced_on_other_pages_of_the_same_site():
+    memo = BoilerplateMemo()
+    first_text, first_blocks = page_text("First article\n")
+    assert suppress_repeated_text_blocks(memo, "https://example.com/a", first_text, first_blocks) == (first_text, 0)
+    # The same page returned again keeps its blocks
+    assert suppress_repeated_text_blocks(memo, "https://example.com/a", first_text, first_blocks) == (first_text, 0)
+
+    second_text, second_blocks = page_text("Second article\n")
+    text, suppressed = suppress_repeated_text_blocks(memo, "https://example.com/b", second_text, second_blocks)
+    assert suppressed == 2
+    assert text == ("[Repeated navigation block, as on https://example.com/a, read it with suppress_boilerplate false]\n" + "Second article\n"
+                    + "[Repeated footer block, as on https://example.com/a, read it with suppress_boilerplate false]\n")
+
+    other_site_text, other_site_blocks = page_text("Elsewhere\n")
+    assert suppress_repeated_text_blocks(memo, "https://other.org/", other_site_text, other_site_blocks) == (other_site_text, 0)
+
+
+def test_only_delivered_text_blocks_are_recorded():
+    memo = BoilerplateMemo()
+    first_text, first_blocks = page_text("A long article " * 50 + "\n")
+    # Only the navigation fits in the first page of the output, the footer is never delivered
+    suppress_repeated_text_blocks(memo, "https://example.com/a", first_text, first_blocks, delivered_chars=len(NAVIGATION) + 10)
+
+    second_text, second_blocks = page_text("Second article\n")
+    text, suppressed = suppress_repeated_text_blocks(memo, "https://example.com/b", second_text, second_blocks)
+    assert suppressed == 1
+    assert text.endswith(FOOTER)
+
+
+def test_tree_blocks_keep_their_landmark():
+    memo = BoilerplateMemo()
+    first_tree = page_tree("First article")
+    assert suppress_repeated_tree_blocks(memo, "https://example.com/a", first_tree) == (first_tree, 0)
+
+    second_tree = page_tree("Second article")
+    tree, suppressed = suppress_repeated_tree_blocks(memo, "https://example.com/b", second_tree)
+    assert suppressed == 1
+    assert tree['children'] == [
+        {"mmid": "1", "tag": "nav", "role": "navigation",
+         "repeated_block": "Repeated navigation block, as on https://example.com/a, read it with scope 1"},
+        {"role": "heading", "name": "Second article"},
+    ]
+    assert second_tree == page_tree("Second article")
+
+
+def test_memos_are_per_browser_context_and_cleared():
+    first_context, second_context = FakeContext(), FakeContext()
+    memo = get_boilerplate_memo(FakePage(first_context))
+    assert get_boilerplate_memo(FakePage(first_context)) is memo
+    assert get_boilerplate_memo(FakePage(second_context)) is not memo
+
+    text, blocks = page_text("First article\n")
+    suppress_repeated_text_blocks(memo, "https://example.com/a", text, blocks)
+    text, blocks = page_text("Second article\n")
+    assert suppress_repeated_text_blocks(get_boilerplate_memo(FakePage(second_context)), "https://example.com/b", text, blocks)[1] == 0
+
+    clear_boilerplate_memos()
+    assert memo.domain_blocks == {}
+    assert suppress_repeated_text_blocks(memo, "https://example.com/b", text, blocks) == (text, 0)
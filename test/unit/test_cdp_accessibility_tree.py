@@ -0,0 +1,103 @@
+import ae.utils.cdp_accessibility_tree as cdp_accessibility_tree_module
+
+index_dom_nodes = getattr(cdp_accessibility_tree_module, '__index_dom_nodes')
+build_snapshot = getattr(cdp_accessibility_tree_module, '__build_snapshot')
+describe_dom_element = getattr(cdp_accessibility_tree_module, '__describe_dom_element')
+
+DESCRIBE_PARAMS = {"ids_to_ignore": [], "tags_to_ignore": ["head", "style", "script"], "list_preview_limit": 2,
+                   "attributes": ["name", "aria-label", "placeholder", "mmid", "id", "for", "data-testid"],
+                   "backup_attributes": ["class", "id"]}
+
+
+def element(backend_node_id: int, tag: str, attributes: list[str] | None = None, children: list[dict] | None = None, **extra) -> dict:
+    return {"backendNodeId": backend_node_id, "nodeType": 1, "localName": tag, "attributes": attributes or [], "children": children or [], **extra}
+
+
+def text(backend_node_id: int, value: str) -> dict:
+    return {"backendNodeId": backend_node_id, "nodeType": 3, "nodeValue": value}
+
+
+def sample_document() -> dict:
+    """
+    A page with a button in the main document, another one in an iframe and a text field in the shadow root of a custom element.
+    """
+    return {"backendNodeId": 1, "nodeType": 9, "children": [
+        element(2, "html", children=[
+            element(3, "body", children=[
+                element(4, "button", ["id", "buy", "class", "primary"], [text(5, "Buy  now")]),
+                element(6, "iframe", contentDocument={"backendNodeId": 7, "nodeType": 9, "children": [
+                    element(8, "button", children=[text(9, "Inner")]),
+                ]}),
+                element(10, "email-field", shadowRoots=[{"backendNodeId": 11, "nodeType": 11, "children": [
+                    element(12, "input", ["type", "email", "placeholder", "Email"]),
+                ]}]),
+                element(13, "select", ["name", "size"], [
+                    element(14, "option", ["value", "s"], [text(15, "Small")]),
+                    element(16, "optgroup", children=[
+                        element(17, "option", [], [text(18, "Medium")]),
+                        element(19, "option", ["value", "l", "selected", ""], [text(20, "Large")]),
+                    ]),
+                ]),
+            ]),
+        ]),
+    ]}
+
+
+def ax_node(node_id: str, role: str, name: str, backend_node_id: int, child_ids: list[str] | None = None, focusable: bool = False) -> dict:
+    properties = [{"name": "focusable", "value": {"value": True}}] if focusable else []
+    return {"nodeId": node_id, "role": {"value": role}, "name": {"value": name}, "backendDOMNodeId": backend_node_id,
+            "childIds": child_ids or [], "properties": properties}
+
+
+def sample_ax_payloads() -> list[dict]:
+    return [
+        ax_node("1", "RootWebArea", "Shop", 1, ["2", "4", "6", "7"]),
+        ax_node("2", "button", "Buy now", 4, ["3"], focusable=True),
+        ax_node("3", "StaticText", "Buy now", 5),
+        ax_node("4", "generic", "", 6, ["5"]),
+        ax_node("5", "button", "Inner", 8, focusable=True),
+        ax_node("6", "textbox", "Email", 12, focusable=True),
+        ax_node("7", "heading", "Sizes", 13),
+    ]
+
+
+def test_dom_nodes_are_indexed_with_their_attributes_as_dicts():
+    dom_nodes, main_document_nodes = index_dom_nodes(sample_document())
+    assert dom_nodes[4]['attributes'] == {"id": "buy", "class": "primary"}
+    assert dom_nodes[19]['attributes'] == {"value": "l", "selected": ""}
+    # Nodes inside the iframe and the shadow root are indexed, but are not part of the main document
+    assert {8, 12} <= dom_nodes.keys()
+    assert {1, 4, 6, 10, 13, 19} <= main_document_nodes
+    assert not {7, 8, 9, 11, 12} & main_document_nodes
+
+
+def test_snapshot_has_the_playwright_shape_and_only_main_document_mmids():
+    dom_nodes, main_document_nodes = index_dom_nodes(sample_document())
+    snapshot = build_snapshot(sample_ax_payloads(), dom_nodes, main_document_nodes)
+    assert snapshot == {"role": "WebArea", "name": "Shop", "children": [
+        {"role": "button", "name": "Buy now", "keyshortcuts": "4"},
+        {"role": "button", "name": "Inner"},
+        {"role": "textbox", "name": "Email"},
+        {"role": "heading", "name": "Sizes", "keyshortcuts": "13"},
+    ]}
+
+
+def test_empty_tree_has_no_snapshot():
+    assert build_snapshot([], {}, set()) is None
+
+
+def test_elements_are_described_from_the_dom():
+    dom_nodes, _ = index_dom_nodes(sample_document())
+    assert describe_dom_element(dom_nodes[4], True, DESCRIBE_PARAMS, set()) == {"tag": "button", "mmid": "4", "id": "buy", "description": "Buy now"}
+    assert describe_dom_element(dom_nodes[4], True, {**DESCRIBE_PARAMS, "ids_to_ignore": ["buy"]}, set()) is None
+    assert describe_dom_element(dom_nodes[12], False, DESCRIBE_PARAMS, set()) == {"tag": "input", "tag_type": "email", "placeholder": "Email", "mmid": "12"}
+
+
+def test_long_selects_keep_their_selected_options():
+    dom_nodes, _ = index_dom_nodes(sample_document())
+    description = describe_dom_element(dom_nodes[13], False, DESCRIBE_PARAMS, selected_options={14})
+    assert description == {"tag": "select", "mmid": "13", "role": "combobox", "options_total": 3, "options": [
+        {"mmid": "14", "text": "Small", "value": "s", "selected": True},
+        {"mmid": "17", "text": "Medium", "value": "Medium", "selected": False},
+        {"mmid": "19", "text": "Large", "value": "l", "selected": True},
+    ]}
@@ -0,0 +1,63 @@
+import asyncio
+from typing import Any
+
+import ae.core.skills.click_using_selector as click_using_selector_module
+import pytest
+from ae.core.skills.click_using_selector import do_click
+
+
+class FakePage:
+    url = "https://shop.example.com/cart"
+
+
+@pytest.fixture
+def clicks(monkeypatch) -> dict[str, Any]:
+    """
+    Answers the one round trip click with the outcome set in the returned dict, and records the Playwright fallbacks.
+    """
+    state: dict[str, Any] = {"outcome": None, "fallbacks": []}
+
+    async def click_in_one_round_trip(page: FakePage, selector: str) -> dict:
+        return state["outcome"]
+
+    async def do_playwright_click(page: FakePage, selector: str) -> tuple:
+        state["fallbacks"].append(selector)
+        return 4, "button", "<button mmid='4'>", None, f"Executed JavaScript Click on element with selector: {selector}"
+
+    async def wait_for_page_to_settle(page: FakePage) -> tuple[float, bool]:
+        return 0.1, True
+    monkeypatch.setattr(click_using_selector_module, "click_in_one_round_trip", click_in_one_round_trip)
+    monkeypatch.setattr(click_using_selector_module, "do_playwright_click", do_playwright_click)
+    monkeypatch.setattr(click_using_selector_module, "wait_for_page_to_settle", wait_for_page_to_settle)
+    monkeypatch.setattr(click_using_selector_module, "watch_page_activity", lambda page: None)
+    return state
+
+
+def test_clicks_performed_in_one_round_trip_are_described(clicks: dict[str, Any]):
+    clicks["outcome"] = {"performed": True, "tag": "button", "opening_tag": "<button mmid='4'>", "opened_menu": False}
+    result = asyncio.run(do_click(FakePage(), "[mmid='4']", 0)) # type: ignore
+    assert result["summary_message"] == "Executed JavaScript Click on element with selector: [mmid='4']"
+    assert "<button mmid='4'>" in result["detailed_message"]
+    assert clicks["fallbacks"] == []
+
+
+def test_elements_not_visible_fall_back_to_playwright(clicks: dict[str, Any]):
+    clicks["outcome"] = {"performed": False, "reason": "not visible"}
+    result = asyncio.run(do_click(FakePage(), "[mmid='4']", 0)) # type: ignore
+    assert clicks["fallbacks"] == ["[mmid='4']"]
+    assert result["summary_message"] == "Executed JavaScript Click on element with selector: [mmid='4']"
+
+
+def test_covered_elements_are_not_clicked(clicks: dict[str, Any]):
+    clicks["outcome"] = {"performed": False, "reason": "covered", "tag": "button", "opening_tag": "<button mmid='4'>",
+                         "covered_by": "<div mmid='90' aria-label='Cookie consent'>"}
+    result = asyncio.run(do_click(FakePage(), "[mmid='4']", 0)) # type: ignore
+    assert clicks["fallbacks"] == []
+    assert result["summary_message"] == "Element with selector: \"[mmid='4']\" was not clicked, since it is covered by <div mmid='90' aria-label='Cookie consent'>"
+
+
+def test_documents_gone_before_the_click_are_not_clicked_again(clicks: dict[str, Any]):
+    clicks["outcome"] = {"performed": False, "reason": "Execution context was destroyed", "context_destroyed": True}
+    result = asyncio.run(do_click(FakePage(), "[mmid='4']", 0)) # type: ignore
+    assert clicks["fallbacks"] == []
+    assert "the page changed before the click" in result["summary_message"]
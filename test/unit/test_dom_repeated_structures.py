@@ -0,0 +1,55 @@
+import copy
+
+from ae.utils.dom_repeated_structures import collapse_repeated_structures
+
+
+def result_item(mmid: int, title: str, price: str) -> dict:
+    return {"mmid": str(mmid), "tag": "li", "role": "listitem", "children": [
+        {"mmid": str(mmid + 1), "tag": "a", "role": "link", "name": title},
+        {"role": "text", "name": price},
+    ]}
+
+
+def sample_tree(count: int) -> dict:
+    return {"role": "WebArea", "name": "Results", "children": [
+        {"mmid": "1", "tag": "h1", "role": "heading", "name": "Results"},
+        {"mmid": "2", "tag": "ul", "role": "list", "children": [
+            result_item(10 + 2 * i, f"Product {i}", f"${i}.99") for i in range(count)
+        ]},
+    ]}
+
+
+def test_runs_of_same_shape_siblings_become_rows():
+    tree = sample_tree(4)
+    original = copy.deepcopy(tree)
+    collapsed = collapse_repeated_structures(tree)
+    assert tree == original
+
+    heading, listing = collapsed['children']
+    assert heading == original['children'][0]
+    rows = listing['children'][0]
+    assert rows['repeated'] == 'li'
+    assert rows['count'] == 4
+    # The tag of a node, or its role when it has no tag, is its label and is not repeated as a field
+    assert rows['common'] == {"role": "listitem", "a.role": "link"}
+    assert rows['columns'] == ["mmid", "a.mmid", "a.name", "text.name"]
+    assert rows['rows'][0] == ["10", "11", "Product 0", "$0.99"]
+    # Every mmid of the collapsed subtrees is kept
+    assert [row[0] for row in rows['rows']] == ["10", "12", "14", "16"]
+    assert [row[1] for row in rows['rows']] == ["11", "13", "15", "17"]
+
+
+def test_short_runs_are_left_as_they_are():
+    tree = sample_tree(2)
+    assert collapse_repeated_structures(tree) == tree
+    assert collapse_repeated_structures(sample_tree(3), min_rows=4) == sample_tree(3)
+
+
+def test_siblings_with_different_shapes_are_not_collapsed_together():
+    tree = sample_tree(3)
+    odd_item = result_item(40, "Sponsored", "$1.00")
+    odd_item['children'].append({"mmid": "99", "tag": "img", "role": "img", "name": "Ad"})
+    tree['children'][1]['children'].append(odd_item)
+    listing = collapse_repeated_structures(tree)['children'][1]
+    assert [child.get('count') for child in listing['children']] == [3, None]
+    assert listing['children'][1] == odd_item
@@ -0,0 +1,99 @@
+import asyncio
+
+import ae.utils.dom_scope as dom_scope_module
+import pytest
+from ae.utils.dom_scope import DomScope
+
+# A document of four nodes: the html element, a list, a visible item of the list and a hidden one, far below the viewport
+CAPTURED_SNAPSHOT = {
+    "strings": ["visible", "hidden"],
+    "documents": [{
+        "nodes": {"backendNodeId": [10, 11, 12, 13], "parentIndex": [-1, 0, 1, 1]},
+        "layout": {"nodeIndex": [0, 1, 2, 3],
+                   "bounds": [[0, 0, 800, 3000], [0, 100, 800, 200], [0, 120, 800, 20], [0, 2500, 800, 20]],
+                   "styles": [[0], [0], [0], [1]]},
+    }],
+}
+LAYOUT_METRICS = {"cssLayoutViewport": {"pageX": 0, "pageY": 0, "clientWidth": 800, "clientHeight": 600},
+                  "cssContentSize": {"height": 3000}}
+
+
+class FakePage:
+    def __init__(self, result: dict):
+        self.result = result
+        self.evaluated_with: dict | None = None
+
+    async def evaluate(self, expression: str, arg: dict) -> dict:
+        self.evaluated_with = arg
+        return self.result
+
+
+@pytest.fixture
+def cdp_commands(monkeypatch) -> list[str]:
+    sent: list[str] = []
+
+    async def send_cdp_command(page, method: str, params: dict | None = None) -> dict:
+        sent.append(method)
+        return {"DOMSnapshot.captureSnapshot": CAPTURED_SNAPSHOT, "Page.getLayoutMetrics": LAYOUT_METRICS}[method]
+    monkeypatch.setattr(dom_scope_module, "send_cdp_command", send_cdp_command)
+    return sent
+
+
+@pytest.mark.parametrize("scope, screens, top, container_selector, container_mmid", [
+    ("viewport", 1, None, None, None),
+    ("viewport+2", 3, None, None, None),
+    ("Viewport + 1 screens @ 1200", 2, 1200, None, None),
+    ("114", 1, None, "[mmid='114']", 114),
+    ("[mmid='114']", 1, None, "[mmid='114']", 114),
+    ("mmid: 114", 1, None, "[mmid='114']", 114),
+    ("#results .item", 1, None, "#results .item", None),
+])
+def test_scopes_are_parsed(scope: str, screens: int, top: int | None, container_selector: str | None, container_mmid: int | None):
+    dom_scope = DomScope(scope)
+    assert (dom_scope.screens, dom_scope.top, dom_scope.container_selector, dom_scope.container_mmid) == (screens, top, container_selector, container_mmid)
+    assert dom_scope.is_region == (container_selector is None)
+
+
+def test_empty_scopes_are_rejected():
+    with pytest.raises(ValueError):
+        DomScope("  ")
+
+
+def test_region_scopes_resolve_in_the_page_and_point_to_the_next_region():
+    page = FakePage({"in_scope": ["1", "3"], "top": 0, "bottom": 1200, "page_height": 3000, "viewport_height": 600})
+    dom_scope = DomScope("viewport+1")
+    asyncio.run(dom_scope.resolve(page, "inject")) # type: ignore
+    assert page.evaluated_with == {"container_selector": None, "top": None, "screens": 2}
+    assert dom_scope.in_scope_mmids == {1, 3}
+    assert dom_scope.summary() == {"scope": "viewport+1", "elements_in_scope": 2, "region": {"top": 0, "bottom": 1200, "page_height": 3000},
+                                   "next_cursor": "viewport+1@1200"}
+
+
+def test_the_last_region_has_no_next_cursor():
+    page = FakePage({"in_scope": [], "top": 2400, "bottom": 3000, "page_height": 3000, "viewport_height": 600})
+    dom_scope = DomScope("viewport@2400")
+    asyncio.run(dom_scope.resolve(page, "inject")) # type: ignore
+    assert dom_scope.next_cursor is None
+
+
+def test_missing_containers_are_reported():
+    page = FakePage({"error": "No element matches the container selector #missing"})
+    with pytest.raises(ValueError, match="#missing"):
+        asyncio.run(DomScope("#missing").resolve(page, "inject")) # type: ignore
+
+
+def test_regions_resolve_over_cdp_from_the_layout(cdp_commands: list[str]):
+    dom_scope = DomScope("viewport")
+    asyncio.run(dom_scope.resolve(None, "cdp")) # type: ignore
+    # The hidden item and the one below the viewport are left out
+    assert dom_scope.in_scope_mmids == {10, 11, 12}
+    assert dom_scope.region == {"top": 0, "bottom": 600, "page_height": 3000}
+    assert cdp_commands == ["DOMSnapshot.captureSnapshot", "Page.getLayoutMetrics"]
+
+
+def test_containers_resolve_over_cdp_to_their_rendered_descendants(cdp_commands: list[str]):
+    dom_scope = DomScope("11")
+    asyncio.run(dom_scope.resolve(None, "cdp")) # type: ignore
+    assert dom_scope.in_scope_mmids == {11, 12}
+    assert dom_scope.region is None
+    assert cdp_commands == ["DOMSnapshot.captureSnapshot"]
@@ -0,0 +1,68 @@
+from ae.utils.dom_focus import focus_tree
+from ae.utils.dom_search_index import ElementIndex
+from ae.utils.dom_search_index import PassageIndex
+from ae.utils.dom_search_index import split_passages
+from ae.utils.dom_search_index import tokenize
+from ae.utils.dom_search_index import top_elements
+
+
+def sample_tree() -> dict:
+    return {"role": "WebArea", "name": "Shop", "children": [
+        {"mmid": "1", "tag": "input", "role": "searchbox", "name": "Search products", "placeholder": "What are you looking for?"},
+        {"mmid": "2", "tag": "button", "role": "button", "name": "Search"},
+        {"mmid": "3", "tag": "ul", "role": "list", "children": [
+            {"mmid": "4", "tag": "a", "role": "link", "children": [{"role": "text", "name": "Running shoes for men"}]},
+            {"mmid": "5", "tag": "a", "role": "link", "children": [{"role": "text", "name": "Winter jackets"}]},
+        ]},
+        {"mmid": "6", "tag": "a", "role": "link", "name": "Contact us"},
+    ]}
+
+
+def test_tokenize_folds_case_and_plurals():
+    assert tokenize("Search RESULTS, glass-boxes & 42 items") == ["search", "result", "glass", "boxe", "42", "item"]
+
+
+def test_elements_are_scored_with_the_text_of_their_descendants():
+    index = ElementIndex(sample_tree())
+    assert [element['mmid'] for element in index.elements] == ["1", "2", "3", "4", "5", "6"]
+    assert index.parents == [None, None, None, 2, 2, None]
+    scores = index.scores("running shoe")
+    assert set(scores) == {3}
+    assert [index.elements[element]['mmid'] for element in top_elements(index.scores("search button"), 2)] == ["2", "1"]
+    assert index.scores("checkout") == {}
+
+
+def test_rarer_terms_weigh_more():
+    index = ElementIndex(sample_tree())
+    scores = index.scores("search contact")
+    # 'contact' is in one element, 'search' in two
+    assert scores[5] > scores[0]
+
+
+def test_passages_cover_the_text():
+    text = "\n".join(f"Paragraph {i} " + "word " * (i % 30) for i in range(200))
+    passages = split_passages(text, 120)
+    assert all(end - start <= 120 for start, end in passages)
+    assert ''.join(text[start:end] for start, end in passages) == text
+
+    index = PassageIndex(text, 120)
+    best = top_elements(index.scores("paragraph 57"), 1)[0]
+    start, end = index.passages[best]
+    assert "Paragraph 57 " in text[start:end]
+
+
+def test_focus_keeps_the_best_elements_and_their_ancestors():
+    tree = sample_tree()
+    focused, matched = focus_tree(tree, "running shoes", top_k=1)
+    assert matched == 1
+    assert focused == {"role": "WebArea", "name": "Shop", "children": [
+        {"mmid": "3", "tag": "ul", "role": "list", "children": [
+            {"mmid": "4", "tag": "a", "role": "link", "children": [{"role": "text", "name": "Running shoes for men"}]},
+        ]},
+    ]}
+    assert tree == sample_tree()
+
+
+def test_focus_without_match_returns_the_whole_tree():
+    tree = sample_tree()
+    assert focus_tree(tree, "checkout") == (tree, 0)
@@ -0,0 +1,94 @@
+import json
+
+from ae.utils.dom_serializer import serialize_dom_output_compact
+from ae.utils.dom_serializer import serialize_tree_compact
+
+
+def sample_tree() -> dict:
+    return {
+        "role": "WebArea",
+        "name": "Search page",
+        "children": [
+            {"mmid": "114", "tag": "button", "role": "button", "name": "Search", "placeholder": "Search the site"},
+            {"mmid": "115", "tag": "select", "role": "combobox", "name": "Sort", "options": [
+                {"mmid": "116", "text": "Price", "value": "price", "selected": True},
+                {"mmid": "117", "text": "Rating", "value": "rating", "selected": False},
+            ]},
+            {"role": "text", "name": "3 results"},
+            {"mmid": "118", "tag": "input", "tag_type": "checkbox", "role": "checkbox", "name": "In stock", "checked": True},
+        ],
+    }
+
+
+def test_tree_is_written_one_element_per_line():
+    assert serialize_tree_compact(sample_tree()).split('\n') == [
+        'WebArea "Search page"',
+        '  [114] button "Search" role=button placeholder="Search the site"',
+        '  [115] select "Sort" role=combobox',
+        '    [116] option "Price" value=price selected',
+        '    [117] option "Rating" value=rating',
+        '  "3 results"',
+        '  [118] input:checkbox "In stock" role=checkbox checked',
+    ]
+
+
+def test_compact_output_holds_every_value_of_the_dict_output():
+    tree = sample_tree()
+    compact = serialize_tree_compact(tree)
+    stack = [tree]
+    while stack:
+        node = stack.pop()
+        for key, value in node.items():
+            if key in ('children', 'options'):
+                stack.extend(value)
+            elif key in ('mmid', 'value'):
+                assert value in compact
+            elif key in ('name', 'text', 'placeholder'):
+                assert json.dumps(value) in compact
+    assert len(compact) < len(json.dumps(tree))
+
+
+def test_deep_trees_do_not_recurse():
+    tree: dict = {"role": "WebArea", "name": "Deep"}
+    node = tree
+    for mmid in range(5000):
+        child = {"mmid": str(mmid), "tag": "div", "role": "generic"}
+        node["children"] = [child]
+        node = child
+    lines = serialize_tree_compact(tree).split('\n')
+    assert len(lines) == 5001
+    assert lines[-1] == '  ' * 5000 + '[4999] div role=generic'
+
+
+def test_collapsed_rows_are_written_as_a_table():
+    tree = {"role": "WebArea", "children": [
+        {"repeated": "li", "count": 2, "common": {"role": "listitem"}, "columns": ["mmid", "a.name"],
+         "rows": [["1", "First"], ["2", None]]},
+    ]}
+    assert serialize_tree_compact(tree).split('\n') == [
+        'WebArea',
+        '  2 x li role=listitem',
+        '    columns: mmid | a.name',
+        '    - 1 | First',
+        '    - 2 | ',
+    ]
+
+
+def test_delta_output_lists_the_changes():
+    delta = {
+        "snapshot_version": 2,
+        "added": [{"parent_mmid": "10", "mmid": "20", "tag": "button", "role": "button", "name": "Apply"}],
+        "removed": ["11", {"parent_mmid": None, "role": "text", "name": "Loading"}],
+        "changed": [{"mmid": "12", "tag": "input", "role": "textbox", "name": "Query", "value": "shoes"}],
+    }
+    assert serialize_dom_output_compact(delta).split('\n') == [
+        'snapshot_version: 2',
+        'added:',
+        '  under [10]:',
+        '    [20] button "Apply" role=button',
+        'removed:',
+        '  [11]',
+        '  under root: "Loading"',
+        'changed:',
+        '  [12] input "Query" role=textbox value=shoes',
+    ]
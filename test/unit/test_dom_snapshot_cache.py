@@ -0,0 +1,119 @@
+import asyncio
+
+import ae.utils.dom_snapshot_cache as dom_snapshot_cache_module
+import ae.utils.get_detailed_accessibility_tree as accessibility_tree_module
+import pytest
+from ae.utils.dom_scope import DomScope
+from ae.utils.dom_snapshot_cache import get_accessibility_info_cached
+
+
+class FakePage:
+    url = "https://shop.example.com/cart"
+
+
+class FakeBrowser:
+    """
+    Stands for the page state the cache fingerprints, and counts the extractions it serves.
+    """
+
+    def __init__(self):
+        self.epoch = 0
+        self.extractions: list[tuple[bool, bool]] = []
+        self.release = asyncio.Event()
+        self.release.set()
+
+    async def get_dom_fingerprint(self, page: FakePage) -> dict:
+        return {"document_id": "document-1", "url": page.url, "epoch": self.epoch, "viewport": [0, 0, 800, 600]}
+
+    async def do_get_accessibility_info(self, page: FakePage, only_input_fields: bool, dom_scope: DomScope | None = None,
+                                        input_fields_fast_path: bool = True) -> dict:
+        self.extractions.append((only_input_fields, input_fields_fast_path))
+        await self.release.wait()
+        button = {"mmid": "2", "tag": "button", "role": "button", "name": f"Checkout {self.epoch}"}
+        if only_input_fields:
+            return {"role": "WebArea", "name": "Cart", "children": [{**button, "extracted_as": "input fields"}]}
+        return {"role": "WebArea", "name": "Cart", "children": [{"role": "text", "name": "Total: $10"}, button]}
+
+
+@pytest.fixture
+def browser(monkeypatch) -> FakeBrowser:
+    fake_browser = FakeBrowser()
+    monkeypatch.setattr(dom_snapshot_cache_module, "DOM_SNAPSHOT_CACHE_ENABLED", True)
+    monkeypatch.setattr(dom_snapshot_cache_module, "get_dom_fingerprint", fake_browser.get_dom_fingerprint)
+    monkeypatch.setattr(dom_snapshot_cache_module, "do_get_accessibility_info", fake_browser.do_get_accessibility_info)
+    monkeypatch.setattr(accessibility_tree_module, "ACCESSIBILITY_TREE_BACKEND", "inject")
+    return fake_browser
+
+
+def test_unchanged_pages_are_extracted_once(browser: FakeBrowser):
+    page = FakePage()
+
+    async def snapshots() -> list:
+        return [await get_accessibility_info_cached(page, only_input_fields=False) for _ in range(3)] # type: ignore
+    first, second, third = asyncio.run(snapshots())
+    assert first is second is third
+    assert browser.extractions == [(False, True)]
+
+
+def test_mutations_invalidate_the_cache(browser: FakeBrowser):
+    page = FakePage()
+
+    async def snapshots() -> tuple:
+        before, _ = await get_accessibility_info_cached(page, only_input_fields=False) # type: ignore
+        browser.epoch += 1
+        after, _ = await get_accessibility_info_cached(page, only_input_fields=False) # type: ignore
+        return before, after
+    before, after = asyncio.run(snapshots())
+    assert before['children'][1]['name'] == "Checkout 0"
+    assert after['children'][1]['name'] == "Checkout 1"
+    assert len(browser.extractions) == 2
+
+
+def test_pipeline_input_fields_are_derived_from_cached_all_fields(browser: FakeBrowser):
+    page = FakePage()
+
+    async def snapshots() -> dict:
+        await get_accessibility_info_cached(page, only_input_fields=False) # type: ignore
+        input_fields, _ = await get_accessibility_info_cached(page, only_input_fields=True, input_fields_fast_path=False) # type: ignore
+        return input_fields
+    input_fields = asyncio.run(snapshots())
+    assert browser.extractions == [(False, True)]
+    assert input_fields['children'] == [{"mmid": "2", "tag": "button", "role": "button", "name": "Checkout 0"}]
+
+
+def test_fast_path_input_fields_are_extracted_apart(browser: FakeBrowser):
+    page = FakePage()
+
+    async def snapshots() -> dict:
+        await get_accessibility_info_cached(page, only_input_fields=False) # type: ignore
+        input_fields, _ = await get_accessibility_info_cached(page, only_input_fields=True) # type: ignore
+        return input_fields
+    input_fields = asyncio.run(snapshots())
+    assert browser.extractions == [(False, True), (True, True)]
+    assert input_fields['children'][0]['extracted_as'] == "input fields"
+
+
+def test_concurrent_identical_requests_share_one_extraction(browser: FakeBrowser):
+    page = FakePage()
+
+    async def snapshots() -> list:
+        browser.release.clear()
+        requests = [asyncio.ensure_future(get_accessibility_info_cached(page, only_input_fields=False)) for _ in range(3)] # type: ignore
+        await asyncio.sleep(0)
+        browser.release.set()
+        return await asyncio.gather(*requests)
+    results = asyncio.run(snapshots())
+    assert results[0] is results[1] is results[2]
+    assert browser.extractions == [(False, True)]
+
+
+def test_scopes_are_cached_apart(browser: FakeBrowser):
+    page = FakePage()
+
+    async def snapshots() -> tuple:
+        whole_page, _ = await get_accessibility_info_cached(page, only_input_fields=False) # type: ignore
+        _, scope = await get_accessibility_info_cached(page, only_input_fields=False, dom_scope=DomScope("viewport")) # type: ignore
+        return whole_page, scope
+    _, scope = asyncio.run(snapshots())
+    assert scope.scope == "viewport"
+    assert len(browser.extractions) == 2
@@ -0,0 +1,55 @@
+import copy
+
+from ae.utils.dom_snapshot_store import diff_snapshots
+
+
+def sample_tree() -> dict:
+    return {"role": "WebArea", "name": "Cart", "children": [
+        {"mmid": "1", "tag": "form", "role": "form", "children": [
+            {"mmid": "2", "tag": "input", "role": "textbox", "name": "Coupon", "value": ""},
+            {"mmid": "3", "tag": "button", "role": "button", "name": "Apply"},
+        ]},
+        {"role": "text", "name": "Total: $10"},
+    ]}
+
+
+def test_identical_trees_have_no_changes():
+    assert diff_snapshots(sample_tree(), sample_tree()) == {"added": [], "removed": [], "changed": []}
+
+
+def test_added_subtrees_are_listed_once_with_their_parent():
+    current = sample_tree()
+    banner = {"mmid": "4", "tag": "div", "role": "alert", "children": [{"mmid": "5", "tag": "a", "role": "link", "name": "Undo"}]}
+    current['children'][0]['children'].append(banner)
+    diff = diff_snapshots(sample_tree(), current)
+    assert diff == {"added": [{"parent_mmid": "1", **banner}], "removed": [], "changed": []}
+
+
+def test_removed_nodes_are_listed_at_the_top_of_their_subtree():
+    current = sample_tree()
+    del current['children'][0]
+    current['children'][0]['name'] = "Total: $8"
+    diff = diff_snapshots(sample_tree(), current)
+    assert diff['added'] == [{"parent_mmid": None, "role": "text", "name": "Total: $8"}]
+    assert diff['removed'] == ["1", {"parent_mmid": None, "role": "text", "name": "Total: $10"}]
+    assert diff['changed'] == []
+
+
+def test_changed_fields_are_listed_without_children():
+    current = sample_tree()
+    current['children'][0]['children'][0]['value'] = "SAVE10"
+    current['name'] = "Cart (1)"
+    diff = diff_snapshots(sample_tree(), current)
+    assert diff['added'] == []
+    assert diff['removed'] == []
+    assert diff['changed'] == [{"role": "WebArea", "name": "Cart (1)"},
+                               {"mmid": "2", "tag": "input", "role": "textbox", "name": "Coupon", "value": "SAVE10"}]
+
+
+def test_trees_are_not_modified():
+    previous, current = sample_tree(), sample_tree()
+    current['children'].pop()
+    previous_copy, current_copy = copy.deepcopy(previous), copy.deepcopy(current)
+    diff_snapshots(previous, current)
+    assert previous == previous_copy
+    assert current == current_copy
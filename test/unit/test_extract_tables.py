@@ -0,0 +1,76 @@
+import asyncio
+
+import ae.core.skills.extract_tables as extract_tables_module
+import pytest
+from ae.core.skills.extract_tables import extract_tables
+
+as_csv = getattr(extract_tables_module, '__as_csv')
+as_columns = getattr(extract_tables_module, '__as_columns')
+
+HEADER = ["Team", "Wins", "Losses"]
+ROWS = [["Boston", "12", "3"], ["Denver, CO", "9", "6"], ["Miami", "7", "8"]]
+
+
+class FakePage:
+    """
+    Answers the tables script like a page with one table of the rows above.
+    """
+
+    def __init__(self):
+        self.params: dict | None = None
+
+    async def evaluate(self, expression: str, params: dict) -> dict | None:
+        self.params = params
+        if params['table'] is None:
+            return {"tables": [{"table": 0, "caption": "Standings", "columns": HEADER, "rows": len(ROWS), "mmid": "12"}]}
+        if params['table'] != 0:
+            return None
+        return {"header": HEADER, "total": len(ROWS), "rows": ROWS[params['offset']:params['offset'] + params['limit']]}
+
+
+@pytest.fixture
+def page(monkeypatch) -> FakePage:
+    fake_page = FakePage()
+
+    class FakePlaywrightManager:
+        def __init__(self, **kwargs):
+            pass
+
+        async def get_current_page(self) -> FakePage:
+            return fake_page
+
+    async def wait_for_non_loading_dom_state(page: FakePage, max_wait_millis: int):
+        pass
+    monkeypatch.setattr(extract_tables_module, "PlaywrightManager", FakePlaywrightManager)
+    monkeypatch.setattr(extract_tables_module, "wait_for_non_loading_dom_state", wait_for_non_loading_dom_state)
+    return fake_page
+
+
+def test_rows_are_written_as_csv():
+    assert as_csv(HEADER, ROWS) == 'Team,Wins,Losses\nBoston,12,3\n"Denver, CO",9,6\nMiami,7,8\n'
+    assert as_csv([], [["a", "b"]]) == "a,b\n"
+
+
+def test_rows_are_written_as_columns():
+    assert as_columns(HEADER, ROWS) == {"Team": ["Boston", "Denver, CO", "Miami"], "Wins": ["12", "9", "7"], "Losses": ["3", "6", "8"]}
+    # Columns without a header are named by their position, duplicated names get theirs, short rows are padded
+    assert as_columns(["Name", "", "Name"], [["a", "b", "c"], ["d"]]) == {"Name": ["a", "d"], "1": ["b", ""], "Name_2": ["c", ""]}
+
+
+def test_tables_are_listed_without_a_table(page: FakePage):
+    listed = asyncio.run(extract_tables())
+    assert "'caption': 'Standings'" in listed and "'mmid': '12'" in listed
+    assert page.params == {"table": None, "offset": 0, "limit": 200, "maxCellChars": extract_tables_module.MAX_CELL_CHARS}
+
+
+def test_rows_are_read_in_chunks(page: FakePage):
+    first_chunk = asyncio.run(extract_tables(table=0, limit=2))
+    assert first_chunk == "{'table': 0, 'total': 3, 'offset': 0, 'next_offset': 2}\nTeam,Wins,Losses\nBoston,12,3\n\"Denver, CO\",9,6\n"
+    last_chunk = asyncio.run(extract_tables(table=0, offset=2, limit=2, output_format="columns"))
+    assert last_chunk == "{'table': 0, 'total': 3, 'offset': 2, 'next_offset': None, 'columns': {'Team': ['Miami'], 'Wins': ['7'], 'Losses': ['8']}}"
+
+
+def test_missing_tables_and_formats_are_reported(page: FakePage):
+    assert asyncio.run(extract_tables(table=4)).startswith("No table 4 on the page.")
+    with pytest.raises(ValueError):
+        asyncio.run(extract_tables(table=0, output_format="xlsx"))
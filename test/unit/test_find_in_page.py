@@ -0,0 +1,57 @@
+import ast
+import asyncio
+
+import ae.core.skills.find_in_page as find_in_page_module
+import pytest
+from ae.core.skills.find_in_page import find_in_page
+
+PAGE_TEXT = """# Returns
+Items can be returned within 30 days of delivery.
+
+## Damaged items
+A refund for damaged items is issued once the item is received at the warehouse.
+
+## Shipping
+Orders ship within two business days."""
+
+
+class FakePage:
+    url = "https://shop.example.com/help"
+
+
+@pytest.fixture
+def page(monkeypatch) -> FakePage:
+    fake_page = FakePage()
+
+    class FakePlaywrightManager:
+        def __init__(self, **kwargs):
+            pass
+
+        async def get_current_page(self) -> FakePage:
+            return fake_page
+
+    async def wait_for_non_loading_dom_state(page: FakePage, max_wait_millis: int):
+        pass
+
+    async def get_dom_fingerprint(page: FakePage) -> dict:
+        return {"document_id": "document-1", "url": page.url, "epoch": 0, "viewport": [0, 0, 800, 600]}
+
+    async def get_page_markdown(page: FakePage) -> str:
+        return PAGE_TEXT
+    monkeypatch.setattr(find_in_page_module, "PlaywrightManager", FakePlaywrightManager)
+    monkeypatch.setattr(find_in_page_module, "wait_for_non_loading_dom_state", wait_for_non_loading_dom_state)
+    monkeypatch.setattr(find_in_page_module, "get_dom_fingerprint", get_dom_fingerprint)
+    monkeypatch.setattr(find_in_page_module, "get_page_markdown", get_page_markdown)
+    monkeypatch.setattr(find_in_page_module, "FIND_IN_PAGE_PASSAGE_CHARS", 90)
+    return fake_page
+
+
+def test_best_passages_are_returned_as_text(page: FakePage):
+    found = ast.literal_eval(asyncio.run(find_in_page("refund for damaged items", k=1)))
+    assert found["query"] == "refund for damaged items"
+    assert found["passages_matched"] >= 1
+    assert len(found["passages"]) == 1 and "refund for damaged items" in found["passages"][0]
+
+
+def test_queries_without_matches_are_reported(page: FakePage):
+    assert asyncio.run(find_in_page("gift wrapping")).startswith("No passage of the page matches 'gift wrapping'.")
@@ -0,0 +1,47 @@
+import ae.utils.get_detailed_accessibility_tree as accessibility_tree_module
+import pytest
+
+from test.unit.tree_fixtures import copy_tree
+from test.unit.tree_fixtures import flatten_tree
+from test.unit.tree_fixtures import reference_prune_tree
+from test.unit.tree_fixtures import synthetic_tree
+
+prune_tree = getattr(accessibility_tree_module, '__prune_tree')
+
+
+@pytest.mark.parametrize("shape", ["mixed", "wide", "deep"])
+@pytest.mark.parametrize("only_input_fields", [False, True])
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_prune_tree_matches_the_recursive_reference(shape: str, only_input_fields: bool, seed: int):
+    tree = synthetic_tree(2000, shape, seed=seed, deep_chain_length=50)
+    expected = reference_prune_tree(copy_tree(tree), only_input_fields)
+    assert flatten_tree(prune_tree(copy_tree(tree), only_input_fields)) == flatten_tree(expected)
+
+
+def test_marked_nodes_are_deleted_or_unraveled():
+    tree = {"role": "WebArea", "name": "Page", "children": [
+        {"role": "generic", "marked_for_unravel_children": True, "children": [
+            {"mmid": "1", "tag": "button", "role": "button", "name": "Buy now"},
+        ]},
+        {"mmid": "2", "tag": "div", "role": "dialog", "name": "Overlay", "marked_for_deletion_by_mm": True, "children": [
+            {"mmid": "3", "tag": "button", "role": "button", "name": "Close"},
+        ]},
+        {"role": "separator", "name": ""},
+        {"role": "text", "name": "In stock"},
+    ]}
+    assert prune_tree(tree, only_input_fields=False) == {"role": "WebArea", "name": "Page", "children": [
+        {"mmid": "1", "tag": "button", "role": "button", "name": "Buy now"},
+        {"role": "text", "name": "In stock"},
+    ]}
+
+
+def test_deep_trees_do_not_exceed_the_recursion_limit():
+    tree = {"role": "WebArea", "name": "Deep page"}
+    node = tree
+    for mmid in range(20000):
+        node['children'] = [{"mmid": str(mmid), "tag": "button", "role": "button", "name": f"Level {mmid}"}]
+        node = node['children'][0]
+    with pytest.raises(RecursionError):
+        reference_prune_tree(copy_tree(tree), False)
+    pruned = prune_tree(copy_tree(tree), False)
+    assert flatten_tree(pruned) == flatten_tree(tree)
@@ -0,0 +1,103 @@
+import asyncio
+import base64
+
+import ae.utils.screenshot_helper as screenshot_helper_module
+import pytest
+from ae.utils.screenshot_helper import screenshot_page
+
+parse_tool_limits = getattr(screenshot_helper_module, '__parse_tool_limits')
+image_size = getattr(screenshot_helper_module, '__image_size')
+
+# A viewport of 1280 x 800 CSS pixels on a screen of device pixel ratio 2
+VIEWPORT = {"x": 0, "y": 120, "width": 1280, "height": 800, "ratio": 2}
+
+
+class FakePage:
+    """
+    Stands for a page whose screenshots take bytes_per_pixel bytes per pixel of the image, plus a fixed overhead, over CDP or
+    with Playwright.
+    """
+
+    def __init__(self, bytes_per_pixel: float, overhead: int = 0):
+        self.bytes_per_pixel = bytes_per_pixel
+        self.overhead = overhead
+        self.screenshots: list[dict] = []
+
+    def image(self, width: float, height: float) -> bytes:
+        return bytes(self.overhead + int(width * height * self.bytes_per_pixel))
+
+    async def evaluate(self, expression: str) -> dict:
+        return VIEWPORT
+
+    async def screenshot(self, type: str, scale: str, quality: int | None = None) -> bytes:
+        self.screenshots.append({"format": type, "quality": quality, "scale": scale})
+        return self.image(VIEWPORT["width"], VIEWPORT["height"])
+
+
+@pytest.fixture
+def cdp_available(monkeypatch) -> None:
+    async def send_cdp_command(page: FakePage, method: str, params: dict) -> dict:
+        page.screenshots.append(params)
+        clip = params["clip"]
+        scale = clip["scale"] * VIEWPORT["ratio"]
+        return {"data": base64.b64encode(page.image(clip["width"] * scale, clip["height"] * scale)).decode("utf-8")}
+    monkeypatch.setattr(screenshot_helper_module, "send_cdp_command", send_cdp_command)
+
+
+@pytest.fixture
+def cdp_unavailable(monkeypatch) -> None:
+    async def send_cdp_command(page: FakePage, method: str, params: dict) -> dict:
+        raise RuntimeError("CDP sessions are only available on Chromium")
+    monkeypatch.setattr(screenshot_helper_module, "send_cdp_command", send_cdp_command)
+
+
+@pytest.fixture(autouse=True)
+def screenshot_settings(monkeypatch) -> None:
+    monkeypatch.setattr(screenshot_helper_module, "SCREENSHOT_FORMAT", "jpeg")
+    monkeypatch.setattr(screenshot_helper_module, "SCREENSHOT_QUALITY", 70)
+    monkeypatch.setattr(screenshot_helper_module, "SCREENSHOT_MAX_WIDTH", 1280)
+    monkeypatch.setattr(screenshot_helper_module, "SCREENSHOT_MAX_HEIGHT", 800)
+    monkeypatch.setattr(screenshot_helper_module, "DEFAULT_SCREENSHOT_MAX_BYTES", 200000)
+    monkeypatch.setattr(screenshot_helper_module, "SCREENSHOT_MAX_BYTES_PER_TOOL", {"click": 50000})
+
+
+def test_tool_limits_are_parsed():
+    assert parse_tool_limits("click=50000, get_dom_with_content_type = 120000,,garbage") == {"click": 50000, "get_dom_with_content_type": 120000}
+    assert parse_tool_limits("") == {}
+
+
+def test_image_sizes_are_read_from_base64():
+    for size in range(8):
+        assert image_size(base64.b64encode(bytes(size)).decode("utf-8")) == size
+
+
+def test_screenshots_are_scaled_down_from_the_device_pixel_ratio(cdp_available: None):
+    page = FakePage(bytes_per_pixel=0.1)
+    content = asyncio.run(screenshot_page(page, "openurl")) # type: ignore
+    assert content["type"] == "image_url" and content["image_url"].startswith("data:image/jpeg;base64,")
+    assert page.screenshots == [{"format": "jpeg", "quality": 70, "captureBeyondViewport": False,
+                                 "clip": {"x": 0, "y": 120, "width": 1280, "height": 800, "scale": 0.5}}]
+
+
+def test_screenshots_over_the_tool_limit_are_taken_again_smaller(cdp_available: None):
+    page = FakePage(bytes_per_pixel=0.1)
+    content = asyncio.run(screenshot_page(page, "click")) # type: ignore
+    assert content["type"] == "image_url"
+    assert image_size(content["image_url"].split(",", 1)[1]) <= 50000
+    assert [screenshot["quality"] for screenshot in page.screenshots] == [70, 55]
+    assert page.screenshots[1]["clip"]["scale"] < page.screenshots[0]["clip"]["scale"]
+
+
+def test_screenshots_that_do_not_fit_are_left_out(cdp_available: None):
+    page = FakePage(bytes_per_pixel=0.1, overhead=60000)
+    content = asyncio.run(screenshot_page(page, "click")) # type: ignore
+    assert content == {"type": "text", "text": "The screenshot of the page was left out, it is too large."}
+    assert len(page.screenshots) == 1 + screenshot_helper_module.SCREENSHOT_MAX_RETRIES
+
+
+def test_playwright_screenshots_are_taken_at_a_lower_quality_only(cdp_unavailable: None):
+    page = FakePage(bytes_per_pixel=0.06)
+    content = asyncio.run(screenshot_page(page, "click")) # type: ignore
+    # Playwright cannot scale the screenshot down: at CSS pixel scale it does not fit, whatever the quality
+    assert content["type"] == "text"
+    assert page.screenshots == [{"format": "jpeg", "quality": quality, "scale": "css"} for quality in (70, 55, 40)]
@@ -0,0 +1,114 @@
+import asyncio
+import json
+import re
+
+import ae.server.tool_output_pager as tool_output_pager_module
+import pytest
+from ae.server.tool_output_pager import _split_text
+from ae.server.tool_output_pager import CHARS_PER_TOKEN
+from ae.server.tool_output_pager import get_tool_output_token_budget
+from ae.server.tool_output_pager import MIN_TOOL_OUTPUT_TOKEN_BUDGET
+from ae.server.tool_output_pager import ToolOutputPager
+from ae.server.tool_output_pager import with_output_budget
+
+cursor_pattern = re.compile(r'call next_page with cursor "([0-9a-f]+-\d+)"')
+page_header_pattern = re.compile(r'^\[Page \d+ of \d+ of the [\w]+ output\]\n')
+
+
+def read_all_pages(pager: ToolOutputPager, first_page: str) -> list[str]:
+    """
+    Follows the cursors from the first page to the last one, and returns the pages without their header and next page note.
+    """
+    pages: list[str] = []
+    page = first_page
+    while True:
+        match = cursor_pattern.search(page)
+        pages.append(page[:page.rfind("\n\n[Output truncated")] if match else page)
+        if match is None:
+            return pages
+        page = page_header_pattern.sub('', pager.get_page(match.group(1)))
+
+
+def test_split_text_round_trips():
+    text = "\n".join(f"line {i} " + "x" * (i % 17) for i in range(500))
+    pages = _split_text(text, 200)
+    assert ''.join(pages) == text
+    assert all(len(page) <= 200 for page in pages)
+    # Pages are cut at line breaks when there is one in their second half
+    assert all(page.endswith('\n') for page in pages[:-1])
+
+
+def test_split_text_terminates_on_non_positive_budget():
+    assert _split_text("abc", 0) == ["a", "b", "c"]
+    assert _split_text("abc", -5) == ["a", "b", "c"]
+
+
+def test_small_outputs_are_returned_as_is():
+    pager = ToolOutputPager()
+    assert pager.paginate("click", "done") == "done"
+    assert pager.paginate("click", {"a": 1}) == {"a": 1}
+    assert pager.paginate("click", None) is None
+
+
+def test_text_output_round_trips_through_pages():
+    pager = ToolOutputPager()
+    text = "\n".join(f"row {i}: " + "lorem ipsum " * 5 for i in range(3000))
+    first_page = pager.paginate("click", text)
+    assert len(first_page) <= get_tool_output_token_budget("click") * CHARS_PER_TOKEN
+    pages = read_all_pages(pager, first_page)
+    assert len(pages) > 1
+    assert ''.join(pages) == text
+
+
+def test_json_output_round_trips_through_pages():
+    pager = ToolOutputPager()
+    result = [{"mmid": i, "name": f"Item number {i}", "tags": ["a", "b"]} for i in range(3000)]
+    pages = read_all_pages(pager, pager.paginate("click", result))
+    assert len(pages) > 1
+    assert json.loads(''.join(pages)) == result
+
+
+def test_content_parts_keep_the_screenshot_with_the_first_page():
+    pager = ToolOutputPager()
+    screenshot = {"type": "image_url", "image_url": "data:image/jpeg;base64,AAAA"}
+    text = "x" * (get_tool_output_token_budget("click") * CHARS_PER_TOKEN * 2)
+    paginated = pager.paginate("click", [{"type": "text", "text": text}, screenshot])
+    assert paginated[1] == screenshot
+    assert ''.join(read_all_pages(pager, paginated[0]['text'])) == text
+
+
+def test_unknown_and_expired_cursors_are_rejected():
+    pager = ToolOutputPager(max_outputs=1)
+    text = "y" * (get_tool_output_token_budget("click") * CHARS_PER_TOKEN * 2)
+    first_cursor = cursor_pattern.search(pager.paginate("click", text)).group(1)
+    pager.paginate("click", text)
+    with pytest.raises(ValueError):
+        pager.get_page(first_cursor)
+    with pytest.raises(ValueError):
+        pager.get_page("not-a-cursor")
+
+
+def test_budgets_are_positive_and_clamped(monkeypatch):
+    parse_token_budget = getattr(tool_output_pager_module, '__parse_token_budget')
+    assert parse_token_budget("10", "TEST") == 10
+    for bad_budget in ("0", "-5", "many"):
+        with pytest.raises(ValueError):
+            parse_token_budget(bad_budget, "TEST")
+
+    monkeypatch.setitem(tool_output_pager_module.TOOL_OUTPUT_TOKEN_BUDGETS, "tiny_tool", 1)
+    assert get_tool_output_token_budget("tiny_tool") == MIN_TOOL_OUTPUT_TOKEN_BUDGET
+
+
+def test_with_output_budget_paginates_and_keeps_the_skill_description():
+    async def skill(count: int) -> str:
+        """Returns many lines."""
+        return "\n".join("z" * 50 for _ in range(count))
+
+    paginated_skill = with_output_budget("click", skill)
+    assert paginated_skill.__name__ == "skill"
+    assert paginated_skill.__doc__ == "Returns many lines."
+    assert paginated_skill.__annotations__ == skill.__annotations__
+
+    assert asyncio.run(paginated_skill(count=2)) == "z" * 50 + "\n" + "z" * 50
+    first_page = asyncio.run(paginated_skill(count=2000))
+    assert cursor_pattern.search(first_page) is not None
@@ -0,0 +1,130 @@
+"""
+Synthetic accessibility trees, and the recursive __prune_tree the iterative one replaced, shared by the tree processing tests
+and scripts/benchmark_prune_tree.py.
+"""
+import random
+from typing import Any
+
+ROLES = ('generic', 'text', 'link', 'button', 'separator', 'LineBreak', 'listitem', 'heading', 'img', 'textbox')
+TAGS = ('div', 'a', 'button', 'input', 'textarea', 'span', 'li')
+NAMES = ('', 'Go', 'a:', 'Search products', 'Add to cart,\n', '12', 'Read more about this item')
+
+
+def reference_prune_tree(node: dict[str, Any], only_input_fields: bool) -> dict[str, Any] | None:
+    """
+    The recursive implementation the iterative one replaced, kept to check that both produce the same tree.
+    """
+    if "marked_for_deletion_by_mm" in node:
+        return None
+
+    if 'children' in node:
+        i = 0
+        while i < len(node['children']):
+            child = node['children'][i]
+            if 'marked_for_unravel_children' in child:
+                if 'children' in child:
+                    node['children'] = node['children'][:i] + child['children'] + node['children'][i+1:]
+                    i += len(child['children']) - 1
+                else:
+                    node['children'].pop(i)
+                    i -= 1
+            else:
+                pruned_child = reference_prune_tree(child, only_input_fields)
+                if pruned_child is None:
+                    node['children'].pop(i)
+                    i -= 1
+                else:
+                    node['children'][i] = pruned_child
+            i += 1
+
+        if not node['children']:
+            del node['children']
+
+    return None if reference_should_prune_node(node, only_input_fields) else node
+
+
+def reference_should_prune_node(node: dict[str, Any], only_input_fields: bool):
+    if node.get("role") != "WebArea" and only_input_fields and not (node.get("tag") in ("input", "button", "textarea") or node.get("role") == "button"):
+        return True
+
+    if node.get('role') == 'generic' and 'children' not in node and not ('name' in node and node.get('name')):
+        return True
+
+    if node.get('role') in ['separator', 'LineBreak']:
+        return True
+    processed_name = ""
+    if 'name' in node:
+        processed_name: str = node.get('name') # type: ignore
+        processed_name = processed_name.replace(',', '')
+        processed_name = processed_name.replace(':', '')
+        processed_name = processed_name.replace('\n', '')
+        processed_name = processed_name.strip()
+        if len(processed_name) < 3:
+            processed_name = ""
+
+    if len(node) == 2 and 'name' in node and 'role' in node and not (node.get('role') == "text" and processed_name != ""):
+        return True
+    return False
+
+
+def random_node(rng: random.Random, mmid: int, with_markers: bool) -> dict[str, Any]:
+    node: dict[str, Any] = {'role': rng.choice(ROLES), 'name': rng.choice(NAMES)}
+    if rng.random() < 0.6:
+        node['mmid'] = mmid
+        node['tag'] = rng.choice(TAGS)
+    if with_markers and rng.random() < 0.05:
+        node['marked_for_unravel_children'] = True
+    elif with_markers and rng.random() < 0.02:
+        node['marked_for_deletion_by_mm'] = True
+    return node
+
+
+def synthetic_tree(n_nodes: int, shape: str, seed: int, deep_chain_length: int) -> dict[str, Any]:
+    """
+    Generates a tree of n_nodes nodes. 'wide' puts most nodes under a few very wide parents (long listings),
+    'deep' nests the nodes in chains of deep_chain_length nodes (deeply nested wrappers), 'mixed' attaches every node to a random earlier node.
+    """
+    rng = random.Random(seed)
+    root: dict[str, Any] = {'role': 'WebArea', 'name': 'Synthetic page', 'children': []}
+    nodes = [root]
+    for mmid in range(1, n_nodes):
+        if shape == 'wide':
+            parent = nodes[rng.randrange(min(len(nodes), 10))]
+        elif shape == 'deep':
+            parent = nodes[-1] if mmid % deep_chain_length else root
+        else:
+            parent = nodes[rng.randrange(len(nodes))]
+        # Deleted and unraveled nodes would cut the chains of deep trees short
+        child = random_node(rng, mmid, with_markers=shape != 'deep')
+        parent.setdefault('children', []).append(child)
+        nodes.append(child)
+    return root
+
+
+def copy_tree(tree: dict[str, Any]) -> dict[str, Any]:
+    """
+    Copies the tree without recursing, deep trees would exceed the recursion limit of copy.deepcopy.
+    """
+    root_copy = dict(tree)
+    stack = [root_copy]
+    while stack:
+        node = stack.pop()
+        if 'children' in node:
+            node['children'] = [dict(child) for child in node['children']]
+            stack.extend(node['children'])
+    return root_copy
+
+
+def flatten_tree(tree: dict[str, Any] | None) -> list[tuple[int, list[tuple[str, Any]]]]:
+    """
+    Lists the fields and depth of every node in pre-order, to compare trees without recursing.
+    """
+    if tree is None:
+        return []
+    flattened: list[tuple[int, list[tuple[str, Any]]]] = []
+    stack = [(tree, 0)]
+    while stack:
+        node, depth = stack.pop()
+        flattened.append((depth, [(key, value) for key, value in node.items() if key != 'children']))
+        stack.extend((child, depth + 1) for child in reversed(node.get('children', [])))
+    return flattened